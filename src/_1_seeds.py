@@ -7,6 +7,9 @@ from lib import Unit
 from lib import Tenant
 from lib import Payment
 from lib import Expense
+from lib import RecurringExpense
+from lib.helper.scheduler import materialize_recurring_expenses
+from lib.helper import late_fees, ledger, rent_history, search
 
 if __name__ == "__main__":
 
@@ -16,11 +19,21 @@ if __name__ == "__main__":
     Tenant.drop_table()
     Payment.drop_table()
     Expense.drop_table()
+    RecurringExpense.drop_table()
+    late_fees.drop_table()
+    ledger.drop_table()
+    rent_history.drop_table()
+    search.drop_table()
 
     Unit.create_table()
     Tenant.create_table()
     Payment.create_table()
     Expense.create_table()
+    RecurringExpense.create_table()
+    late_fees.create_table()
+    rent_history.create_table()
+    ledger.create_table()
+    search.create_table()
 
     print("Creating constants...")
 
@@ -58,27 +71,25 @@ if __name__ == "__main__":
         monthly_rent = unit.monthly_rent
         exp_date = datetime.strptime(unit.acquisition_date, '%Y-%m-%d')
 
-        while exp_date <= datetime.now():
+        # mortgage and property mgmt fees are created by the scheduler below
+        RecurringExpense.create(
+            descr="monthly mortgage payment",
+            category="mortgage",
+            amount=unit.monthly_mortgage,
+            cadence="monthly",
+            start_date=unit.acquisition_date,
+            unit_id=unit.id,
+        )
+        RecurringExpense.create(
+            descr="monthly property mgmt fee",
+            category="property mgmt",
+            amount=monthly_rent*0.1,
+            cadence="monthly",
+            start_date=unit.acquisition_date,
+            unit_id=unit.id,
+        )
 
-            expense = Expense(
-                descr="monthly mortgage payment",
-                category="mortgage",
-                amount=monthly_mortgage,
-                exp_date=exp_date.strftime('%Y-%m-%d'),
-                unit_id=unit.id,
-            )
-            expense.save()
-            expenses.append(expense)
-
-            expense = Expense(
-                descr="monthly property mgmt fee",
-                category="property mgmt",
-                amount=monthly_rent*0.1,
-                exp_date=exp_date.strftime('%Y-%m-%d'),
-                unit_id=unit.id,
-            )
-            expense.save()
-            expenses.append(expense)
+        while exp_date <= datetime.now():
 
             # Miscellaneous expenses
             setfwd = random.randint(1, 30)
@@ -106,6 +117,8 @@ if __name__ == "__main__":
 
             exp_date += relativedelta(months=1)
 
+    materialize_recurring_expenses()
+
     print("Seeding tenant table...")
 
     tenants = []
@@ -179,4 +192,6 @@ if __name__ == "__main__":
 
             pmt_date += relativedelta(months=1)
 
+    ledger.post_rent_charges()
+
     print("Seeding complete!")
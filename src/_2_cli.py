@@ -1,12 +1,62 @@
+import argparse
+from contextlib import nullcontext
+from rich import print
+
 from lib import populate_menu
+from lib import Unit, Tenant, Payment, Expense, RecurringExpense
+from lib.helper import late_fees, ledger, rent_history, search
+from lib.helper.profiler import Profiler, PROFILE_DIR
+from lib.helper import metrics
+
+def build_parser():
+    '''
+    creates argument parser for the CLI options
+    '''
+    parser = argparse.ArgumentParser(description="Rental management tool")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every menu action, split into SQL, terminal output and input (saved on exit)")
+    parser.add_argument("--cprofile", action="store_true", help="also save cProfile stats of the slowest actions")
+    parser.add_argument("--flame", action="store_true",
+                        help="also save sampled call stacks of the slowest actions (folded format for flame graphs)")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR, help="folder to save profiles in")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="save query, cache and rendering metrics on exit (.json for JSON, else Prometheus text)")
+    return parser
 
 if __name__ == "__main__":
-    menu = populate_menu() # populate tree to create feedback loop
-
-    node = menu.root # set initial node to root
-    while True:
-        if node.procedure:
-            node = node.run_procedure() # invoke callback function if user is at the end of the menu tree
-        
-        if len(node.children) > 0:
-            node = node.show_menu() # show next menu if the user is not at the end of the menu tree
\ No newline at end of file
+    args = build_parser().parse_args()
+
+    profiler = None
+    if args.profile or args.cprofile or args.flame:
+        profiler = Profiler(args.profile_dir, cprofile=args.cprofile, sample_interval=0.005 if args.flame else None)
+        profiler.enable()
+
+    try:
+        with profiler.procedure("startup") if profiler else nullcontext():
+            for cls in (Unit, Tenant, Payment, Expense, RecurringExpense):
+                cls.create_table() # create missing tables and bring existing ones up to date
+            late_fees.create_table()
+            rent_history.create_table()
+            ledger.create_table()
+            search.create_table()
+
+        menu = populate_menu() # populate tree to create feedback loop
+        if profiler:
+            menu.enable_profiling(profiler)
+
+        node = menu.root # set initial node to root
+        while True:
+            if node.procedure:
+                node = node.run_procedure() # invoke callback function if user is at the end of the menu tree
+
+            if len(node.children) > 0:
+                node = node.show_menu() # show next menu if the user is not at the end of the menu tree
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump()
+            print(profiler.summary().head(10))
+            print(f"Profiles saved to: [bold green]{profiler.output_dir}[/bold green]")
+        if args.metrics:
+            metrics.REGISTRY.write(args.metrics)
+            print(f"Metrics saved to: [bold green]{args.metrics}[/bold green]")
@@ -0,0 +1,321 @@
+import argparse
+from datetime import datetime
+from rich import print
+
+# project modules
+from lib import Unit, Tenant, Payment, Expense, RecurringExpense
+from lib.helper import late_fees, ledger, rent_history, search
+from lib.helper import batch
+from lib.helper import metrics
+from lib.helper import validation as val
+
+def export_rollforwards(args):
+    '''
+    exports payment rollforwards for the selected tenants
+    '''
+    tenant_ids = args.tenants
+
+    if args.active:
+        active = {tenant.id for tenant in Tenant.get_active_instances()}
+        tenant_ids = [id for id in (tenant_ids or active) if id in active]
+
+    summary = batch.export_rollforwards(
+        tenant_ids=tenant_ids,
+        output_dir=args.output_dir,
+        long_format=args.long,
+        max_workers=args.workers,
+        chunksize=args.chunksize,
+        use_processes=args.processes
+    )
+
+    print(f"Exported [bold green]{summary['rows']:,}[/bold green] rows for "
+          f"{summary['tenants']:,} tenants in {summary['seconds']:,.2f}s "
+          f"({summary['tenants_per_second']:,.1f} tenants/s)")
+    if args.long:
+        print(f"Output saved to: [bold green]{summary['paths'][0]}[/bold green]")
+
+def import_transactions(args):
+    '''
+    imports payments or expenses from a csv file
+    '''
+    from lib.helper import importer
+
+    column_map = dict(pair.split("=", 1) for pair in args.map) if args.map else None
+
+    summary = importer.import_csv(
+        path=args.path,
+        kind=args.kind,
+        column_map=column_map,
+        chunksize=args.chunksize,
+        reject_path=args.rejects,
+        match_tenants=not args.no_match
+    )
+
+    print(f"Imported [bold green]{summary['inserted']:,}[/bold green] of {summary['rows']:,} rows "
+          f"in {summary['seconds']:,.2f}s ({summary['rows_per_second']:,.0f} rows/s)")
+    if summary['reject_path']:
+        print(f"[red]{summary['rejected']:,} rows rejected:[/red] [bold]{summary['reject_path']}[/bold]")
+    if summary['review_path']:
+        print(f"[yellow]{summary['review']:,} rows need a tenant match:[/yellow] [bold]{summary['review_path']}[/bold]")
+
+def export_transactions(args):
+    '''
+    streams transactions to a (optionally compressed) csv file
+    '''
+    from lib.helper import export
+
+    date_today = datetime.now().strftime('%Y-%m-%d')
+    label = f"UNIT_{args.unit}" if args.unit else "ALL_UNITS"
+    path = args.output or f"./outputs/TRANSACTIONS_AS_OF_{date_today}_FOR_{label}.csv"
+
+    summary = export.export_transactions(
+        path=path,
+        unit_id=args.unit,
+        start_date=args.start,
+        end_date=args.end,
+        compression=args.compress,
+        chunksize=args.chunksize
+    )
+
+    print(f"Exported [bold green]{summary['rows']:,}[/bold green] rows in {summary['seconds']:,.2f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s)")
+    print(f"Output saved to: [bold green]{summary['path']}[/bold green]")
+
+def export_rent_roll(args):
+    '''
+    exports rent roll as of a date, or month-end rent rolls between two dates, to a csv file
+    '''
+    from lib.helper import rent_roll
+
+    date_today = datetime.now().strftime('%Y-%m-%d')
+
+    if args.month_ends:
+        df = rent_roll.month_end_rent_rolls(args.month_ends, args.until)
+        label = f"MONTH_ENDS_{args.month_ends}_TO_{args.until or date_today}"
+    else:
+        df = rent_roll.rent_roll(args.as_of)
+        label = args.as_of or date_today
+
+    path = args.output or f"./outputs/RENT_ROLL_AS_OF_{date_today}_FOR_{label}.csv"
+    df.to_csv(path, index=False)
+
+    print(f"Exported [bold green]{len(df):,}[/bold green] rows "
+          f"for {df['As Of'].nunique():,} dates")
+    print(f"Output saved to: [bold green]{path}[/bold green]")
+
+def create_recurring_expenses(args):
+    '''
+    creates expenses due from recurring expense templates for all units
+    '''
+    from lib.helper import scheduler
+
+    summary = scheduler.materialize_recurring_expenses(through_date=args.through, unit_id=args.unit)
+
+    print(f"Created [bold green]{summary['inserted']:,}[/bold green] of {summary['due']:,} due expenses "
+          f"in {summary['seconds']:,.2f}s")
+
+def assess_late_fees(args):
+    '''
+    records late fees owed by every tenant active in the month being closed
+    '''
+    summary = late_fees.assess_late_fees(close_date=args.close_date, since_date=args.since)
+
+    print(f"Evaluated {summary['periods']:,} rent periods for {summary['tenants']:,} tenants "
+          f"in {summary['seconds']:,.2f}s")
+    print(f"Assessed [bold green]{summary['inserted']:,}[/bold green] new late fees "
+          f"({summary['late']:,} late periods in total)")
+
+def update_ledger(args):
+    '''
+    posts rent charges due to the tenant ledger (or rebuilds the whole ledger)
+    '''
+    if args.rebuild:
+        summary = ledger.rebuild(through_date=args.through)
+        print(f"Rebuilt ledger with [bold green]{summary['entries']:,}[/bold green] entries in {summary['seconds']:,.2f}s")
+        return
+
+    summary = ledger.post_rent_charges(through_date=args.through)
+    print(f"Added [bold green]{summary['added']:,}[/bold green] and removed {summary['removed']:,} rent charges, "
+          f"re-balanced {summary['tenants']:,} tenants in {summary['seconds']:,.2f}s")
+
+def adjust_rents(args):
+    '''
+    previews a bulk rent (or late fee) adjustment and applies it unless --preview is set
+    '''
+    options = dict(field=args.field, percent=args.percent, amount=args.amount, unit_ids=args.units,
+                   acquired_after=args.acquired_after, acquired_before=args.acquired_before)
+
+    df = rent_history.preview_adjustment(**options)
+    print(df.to_string(index=False))
+    print(f"{len(df):,} units, change of [bold]${df['Change'].sum():,.2f}[/bold] per month")
+
+    if args.preview or df.empty:
+        return
+
+    summary = rent_history.apply_adjustment(**options, effective_date=args.effective)
+    print(f"Adjusted [bold green]{summary['units']:,}[/bold green] units effective {summary['effective_date']} "
+          f"in {summary['seconds']:,.2f}s")
+
+def save_snapshot(args):
+    '''
+    saves a columnar snapshot of the DB for analysis
+    '''
+    from lib.helper import snapshot
+
+    summary = snapshot.write_snapshot(output_dir=args.output_dir, format=args.format)
+
+    print(f"Saved snapshot with [bold green]{sum(summary['rows'].values()):,}[/bold green] rows "
+          f"in {summary['seconds']:,.2f}s")
+    print(f"Output saved to: [bold green]{summary['path']}[/bold green]")
+
+def generate_report(args):
+    '''
+    generates the revenue report for a year as pdf or html
+    '''
+    from lib.helper.report import generate_income_report
+
+    path = args.output or f"./outputs/Revenue Report for {args.year}.{args.format}"
+    summary = generate_income_report(args.year, path, snapshot=args.snapshot, output_format=args.format)
+
+    if args.format == 'html':
+        print(f"Saved report for [bold green]{summary['units']:,}[/bold green] units "
+              f"({summary['bytes'] / 1024:,.0f} KB) in {summary['seconds']:,.2f}s")
+    else:
+        print(f"Rendered [bold green]{summary['rendered']:,}[/bold green] pages "
+              f"({summary['reused']:,} unchanged pages reused from the cache)")
+        if not summary['page_cache']:
+            print("[yellow]Page cache is off, every page was rendered (pipenv install to add pypdf)[/yellow]")
+    print(f"Output saved to: [bold green]{path}[/bold green]")
+
+def run_load_test(args):
+    '''
+    sends concurrent requests to the HTTP server and reports throughput and latency
+    '''
+    from lib.helper import loadtest
+
+    summary = loadtest.load_test(
+        url=args.url,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        revalidate=args.revalidate,
+        pool_size=args.pool_size
+    )
+
+    statuses = ", ".join(f"{status}: {count:,}" for status, count in sorted(summary['statuses'].items()))
+    print(f"Sent [bold green]{summary['requests']:,}[/bold green] requests to {summary['url']} "
+          f"in {summary['seconds']:,.2f}s ({summary['requests_per_second']:,.0f} requests/s)")
+    print(f"Statuses: {statuses}")
+    print(f"Latency: p50 {summary['p50_ms']:,.1f}ms | p95 {summary['p95_ms']:,.1f}ms | p99 {summary['p99_ms']:,.1f}ms")
+
+def build_parser():
+    '''
+    creates argument parser with one sub-command per batch job
+    '''
+    parser = argparse.ArgumentParser(description="Batch jobs for the rental management tool")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="save query, cache and rendering metrics of the job (.json for JSON, else Prometheus text)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rollforwards = commands.add_parser("rollforwards", help="export payment rollforwards for many tenants")
+    rollforwards.add_argument("--tenants", type=int, nargs="+", help="tenant ids to export (defaults to all)")
+    rollforwards.add_argument("--active", action="store_true", help="only export active tenants")
+    rollforwards.add_argument("--long", action="store_true", help="write one long-format file for all tenants")
+    rollforwards.add_argument("--output-dir", default="./outputs", help="folder to save csv files in")
+    rollforwards.add_argument("--workers", type=int, default=None, help="number of workers in the pool")
+    rollforwards.add_argument("--chunksize", type=int, default=25, help="tenants handed to a worker at a time")
+    rollforwards.add_argument("--processes", action="store_true", help="use processes instead of threads")
+    rollforwards.set_defaults(func=export_rollforwards)
+
+    imports = commands.add_parser("import", help="import payments or expenses from a csv file")
+    imports.add_argument("kind", choices=["payment", "expense"], help="type of transactions in the file")
+    imports.add_argument("path", help="csv file to import (e.g. bank statement export)")
+    imports.add_argument("--map", nargs="+", metavar="HEADER=ATTRIBUTE",
+                         help="map csv headers to attributes (e.g. 'Posted Date=pmt_date' 'Payer=tenant')")
+    imports.add_argument("--chunksize", type=int, default=10000, help="rows inserted per transaction")
+    imports.add_argument("--rejects", default=None, help="file to save rejected rows to")
+    imports.add_argument("--no-match", action="store_true", help="do not match payments without a tenant")
+    imports.set_defaults(func=import_transactions)
+
+    transactions = commands.add_parser("transactions", help="stream transactions to a csv file")
+    transactions.add_argument("--unit", type=int, default=None, help="unit id to export (defaults to all units)")
+    transactions.add_argument("--start", type=val.date_validation, default=None, help="first date to include (YYYY-MM-DD)")
+    transactions.add_argument("--end", type=val.date_validation, default=None, help="last date to include (YYYY-MM-DD)")
+    transactions.add_argument("--compress", choices=["gzip", "zstd"], default=None, help="compress the output file")
+    transactions.add_argument("--chunksize", type=int, default=5000, help="rows fetched and written at a time")
+    transactions.add_argument("--output", default=None, help="file to save to (defaults to the outputs folder)")
+    transactions.set_defaults(func=export_transactions)
+
+    rent_rolls = commands.add_parser("rentroll", help="export rent roll as of a date or at each month end")
+    dates = rent_rolls.add_mutually_exclusive_group()
+    dates.add_argument("--as-of", type=val.date_validation, default=None, help="date of the rent roll (defaults to today)")
+    dates.add_argument("--month-ends", type=val.date_validation, default=None, metavar="START",
+                       help="export a rent roll for each month end on or after this date")
+    rent_rolls.add_argument("--until", type=val.date_validation, default=None,
+                            help="last date for --month-ends (defaults to today)")
+    rent_rolls.add_argument("--output", default=None, help="file to save to (defaults to the outputs folder)")
+    rent_rolls.set_defaults(func=export_rent_roll)
+
+    recurring = commands.add_parser("recurring", help="create expenses due from recurring expense templates")
+    recurring.add_argument("--through", type=val.date_validation, default=None, help="last date to create expenses for (defaults to today)")
+    recurring.add_argument("--unit", type=int, default=None, help="unit id to create expenses for (defaults to all units)")
+    recurring.set_defaults(func=create_recurring_expenses)
+
+    late_fee_jobs = commands.add_parser("latefees", help="month close: record late fees owed by active tenants")
+    late_fee_jobs.add_argument("--close-date", type=val.date_validation, default=None, help="last day of the close (defaults to today)")
+    late_fee_jobs.add_argument("--since", type=val.date_validation, default=None, help="only assess rent due on or after this date")
+    late_fee_jobs.set_defaults(func=assess_late_fees)
+
+    ledgers = commands.add_parser("ledger", help="post rent charges due to the tenant ledger")
+    ledgers.add_argument("--through", type=val.date_validation, default=None, help="last date to charge rent for (defaults to today)")
+    ledgers.add_argument("--rebuild", action="store_true", help="clear the ledger and post every entry again")
+    ledgers.set_defaults(func=update_ledger)
+
+    rents = commands.add_parser("rents", help="adjust rent or late fee of many units at once (with preview)")
+    change = rents.add_mutually_exclusive_group(required=True)
+    change.add_argument("--percent", type=float, help="percentage to adjust by (e.g. 3 or -5)")
+    change.add_argument("--amount", type=float, help="fixed amount to adjust by (e.g. 50 or -25)")
+    rents.add_argument("--field", choices=rent_history.ADJUSTABLE_FIELDS, default="monthly_rent", help="value to adjust")
+    rents.add_argument("--units", type=int, nargs="+", help="unit ids to adjust (defaults to all)")
+    rents.add_argument("--acquired-after", type=val.date_validation, default=None, help="only units acquired on or after this date")
+    rents.add_argument("--acquired-before", type=val.date_validation, default=None, help="only units acquired on or before this date")
+    rents.add_argument("--effective", type=val.date_validation, default=None, help="first day of the new rent (defaults to today)")
+    rents.add_argument("--preview", action="store_true", help="only show the changes, do not apply them")
+    rents.set_defaults(func=adjust_rents)
+
+    snapshots = commands.add_parser("snapshot", help="save a parquet or arrow snapshot of the DB for analysis")
+    snapshots.add_argument("--format", choices=["parquet", "arrow"], default="parquet", help="file format of the snapshot")
+    snapshots.add_argument("--output-dir", default="./outputs/snapshots", help="folder to save the snapshot in")
+    snapshots.set_defaults(func=save_snapshot)
+
+    reports = commands.add_parser("report", help="generate the revenue report for a year")
+    reports.add_argument("year", type=int, help="year of the report")
+    reports.add_argument("--format", choices=["pdf", "html"], default="pdf", help="html is drawn by the browser and is much smaller")
+    reports.add_argument("--snapshot", default=None, help="snapshot folder to read transactions from instead of the DB")
+    reports.add_argument("--output", default=None, help="file to save to (defaults to the outputs folder)")
+    reports.set_defaults(func=generate_report)
+
+    loadtests = commands.add_parser("loadtest", help="measure throughput and latency of the HTTP server")
+    loadtests.add_argument("--url", default=None, help="base url of a running server (defaults to starting a local one)")
+    loadtests.add_argument("--requests", type=int, default=2000, help="total number of requests to send")
+    loadtests.add_argument("--concurrency", type=int, default=16, help="number of clients sending requests at once")
+    loadtests.add_argument("--revalidate", type=float, default=0.5, help="share of repeat requests sending their ETag")
+    loadtests.add_argument("--pool-size", type=int, default=8, help="read connections in the local server")
+    loadtests.set_defaults(func=run_load_test)
+
+    return parser
+
+if __name__ == "__main__":
+    for cls in (Unit, Tenant, Payment, Expense, RecurringExpense):
+        cls.create_table() # create missing tables and bring existing ones up to date
+    late_fees.create_table()
+    rent_history.create_table()
+    ledger.create_table()
+    search.create_table()
+
+    args = build_parser().parse_args()
+    try:
+        args.func(args)
+    finally:
+        if args.metrics:
+            metrics.REGISTRY.write(args.metrics)
+            print(f"Metrics saved to: [bold green]{args.metrics}[/bold green]")
@@ -0,0 +1,28 @@
+import argparse
+
+# project modules
+from lib import Unit, Tenant, Payment, Expense, RecurringExpense
+from lib.helper import late_fees, ledger, rent_history, search
+from lib.helper import server
+
+def build_parser():
+    '''
+    creates argument parser for the server
+    '''
+    parser = argparse.ArgumentParser(description="Local HTTP JSON server for the rental management tool")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--pool-size", type=int, default=8, help="read connections shared by request threads")
+    parser.add_argument("--quiet", action="store_true", help="do not log each request")
+    return parser
+
+if __name__ == "__main__":
+    for cls in (Unit, Tenant, Payment, Expense, RecurringExpense):
+        cls.create_table() # create missing tables and bring existing ones up to date
+    late_fees.create_table()
+    ledger.create_table()
+    rent_history.create_table()
+    search.create_table()
+
+    args = build_parser().parse_args()
+    server.serve(host=args.host, port=args.port, pool_size=args.pool_size, verbose=not args.quiet)
@@ -2,6 +2,7 @@ from .database.unit import Unit
 from .database.tenant import Tenant
 from .database.expense import Expense
 from .database.payment import Payment
+from .database.recurring_expense import RecurringExpense
 
 from .tree.menu_tree import MenuTree, Node
 from .tree.populate_menu import populate_menu
\ No newline at end of file
@@ -11,10 +11,16 @@ class Expense:
 
     Constants
     ---------
+    TABLE: str
+        - name of the table which persists instances
+    DB_COLUMNS: tuple
+        - columns of the table which persists instances (in row order)
     DF_COLUMNS: tuple
         - columns to be used for Expense dataframes
     VALIDATION_DICT: dict
         - dictionary containing validation functions to apply when user makes DB edits
+    PARENT_DICT: dict
+        - dictionary containing parent class for each parent id attribute
 
     Class Attributes
     ---------
@@ -40,7 +46,7 @@ class Expense:
     ---------
     - delete: delete the table row corresponding to the current instance
     - save: insert a new row with the values of the current object
-    - update: update the table row corresponding to the current instance
+    - update: update the changed columns of the table row corresponding to the current instance
 
     Class Methods
     ---------
@@ -50,8 +56,13 @@ class Expense:
     - find_by_id: return object corresponding to the table row matching the specified primary key
     - get_all_instances: return a list containing one instance per table row
     - get_dataframe: return a Pandas DataFrame containing information from table
+    - afind_by_id: async version of find_by_id
+    - aget_all_instances: async version of get_all_instances
+    - aget_dataframe: async version of get_dataframe
     - create_table: create a new table to persist the attributes of all instances
     '''
+    TABLE = "expenses"
+    DB_COLUMNS = ("id", "descr", "category", "amount", "exp_date", "unit_id")
     DF_COLUMNS = ("id", "Description", "Category", "Amount", "Date", "Unit")
     VALIDATION_DICT = {
         "descr": val.descr_validation,
@@ -59,6 +70,7 @@ class Expense:
         "amount": val.dollar_amt_validation,
         "exp_date": val.date_validation
         }
+    PARENT_DICT = {"unit_id": Unit}
 
     # Dictionary of objects saved to the database.
     all = {}
@@ -89,6 +101,9 @@ class Expense:
         self.exp_date = exp_date
         self.unit_id = unit_id
 
+        # table row the instance was loaded from, changed attributes are written by update
+        self._row = None
+
     def __repr__(self):
         return (
             f"<expense {self.id}: {self.descr}, {self.category}, {self.amount}, {self.exp_date}, "
@@ -165,17 +180,21 @@ class Expense:
         exp_date = row[4]
         unit_id = row[5]
         
-        if expense:
-            # ensure attributes match row values in case local object was modified
-            expense.descr = descr
-            expense.category = category
-            expense.amount = amount
-            expense.exp_date = exp_date
-            expense.unit_id = unit_id
-        else:
-            # not in dictionary, create new instance and add to dictionary
-            expense = cls(descr, category, amount, exp_date, unit_id, id) # reordering due to optional values
-            cls.all[expense.id] = expense
+        # parent ids from the table are not looked up again
+        with val.rows_from_db():
+            if expense:
+                # ensure attributes match row values in case local object was modified
+                expense.descr = descr
+                expense.category = category
+                expense.amount = amount
+                expense.exp_date = exp_date
+                expense.unit_id = unit_id
+            else:
+                # not in dictionary, create new instance and add to dictionary
+                expense = cls(descr, category, amount, exp_date, unit_id, id) # reordering due to optional values
+                cls.all[expense.id] = expense
+
+        sql.mark_clean(expense, row)
         return expense
     
     # ///////////////////////////////////////////////////////////////
@@ -215,6 +234,30 @@ class Expense:
         '''
         return sql.get_all(cls, "expenses", output_as_instances=False)
 
+    # ///////////////////////////////////////////////////////////////
+    # ASYNC READS
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        '''
+        async version of find_by_id (runs in the read pool so the event loop is not blocked)
+        '''
+        return await sql.afind_by_id(cls, "expenses", id)
+
+    @classmethod
+    async def aget_all_instances(cls):
+        '''
+        async version of get_all_instances
+        '''
+        return await sql.aget_all(cls, "expenses", output_as_instances=True)
+
+    @classmethod
+    async def aget_dataframe(cls):
+        '''
+        async version of get_dataframe
+        '''
+        return await sql.aget_all(cls, "expenses", output_as_instances=False)
+
     # ///////////////////////////////////////////////////////////////
     # CLASS-SPECIFIC DATABASE FUNCTIONS
 
@@ -222,6 +265,7 @@ class Expense:
     def create_table(cls):
         '''
         create a new table to persist the attributes of all instances
+        (also adds generated date columns and indexes to an existing table)
         '''
         query = """
             CREATE TABLE IF NOT EXISTS expenses (
@@ -236,6 +280,20 @@ class Expense:
         sql.CURSOR.execute(query)
         sql.CONN.commit()
 
+        # integer date parts so date filters and year/month grouping can use indexes
+        sql.add_generated_columns("expenses", sql.date_part_columns("exp_date", "exp"))
+        sql.create_indexes("expenses", [('unit_id', 'exp_day'), ('exp_year', 'exp_month')])
+
+        # expenses created from a recurring template, one per template and date so the scheduler can re-run safely
+        sql.add_columns("expenses", {"recurring_id": "INTEGER REFERENCES recurring_expenses(id) ON DELETE SET NULL"})
+        sql.CURSOR.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_expenses_recurring_id_exp_date
+            ON expenses (recurring_id, exp_date) WHERE recurring_id IS NOT NULL
+        """)
+        sql.CONN.commit()
+
+        sql.track_table_version("expenses")
+
     def save(self):
         '''
         insert a new row with the values of the current object
@@ -251,16 +309,10 @@ class Expense:
 
         self.id = sql.CURSOR.lastrowid
         type(self).all[self.id] = self
+        sql.mark_clean(self)
 
     def update(self):
         '''
-        update the table row corresponding to the current instance
+        update the changed columns of the table row corresponding to the current instance
         '''
-        query = """
-            UPDATE expenses
-            SET descr = ?, category = ?, amount = ?, exp_date = ?, unit_id = ?
-            WHERE id = ?
-        """
-        sql.CURSOR.execute(query, (self.descr, self.category, self.amount, 
-                             self.exp_date, self.unit_id, self.id))
-        sql.CONN.commit()
\ No newline at end of file
+        sql.update(self)
\ No newline at end of file
@@ -2,10 +2,10 @@ import pandas as pd
 from datetime import datetime
 
 # project modules
-from lib import Unit
 from lib import Tenant
 from lib.helper import validation as val
 from lib.helper import sql_helper as sql
+from lib.helper import metrics
 
 class Payment:
     '''
@@ -13,10 +13,16 @@ class Payment:
 
     Constants
     ---------
+    TABLE: str
+        - name of the table which persists instances
+    DB_COLUMNS: tuple
+        - columns of the table which persists instances (in row order)
     DF_COLUMNS: tuple
         - columns to be used for Payment dataframes
     VALIDATION_DICT: dict
         - dictionary containing validation functions to apply when user makes DB edits
+    PARENT_DICT: dict
+        - dictionary containing parent class for each parent id attribute
 
     Class Attributes
     ---------
@@ -42,7 +48,8 @@ class Payment:
     ---------
     - delete: delete the table row corresponding to the current instance
     - save: insert a new row with the values of the current object
-    - update: update the table row corresponding to the current instance
+    - update: update the changed columns of the table row corresponding to the current instance
+    - tenant: returns tenant associated with current payment (with its unit preloaded)
     - print_receipt: generates and prints receipt to pdf for a single payment
 
     Class Methods
@@ -54,8 +61,13 @@ class Payment:
     - get_all_instances: return a list containing one instance per table row
     - get_dataframe: return a Pandas DataFrame containing information from table
     - get_dataframe_w_unit: return a Pandas DataFrame which includes unit ID
+    - afind_by_id: async version of find_by_id
+    - aget_all_instances: async version of get_all_instances
+    - aget_dataframe: async version of get_dataframe
     - create_table: create a new table to persist the attributes of all instances
     '''
+    TABLE = "payments"
+    DB_COLUMNS = ("id", "category", "amount", "pmt_date", "method", "tenant_id")
     DF_COLUMNS = ("id", "Category", "Amount", "Date", "Method", "Tenant ID")
     VALIDATION_DICT = {
         "amount": val.dollar_amt_validation,
@@ -63,6 +75,7 @@ class Payment:
         "method": val.method_validation,
         "category": val.pmt_category_validation
         }
+    PARENT_DICT = {"tenant_id": Tenant}
 
     # Dictionary of objects saved to the database.
     all = {}
@@ -93,6 +106,9 @@ class Payment:
         self.category = category
         self.tenant_id = tenant_id
 
+        # table row the instance was loaded from, changed attributes are written by update
+        self._row = None
+
     def __repr__(self):
         return (
             f"<Payment {self.id}: {self.category}, {self.pmt_date}, {self.amount}, {self.method}, "
@@ -170,17 +186,21 @@ class Payment:
         method = row[4]
         tenant_id = row[5]
         
-        if payment:
-            # ensure attributes match row values in case local object was modified
-            payment.category = category
-            payment.amount = amount
-            payment.pmt_date = pmt_date
-            payment.method = method
-            payment.tenant_id = tenant_id
-        else:
-            # not in dictionary, create new instance and add to dictionary
-            payment = cls(amount, pmt_date, method, tenant_id, category, id) # reordering due to optional values
-            cls.all[payment.id] = payment
+        # parent ids from the table are not looked up again
+        with val.rows_from_db():
+            if payment:
+                # ensure attributes match row values in case local object was modified
+                payment.category = category
+                payment.amount = amount
+                payment.pmt_date = pmt_date
+                payment.method = method
+                payment.tenant_id = tenant_id
+            else:
+                # not in dictionary, create new instance and add to dictionary
+                payment = cls(amount, pmt_date, method, tenant_id, category, id) # reordering due to optional values
+                cls.all[payment.id] = payment
+
+        sql.mark_clean(payment, row)
         return payment
     
     # ///////////////////////////////////////////////////////////////
@@ -238,12 +258,34 @@ class Payment:
         JOIN tenants AS t
         ON p.tenant_id = t.id
         """
-        sql.CURSOR.execute(query)
-
-        rows = sql.CURSOR.fetchall()
+        rows = sql.get_cursor().execute(query).fetchall()
 
         return pd.DataFrame(rows, columns=cls.DF_COLUMNS + ('Unit',))
     
+    # ///////////////////////////////////////////////////////////////
+    # ASYNC READS
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        '''
+        async version of find_by_id (runs in the read pool so the event loop is not blocked)
+        '''
+        return await sql.afind_by_id(cls, "payments", id)
+
+    @classmethod
+    async def aget_all_instances(cls):
+        '''
+        async version of get_all_instances
+        '''
+        return await sql.aget_all(cls, "payments", output_as_instances=True)
+
+    @classmethod
+    async def aget_dataframe(cls):
+        '''
+        async version of get_dataframe
+        '''
+        return await sql.aget_all(cls, "payments", output_as_instances=False)
+
     # ///////////////////////////////////////////////////////////////
     # CLASS-SPECIFIC DATABASE FUNCTIONS
 
@@ -251,6 +293,7 @@ class Payment:
     def create_table(cls):
         '''
         create a new table to persist the attributes of all instances
+        (also adds generated date columns and indexes to an existing table)
         '''
         query = """
             CREATE TABLE IF NOT EXISTS payments (
@@ -265,6 +308,12 @@ class Payment:
         sql.CURSOR.execute(query)
         sql.CONN.commit()
 
+        # integer date parts so date filters and year/month grouping can use indexes
+        sql.add_generated_columns("payments", sql.date_part_columns("pmt_date", "pmt"))
+        sql.create_indexes("payments", [('tenant_id', 'pmt_day'), ('pmt_year', 'pmt_month')])
+
+        sql.track_table_version("payments")
+
     def save(self):
         '''
         insert a new row with the values of the current object
@@ -281,21 +330,26 @@ class Payment:
 
         self.id = sql.CURSOR.lastrowid
         type(self).all[self.id] = self
+        sql.mark_clean(self)
 
     def update(self):
         '''
-        update the table row corresponding to the current instance
+        update the changed columns of the table row corresponding to the current instance
         '''
-        query = """
-            UPDATE payments
-            SET category = ?, amount = ?, pmt_date = ?, method = ?, tenant_id = ?
-            WHERE id = ?
-        """
-        sql.CURSOR.execute(query, (self.category, self.amount, 
-                             self.pmt_date, self.method, 
-                             self.tenant_id, self.id))
-        sql.CONN.commit()
+        sql.update(self)
+
+    def tenant(self):
+        '''
+        returns tenant associated with current payment (with its unit preloaded)
+        '''
+        tenant = Tenant.all.get(self.tenant_id)
+
+        if tenant and tenant._unit is not None and tenant._unit.id == tenant.unit_id:
+            return tenant
+
+        return Tenant.find_with_unit(self.tenant_id)
 
+    @metrics.counted(metrics.RECEIPTS, metrics.RECEIPT_SECONDS)
     def print_receipt(self, path):
         '''
         generates and prints receipt to pdf for a single payment
@@ -306,8 +360,8 @@ class Payment:
         from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
         from reportlab.lib import colors
 
-        tenant = Tenant.find_by_id(self.tenant_id)
-        unit = Unit.find_by_id(tenant.unit_id)
+        tenant = self.tenant()
+        unit = tenant.unit()
 
         doc = SimpleDocTemplate(path)
 
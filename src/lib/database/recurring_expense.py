@@ -0,0 +1,341 @@
+# project modules
+from lib import Unit
+from lib.helper import validation as val
+from lib.helper import sql_helper as sql
+
+class RecurringExpense:
+    '''
+    A class to create and manage recurring expense templates in DB (e.g. mortgage, property mgmt fee)
+
+    Constants
+    ---------
+    TABLE: str
+        - name of the table which persists instances
+    DB_COLUMNS: tuple
+        - columns of the table which persists instances (in row order)
+    DF_COLUMNS: tuple
+        - columns to be used for RecurringExpense dataframes
+    VALIDATION_DICT: dict
+        - dictionary containing validation functions to apply when user makes DB edits
+    PARENT_DICT: dict
+        - dictionary containing parent class for each parent id attribute
+
+    Class Attributes
+    ---------
+    all: dict
+        - dictionary of objects saved to the database
+
+    Instance Attributes
+    ---------
+    id: int
+        - unique identifier for instance
+    descr: str
+        - description used for each expense created from the template
+    category: str
+        - expense category
+    amount: float
+        - dollar value of each expense
+    cadence: str
+        - how often the expense is incurred (e.g. monthly)
+    start_date: str
+        - date the first expense is incurred (later expenses fall on the same day of the month)
+    end_date: str
+        - date after which no more expenses are incurred (None if ongoing)
+    unit_id: int
+        - id of parent unit
+
+    Instance Methods
+    ---------
+    - delete: delete the table row corresponding to the current instance
+    - save: insert a new row with the values of the current object
+    - update: update the changed columns of the table row corresponding to the current instance
+
+    Class Methods
+    ---------
+    - create: initialize a new instance and save the object to the database
+    - instance_from_db: return instance having the attribute values from the table row
+    - drop_table: drop the table that persists instances
+    - find_by_id: return object corresponding to the table row matching the specified primary key
+    - get_all_instances: return a list containing one instance per table row
+    - get_dataframe: return a Pandas DataFrame containing information from table
+    - afind_by_id: async version of find_by_id
+    - aget_all_instances: async version of get_all_instances
+    - aget_dataframe: async version of get_dataframe
+    - create_table: create a new table to persist the attributes of all instances
+    '''
+    TABLE = "recurring_expenses"
+    DB_COLUMNS = ("id", "descr", "category", "amount", "cadence", "start_date", "end_date", "unit_id")
+    DF_COLUMNS = ("id", "Description", "Category", "Amount", "Cadence", "Start Date", "End Date", "Unit")
+    VALIDATION_DICT = {
+        "descr": val.descr_validation,
+        "category": val.exp_category_validation,
+        "amount": val.dollar_amt_validation,
+        "cadence": val.cadence_validation,
+        "start_date": val.date_validation,
+        "end_date": val.optional_date_validation
+        }
+    PARENT_DICT = {"unit_id": Unit}
+
+    # Dictionary of objects saved to the database.
+    all = {}
+
+    def __init__(self, descr, category, amount, cadence, start_date, unit_id, end_date=None, id=None):
+        '''
+        Constructs the necessary attributes for the RecurringExpense object.
+
+        Parameters
+        ---------
+        descr: str
+            - description used for each expense created from the template
+        category: str
+            - expense category
+        amount: float
+            - dollar value of each expense
+        cadence: str
+            - how often the expense is incurred (e.g. monthly)
+        start_date: str
+            - date the first expense is incurred
+        unit_id: int
+            - id of parent unit
+        end_date (optional): str
+            - date after which no more expenses are incurred
+        id: int
+            - unique identifier for instance
+        '''
+        self.id = id
+        self.descr = descr
+        self.category = category
+        self.amount = amount
+        self.cadence = cadence
+        self.start_date = start_date
+        self.end_date = end_date
+        self.unit_id = unit_id
+
+        # table row the instance was loaded from, changed attributes are written by update
+        self._row = None
+
+    def __repr__(self):
+        end_txt = self.end_date if self.end_date else 'Present'
+        return (
+            f"<recurring expense {self.id}: {self.descr}, {self.category}, {self.amount} {self.cadence}, "
+            + f"{self.start_date} to {end_txt}, Unit: {self.unit_id}>"
+        )
+
+    # ///////////////////////////////////////////////////////////////
+    # VALIDATION OF INPUTS
+
+    @property
+    def descr(self):
+        return self._descr
+
+    @descr.setter
+    def descr(self, descr):
+        self._descr = val.descr_validation(descr)
+
+    @property
+    def category(self):
+        return self._category
+
+    @category.setter
+    def category(self, category):
+        self._category = val.exp_category_validation(category)
+
+    @property
+    def amount(self):
+        return self._amount
+
+    @amount.setter
+    def amount(self, amount):
+        self._amount = val.dollar_amt_validation(amount)
+
+    @property
+    def cadence(self):
+        return self._cadence
+
+    @cadence.setter
+    def cadence(self, cadence):
+        self._cadence = val.cadence_validation(cadence)
+
+    @property
+    def start_date(self):
+        return self._start_date
+
+    @start_date.setter
+    def start_date(self, start_date):
+        self._start_date = val.date_validation(start_date)
+
+    @property
+    def end_date(self):
+        return self._end_date
+
+    @end_date.setter
+    def end_date(self, end_date):
+        self._end_date = val.optional_date_validation(end_date)
+
+    @property
+    def unit_id(self):
+        return self._unit_id
+
+    @unit_id.setter
+    def unit_id(self, unit_id):
+        self._unit_id = val.parent_id_validation(unit_id, Unit)
+
+    # ///////////////////////////////////////////////////////////////
+    # MANAGE CLASS INSTANCES
+
+    @classmethod
+    def create(cls, descr, category, amount, cadence, start_date, unit_id, end_date=None):
+        '''
+        initialize a new instance and save the object to the database
+        '''
+        recurring_expense = cls(descr, category, amount, cadence, start_date, unit_id, end_date)
+        recurring_expense.save()
+        return recurring_expense
+
+    @classmethod
+    def instance_from_db(cls, row):
+        '''
+        return instance having the attribute values from the table row
+        '''
+        # Check the dictionary for  existing instance using the row's primary key
+        recurring_expense = cls.all.get(row[0])
+
+        id = row[0]
+        descr = row[1]
+        category = row[2]
+        amount = row[3]
+        cadence = row[4]
+        start_date = row[5]
+        end_date = row[6]
+        unit_id = row[7]
+
+        # parent ids from the table are not looked up again
+        with val.rows_from_db():
+            if recurring_expense:
+                # ensure attributes match row values in case local object was modified
+                recurring_expense.descr = descr
+                recurring_expense.category = category
+                recurring_expense.amount = amount
+                recurring_expense.cadence = cadence
+                recurring_expense.start_date = start_date
+                recurring_expense.end_date = end_date
+                recurring_expense.unit_id = unit_id
+            else:
+                # not in dictionary, create new instance and add to dictionary
+                recurring_expense = cls(descr, category, amount, cadence, start_date, unit_id, end_date, id) # reordering due to optional values
+                cls.all[recurring_expense.id] = recurring_expense
+
+        sql.mark_clean(recurring_expense, row)
+        return recurring_expense
+
+    # ///////////////////////////////////////////////////////////////
+    # GENERIC DATABASE FUNCTIONS
+
+    @classmethod
+    def drop_table(cls):
+        '''
+        drop the table that persists instances
+        '''
+        sql.drop_table("recurring_expenses")
+
+    @classmethod
+    def find_by_id(cls, id):
+        '''
+        return object corresponding to the table row matching the specified primary key
+        '''
+        return sql.find_by_id(cls, "recurring_expenses", id)
+
+    def delete(self):
+        '''
+        delete the table row corresponding to the current instance
+        (expenses already created from the template are kept)
+        '''
+        sql.delete(self, "recurring_expenses")
+
+    @classmethod
+    def get_all_instances(cls):
+        '''
+        return a list containing one instance per table row
+        '''
+        return sql.get_all(cls, "recurring_expenses", output_as_instances=True)
+
+    @classmethod
+    def get_dataframe(cls):
+        '''
+        return a Pandas DataFrame containing information from table
+        '''
+        return sql.get_all(cls, "recurring_expenses", output_as_instances=False)
+
+    # ///////////////////////////////////////////////////////////////
+    # ASYNC READS
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        '''
+        async version of find_by_id (runs in the read pool so the event loop is not blocked)
+        '''
+        return await sql.afind_by_id(cls, "recurring_expenses", id)
+
+    @classmethod
+    async def aget_all_instances(cls):
+        '''
+        async version of get_all_instances
+        '''
+        return await sql.aget_all(cls, "recurring_expenses", output_as_instances=True)
+
+    @classmethod
+    async def aget_dataframe(cls):
+        '''
+        async version of get_dataframe
+        '''
+        return await sql.aget_all(cls, "recurring_expenses", output_as_instances=False)
+
+    # ///////////////////////////////////////////////////////////////
+    # CLASS-SPECIFIC DATABASE FUNCTIONS
+
+    @classmethod
+    def create_table(cls):
+        '''
+        create a new table to persist the attributes of all instances
+        '''
+        query = """
+            CREATE TABLE IF NOT EXISTS recurring_expenses (
+            id INTEGER PRIMARY KEY,
+            descr TEXT,
+            category TEXT,
+            amount FLOAT,
+            cadence TEXT,
+            start_date DATE,
+            end_date DATE,
+            unit_id INTEGER,
+            FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE CASCADE)
+        """
+        sql.CURSOR.execute(query)
+        sql.CONN.commit()
+
+        sql.create_indexes("recurring_expenses", [('unit_id',)])
+
+        sql.track_table_version("recurring_expenses")
+
+    def save(self):
+        '''
+        insert a new row with the values of the current object
+        '''
+        query = """
+            INSERT INTO recurring_expenses (descr, category, amount, cadence, start_date, end_date, unit_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+
+        sql.CURSOR.execute(query, (self.descr, self.category, self.amount, self.cadence,
+                             self.start_date, self.end_date, self.unit_id))
+        sql.CONN.commit()
+
+        self.id = sql.CURSOR.lastrowid
+        type(self).all[self.id] = self
+        sql.mark_clean(self)
+
+    def update(self):
+        '''
+        update the changed columns of the table row corresponding to the current instance
+        '''
+        sql.update(self)
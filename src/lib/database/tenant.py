@@ -11,10 +11,16 @@ class Tenant:
 
     Constants
     ---------
+    TABLE: str
+        - name of the table which persists instances
+    DB_COLUMNS: tuple
+        - columns of the table which persists instances (in row order)
     DF_COLUMNS: tuple
         - columns to be used for Tenant dataframes
     VALIDATION_DICT: dict
         - dictionary containing validation functions to apply when user makes DB edits
+    PARENT_DICT: dict
+        - dictionary containing parent class for each parent id attribute
 
     Class Attributes
     ---------
@@ -42,9 +48,14 @@ class Tenant:
     ---------
     - delete: delete the table row corresponding to the current instance
     - save: insert a new row with the values of the current object
-    - update: update the table row corresponding to the current instance
+    - update: update the changed columns of the table row corresponding to the current instance
     - payments: returns list of payments associated with current unit
+    - payment_index: returns date-sorted PaymentIndex of payments associated with current tenant
+    - unit: returns unit associated with current tenant
     - get_rollforward: creates and returns a detailed payment rollforward for tenant
+    - balance: returns balance owed by tenant from the ledger
+    - ledger: returns ledger entries of tenant with running balances
+    - aget_rollforward: async version of get_rollforward
 
     Class Methods
     ---------
@@ -54,8 +65,16 @@ class Tenant:
     - find_by_id: return object corresponding to the table row matching the specified primary key
     - get_all_instances: return a list containing one instance per table row
     - get_dataframe: return a Pandas DataFrame containing information from table
+    - get_active_instances: return a list of tenants who have not moved out as of today
+    - afind_by_id: async version of find_by_id
+    - aget_all_instances: async version of get_all_instances
+    - aget_dataframe: async version of get_dataframe
+    - aget_active_instances: async version of get_active_instances
+    - find_with_unit: return tenant matching the specified primary key with its unit preloaded
     - create_table: create a new table to persist the attributes of all instances
     '''
+    TABLE = "tenants"
+    DB_COLUMNS = ("id", "name", "email_address", "phone_number", "move_in_date", "move_out_date", "unit_id")
     DF_COLUMNS = ("id", "Name", "Email Address", "Phone Number", "Move In Date", "Move Out Date", "Unit ID")
     VALIDATION_DICT = {
         "name": val.name_validation, 
@@ -64,6 +83,7 @@ class Tenant:
         "move_in_date": val.date_validation,
         "move_out_date": val.optional_date_validation
         }
+    PARENT_DICT = {"unit_id": Unit}
 
     # Dictionary of objects saved to the database.
     all = {}
@@ -97,6 +117,12 @@ class Tenant:
         self.move_out_date = move_out_date        
         self.unit_id = unit_id
 
+        # unit preloaded by find_with_unit
+        self._unit = None
+
+        # table row the instance was loaded from, changed attributes are written by update
+        self._row = None
+
     def __repr__(self):
         move_out_txt = self.move_out_date if self.move_out_date else 'Present'
         return (
@@ -185,18 +211,22 @@ class Tenant:
         move_out_date = row[5]
         unit_id = row[6]
     
-        if tenant:
-            # ensure attributes match row values in case local instance was modified
-            tenant.name = name
-            tenant.email_address = email_address
-            tenant.phone_number = phone_number
-            tenant.move_in_date = move_in_date
-            tenant.move_out_date = move_out_date
-            tenant.unit_id = unit_id
-        else:
-            # not in dictionary, create new instance and add to dictionary
-            tenant = cls(name, email_address, phone_number, unit_id, move_in_date, move_out_date, id) # reordering due to optional values
-            cls.all[tenant.id] = tenant
+        # parent ids from the table are not looked up again
+        with val.rows_from_db():
+            if tenant:
+                # ensure attributes match row values in case local instance was modified
+                tenant.name = name
+                tenant.email_address = email_address
+                tenant.phone_number = phone_number
+                tenant.move_in_date = move_in_date
+                tenant.move_out_date = move_out_date
+                tenant.unit_id = unit_id
+            else:
+                # not in dictionary, create new instance and add to dictionary
+                tenant = cls(name, email_address, phone_number, unit_id, move_in_date, move_out_date, id) # reordering due to optional values
+                cls.all[tenant.id] = tenant
+
+        sql.mark_clean(tenant, row)
         return tenant
     
     # ///////////////////////////////////////////////////////////////
@@ -236,6 +266,98 @@ class Tenant:
         '''
         return sql.get_all(cls, "tenants", output_as_instances=False)
     
+    @classmethod
+    def get_active_instances(cls):
+        '''
+        return a list of tenants who have not moved out as of today
+        '''
+        return sql.instances_from_rows(cls, cls._active_rows())
+
+    @classmethod
+    def _active_rows(cls):
+        '''
+        return table rows of tenants who have not moved out as of today
+        '''
+        query = f"""
+            SELECT {sql.column_list(cls)} FROM tenants
+            WHERE move_out_day IS NULL OR move_out_day > ?
+        """
+        return sql.get_cursor().execute(query, (sql.today_ordinal(),)).fetchall()
+
+    # ///////////////////////////////////////////////////////////////
+    # ASYNC READS
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        '''
+        async version of find_by_id (runs in the read pool so the event loop is not blocked)
+        '''
+        return await sql.afind_by_id(cls, "tenants", id)
+
+    @classmethod
+    async def aget_all_instances(cls):
+        '''
+        async version of get_all_instances
+        '''
+        return await sql.aget_all(cls, "tenants", output_as_instances=True)
+
+    @classmethod
+    async def aget_dataframe(cls):
+        '''
+        async version of get_dataframe
+        '''
+        return await sql.aget_all(cls, "tenants", output_as_instances=False)
+
+    @classmethod
+    async def aget_active_instances(cls):
+        '''
+        async version of get_active_instances (rows are read in the pool, instances are built on the calling thread)
+        '''
+        return sql.instances_from_rows(cls, await sql.run_read(cls._active_rows))
+
+    async def aget_rollforward(self):
+        '''
+        async version of get_rollforward (the unit is loaded on the calling thread, the rollforward is built in the pool)
+        '''
+        if self._unit is None or self._unit.id != self.unit_id:
+            self._unit = await Unit.afind_by_id(self.unit_id)
+
+        return await sql.run_read(self._build_rollforward, self._unit)
+
+    # ///////////////////////////////////////////////////////////////
+    # PRELOADING OF LINKED TABLES
+
+    @classmethod
+    def _instance_with_unit_from_db(cls, row):
+        '''
+        return tenant from a row containing tenant columns followed by unit columns
+        '''
+        n_cols = len(cls.DB_COLUMNS)
+        unit = Unit.instance_from_db(row[n_cols:]) # load unit first so unit_id validation hits the cache
+        tenant = cls.instance_from_db(row[:n_cols])
+        tenant._unit = unit
+        return tenant
+
+    @classmethod
+    def find_with_unit(cls, id):
+        '''
+        return tenant matching the specified primary key with its unit preloaded (single query)
+        '''
+        query = f"""
+            SELECT {sql.column_list(cls, 't')}, {sql.column_list(Unit, 'u')}
+            FROM tenants AS t
+            JOIN units AS u
+            ON t.unit_id = u.id
+            WHERE t.id = ?
+        """
+        row = sql.get_cursor().execute(query, (id,)).fetchone()
+        if not row:
+            return None
+
+        sql.count_hydrated(Unit, [row], id_index=len(cls.DB_COLUMNS))
+        sql.count_hydrated(cls, [row])
+        return cls._instance_with_unit_from_db(row)
+
     # ///////////////////////////////////////////////////////////////
     # CLASS-SPECIFIC DATABASE FUNCTIONS
 
@@ -243,6 +365,7 @@ class Tenant:
     def create_table(cls):
         '''
         create a new table to persist the attributes of all instances
+        (also adds generated date columns and indexes to an existing table)
         '''
         query = """
             CREATE TABLE IF NOT EXISTS tenants (
@@ -258,6 +381,16 @@ class Tenant:
         sql.CURSOR.execute(query)
         sql.CONN.commit()
 
+        # integer date parts so date filters and year/month grouping can use indexes
+        generated_columns = {
+            **sql.date_part_columns("move_in_date", "move_in"),
+            **sql.date_part_columns("move_out_date", "move_out")
+        }
+        sql.add_generated_columns("tenants", generated_columns)
+        sql.create_indexes("tenants", [('unit_id', 'move_in_day'), ('move_in_day', 'move_out_day')])
+
+        sql.track_table_version("tenants")
+
     def save(self):
         '''
         insert a new row with the values of the current object
@@ -275,21 +408,13 @@ class Tenant:
 
         self.id = sql.CURSOR.lastrowid
         type(self).all[self.id] = self
+        sql.mark_clean(self)
 
     def update(self):
         '''
-        update the table row corresponding to the current instance
+        update the changed columns of the table row corresponding to the current instance
         '''
-        query = """
-            UPDATE tenants
-            SET name = ?, email_address = ?, phone_number = ?, move_in_date = ?, move_out_date = ?, unit_id = ?
-            WHERE id = ?
-        """
-        sql.CURSOR.execute(query, (self.name, 
-                             self.email_address, self.phone_number,
-                             self.move_in_date, self.move_out_date,
-                             self.unit_id, self.id))
-        sql.CONN.commit()
+        sql.update(self)
 
     # ///////////////////////////////////////////////////////////////
     # LOOKUPS FROM LINKED TABLES
@@ -299,95 +424,69 @@ class Tenant:
         returns list of payments associated with current unit
         '''        
         from lib import Payment
-        query = """
-            SELECT * FROM payments
+
+        query = f"""
+            SELECT {sql.column_list(Payment)} FROM payments
             WHERE tenant_id = ?
         """
-        sql.CURSOR.execute(query, (self.id,),)
+        rows = sql.get_cursor().execute(query, (self.id,),).fetchall()
 
-        rows = sql.CURSOR.fetchall()
+        if output_as_instances:
+            sql.count_hydrated(Payment, rows)
 
         output = [Payment.instance_from_db(row) for row in rows] \
             if output_as_instances else pd.DataFrame(rows, columns=Payment.DF_COLUMNS)
 
         return output
-    
-    def get_rollforward(self):
+
+    def payment_index(self):
         '''
-        creates and returns a detailed payment rollforward for tenant
+        returns date-sorted PaymentIndex of payments associated with current tenant
         '''
-        from datetime import datetime, timedelta
-        from dateutil.relativedelta import relativedelta
-
-        payments = self.payments(output_as_instances=True)
-        payments.sort(key=lambda p: p.pmt_date)
-        unit = Unit.find_by_id(self.unit_id)
-
-        pmt_start_date = datetime.strptime(self.move_in_date, '%Y-%m-%d')
-        pmt_stop_date = datetime.strptime(self.move_out_date, '%Y-%m-%d') if self.move_out_date else datetime.now()
+        from lib.helper.payment_index import PaymentIndex
 
-        BOP = pmt_start_date
-        back_due = 0
-        rollforward_data = []
+        return PaymentIndex.build_all([self.id])[self.id]
 
-        while BOP < pmt_stop_date:
-            payments_applied = []
-
-            EOP = BOP + relativedelta(months=1)
-            date_late = BOP + relativedelta(days=11)
-
-            for payment in payments[:]:
-                pmt_date = datetime.strptime(payment.pmt_date, '%Y-%m-%d')
-                if pmt_date >= EOP:
-                    break
-
-                payments.remove(payment)  # Remove the payment from the list
-                if payment.category=='rent':
-                    payments_applied.append(payment)  # Add it to payments_applied
-
-            bop_due = unit.monthly_rent + back_due
-
-            BOP_dict = {
-                'Due Date': BOP,
-                'Rent Due': unit.monthly_rent,
-                'Back Due': back_due,
-                'BOP Due': bop_due
-            }
-
-            payment_dict = {}
-            rent_paid = 0
-            rent_paid_on_time = 0
-
-            for i, payment in enumerate(payments_applied, start=1):
-                pmt_date = datetime.strptime(payment.pmt_date, '%Y-%m-%d')
-                payment_info = {
-                    f'Pmt {i}: Check no.': payment.id,
-                    f'Pmt {i}: Method': payment.method,
-                    f'Pmt {i}: Date': payment.pmt_date,
-                    f'Pmt {i}: Amount': payment.amount,
-                }
-                rent_paid += payment.amount
-                rent_paid_on_time += rent_paid * (pmt_date < date_late)
+    def unit(self):
+        '''
+        returns unit associated with current tenant
+        '''
+        if self._unit is not None and self._unit.id == self.unit_id:
+            return self._unit
 
-                payment_dict = {**payment_dict, **payment_info}
+        self._unit = Unit.find_by_id(self.unit_id)
+        return self._unit
+    
+    def get_rollforward(self):
+        '''
+        creates and returns a detailed payment rollforward for tenant
+        '''
+        return self._build_rollforward(self.unit())
 
-            # determine if tenant owes a late fee
-            late = (unit.monthly_rent - rent_paid_on_time) > 0
-            late_fee_owed = late*unit.late_fee
+    def _build_rollforward(self, unit):
+        '''
+        creates payment rollforward for tenant from their unit and raw payment and rent history rows
+        (builds no instances, so it can run in the read pool)
+        '''
+        from lib.helper import rollforward as rf
+        from lib.helper.rent_history import RentSchedule
 
-            rent_owed = unit.monthly_rent - rent_paid
-            total_owed = late_fee_owed + rent_owed
-            back_due += total_owed
+        return rf.build_rollforward(self.move_in_date, self.move_out_date, 
+                                    unit.monthly_rent, unit.late_fee, self.payment_index(),
+                                    RentSchedule.build([unit.id]), unit.id)
 
-            EOP_dict = {
-                'Late Fee': late_fee_owed,
-                'Rent Owed': rent_owed,
-                'Total Owed': total_owed,
-                'EOP Due': back_due
-            }
+    def balance(self, as_of_date=None):
+        '''
+        returns balance owed by tenant from the ledger (charges minus payments, one index lookup)
+        '''
+        from lib.helper import ledger
 
-            rollforward_data.append({**BOP_dict, **payment_dict, **EOP_dict})
+        return ledger.get_balance(self.id, as_of_date)
 
-            BOP += relativedelta(months=1)
+    def ledger(self):
+        '''
+        returns ledger entries of tenant with running balances
+        '''
+        from lib.helper import ledger
 
-        return pd.DataFrame(rollforward_data)
+        return ledger.get_statement(self.id)
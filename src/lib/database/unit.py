@@ -10,10 +10,16 @@ class Unit:
 
     Constants
     ---------
+    TABLE: str
+        - name of the table which persists instances
+    DB_COLUMNS: tuple
+        - columns of the table which persists instances (in row order)
     DF_COLUMNS: tuple
         - columns to be used for Unit dataframes
     VALIDATION_DICT: dict
         - dictionary containing validation functions to apply when user makes DB edits
+    PARENT_DICT: dict
+        - dictionary containing parent class for each parent id attribute
 
     Class Attributes
     ---------
@@ -39,7 +45,7 @@ class Unit:
     ---------
     - delete: delete the table row corresponding to the current instance
     - save: insert a new row with the values of the current object
-    - update: update the table row corresponding to the current instance
+    - update: update the changed columns of the table row corresponding to the current instance
     - tenants: returns list of tenants associated with current unit
     - expenses: returns list of expenses associated with current unit
     - transactions: returns list of transactions associated with current unit
@@ -52,8 +58,13 @@ class Unit:
     - find_by_id: return object corresponding to the table row matching the specified primary key
     - get_all_instances: return a list containing one instance per table row
     - get_dataframe: return a Pandas DataFrame containing information from table
+    - afind_by_id: async version of find_by_id
+    - aget_all_instances: async version of get_all_instances
+    - aget_dataframe: async version of get_dataframe
     - create_table: create a new table to persist the attributes of all instances
     '''
+    TABLE = "units"
+    DB_COLUMNS = ("id", "acquisition_date", "address", "monthly_mortgage", "monthly_rent", "late_fee")
     DF_COLUMNS = ("id", "Acquisition Date", "Address", "Monthly Mortgage", "Monthly Rent", "Late Fee")
     VALIDATION_DICT = {
         "acquisition_date": val.date_validation, 
@@ -62,6 +73,7 @@ class Unit:
         "monthly_rent": val.dollar_amt_validation,
         "late_fee": val.dollar_amt_validation
         }
+    PARENT_DICT = {}
 
     # Dictionary of objects saved to the database.
     all = {}
@@ -92,6 +104,9 @@ class Unit:
         self.monthly_rent = monthly_rent
         self.late_fee = late_fee
 
+        # table row the instance was loaded from, changed attributes are written by update
+        self._row = None
+
     def __repr__(self):
         address_parsed = self.address.replace("\n", ", ")
         return (
@@ -183,6 +198,8 @@ class Unit:
             # not in dictionary, create new instance and add to dictionary
             unit = cls(acquisition_date, address, monthly_mortgage, monthly_rent, late_fee, id)
             cls.all[unit.id] = unit
+
+        sql.mark_clean(unit, row)
         return unit
     
     # ///////////////////////////////////////////////////////////////
@@ -222,6 +239,30 @@ class Unit:
         '''
         return sql.get_all(cls, "units", output_as_instances=False)
     
+    # ///////////////////////////////////////////////////////////////
+    # ASYNC READS
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        '''
+        async version of find_by_id (runs in the read pool so the event loop is not blocked)
+        '''
+        return await sql.afind_by_id(cls, "units", id)
+
+    @classmethod
+    async def aget_all_instances(cls):
+        '''
+        async version of get_all_instances
+        '''
+        return await sql.aget_all(cls, "units", output_as_instances=True)
+
+    @classmethod
+    async def aget_dataframe(cls):
+        '''
+        async version of get_dataframe
+        '''
+        return await sql.aget_all(cls, "units", output_as_instances=False)
+
     # ///////////////////////////////////////////////////////////////
     # CLASS-SPECIFIC DATABASE FUNCTIONS
 
@@ -229,6 +270,7 @@ class Unit:
     def create_table(cls):
         '''
         create a new table to persist the attributes of all instances
+        (also adds version tracking to an existing table)
         '''
         query = """
             CREATE TABLE IF NOT EXISTS units (
@@ -242,6 +284,8 @@ class Unit:
         sql.CURSOR.execute(query)
         sql.CONN.commit()
 
+        sql.track_table_version("units")
+
     def save(self):
         '''
         insert a new row with the values of the current object
@@ -256,20 +300,13 @@ class Unit:
 
         self.id = sql.CURSOR.lastrowid
         type(self).all[self.id] = self
+        sql.mark_clean(self)
 
     def update(self):
         '''
-        update the table row corresponding to the current instance
+        update the changed columns of the table row corresponding to the current instance
         '''
-        query = """
-            UPDATE units
-            SET acquisition_date = ?, address = ?, monthly_mortgage = ?, 
-            monthly_rent = ?, late_fee = ?
-            WHERE id = ?
-        """
-        sql.CURSOR.execute(query, (self.acquisition_date, self.address, self.monthly_mortgage, 
-                             self.monthly_rent, self.late_fee, self.id))
-        sql.CONN.commit()
+        sql.update(self)
 
     
     # ///////////////////////////////////////////////////////////////
@@ -281,13 +318,11 @@ class Unit:
         '''
         from lib import Tenant
 
-        query = """
-            SELECT * FROM tenants
+        query = f"""
+            SELECT {sql.column_list(Tenant)} FROM tenants
             WHERE unit_id = ?
         """
-        sql.CURSOR.execute(query, (self.id,),)
-
-        rows = sql.CURSOR.fetchall()
+        rows = sql.get_cursor().execute(query, (self.id,),).fetchall()
 
         return pd.DataFrame(rows, columns=Tenant.DF_COLUMNS)
 
@@ -296,13 +331,11 @@ class Unit:
         returns list of expenses associated with current unit
         '''
         from lib import Expense
-        query = """
-            SELECT * FROM expenses
+        query = f"""
+            SELECT {sql.column_list(Expense)} FROM expenses
             WHERE unit_id = ?
         """
-        sql.CURSOR.execute(query, (self.id,),)
-
-        rows = sql.CURSOR.fetchall()
+        rows = sql.get_cursor().execute(query, (self.id,),).fetchall()
 
         return pd.DataFrame(rows, columns=Expense.DF_COLUMNS)
     
@@ -0,0 +1,152 @@
+import csv
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from rich import print
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper import rollforward as rf
+
+def _init_worker():
+    '''
+    binds a dedicated read connection to the worker running this function
+    '''
+    sql.bind_read_connection()
+
+def _rollforward_chunk(tenant_ids, output_dir, long_format, date_today):
+    '''
+    computes rollforwards for a chunk of tenants using the connection bound to the worker
+
+    Parameters
+    ---------
+    tenant_ids: list
+        - ids of tenants to compute rollforwards for
+    output_dir: str
+        - folder to save per-tenant csv files in (ignored if long_format is True)
+    long_format: boolean
+        - indicates whether to return long format rows instead of writing per-tenant files
+    date_today: str
+        - date used in filenames
+
+    Returns
+    ---------
+    output: list
+        - rows in long format if long_format is True, else list of (tenant id, path, rows)
+    '''
+    tenants, payments, schedule = rf.load_rollforward_inputs(tenant_ids)
+    output = []
+
+    for id, name, move_in_date, move_out_date, unit_id, monthly_rent, late_fee in tenants:
+        tenant_payments = payments[id]
+
+        if long_format:
+            output.extend(rf.build_rollforward_long(id, name, move_in_date, move_out_date,
+                                                    monthly_rent, late_fee, tenant_payments, schedule, unit_id))
+            continue
+
+        df = rf.build_rollforward(move_in_date, move_out_date, monthly_rent, late_fee, tenant_payments,
+                                  schedule, unit_id)
+        filename = f"PAYMENTS_AS_OF_{date_today}_FOR_{name}_{id}".replace(' ', '_').upper()
+        path = os.path.join(output_dir, f"{filename}.csv")
+        df.to_csv(path)
+        output.append((id, path, len(df)))
+
+    return output
+
+def print_progress(done, total, elapsed):
+    '''
+    prints progress and throughput of a batch job on a single line
+
+    Parameters
+    ---------
+    done: int
+        - number of tenants processed so far
+    total: int
+        - total number of tenants to process
+    elapsed: float
+        - seconds since the job started
+    '''
+    rate = done / elapsed if elapsed else 0
+    print(f"[cyan]{done}/{total} tenants | {elapsed:,.1f}s | {rate:,.1f} tenants/s[/cyan]", end="\r")
+
+def export_rollforwards(tenant_ids=None, output_dir="./outputs", long_format=False,
+                        max_workers=None, chunksize=25, use_processes=False, progress=print_progress):
+    '''
+    computes payment rollforwards for a set of tenants in a worker pool and saves them to csv
+
+    Parameters
+    ---------
+    tenant_ids (optional): list
+        - ids of tenants to export (defaults to all tenants)
+    output_dir (optional): str
+        - folder to save csv files in
+    long_format (optional): boolean
+        - if True, writes one long-format file for all tenants instead of one file per tenant
+    max_workers (optional): int
+        - number of workers in the pool (each worker opens its own read connection)
+    chunksize (optional): int
+        - number of tenants handed to a worker at a time
+    use_processes (optional): boolean
+        - indicates whether to use a process pool instead of a thread pool
+    progress (optional): callable object
+        - called with (done, total, elapsed) as chunks complete (set to None to silence)
+
+    Returns
+    ---------
+    summary: dict
+        - tenants processed, rows written, output paths, elapsed seconds and throughput
+    '''
+    if tenant_ids is None:
+        tenant_ids = [row[0] for row in sql.CURSOR.execute("SELECT id FROM tenants ORDER BY id").fetchall()]
+    tenant_ids = list(tenant_ids)
+
+    date_today = datetime.now().strftime('%Y-%m-%d')
+    os.makedirs(output_dir, exist_ok=True)
+
+    chunks = [tenant_ids[i:i + chunksize] for i in range(0, len(tenant_ids), chunksize)]
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+
+    long_path = os.path.join(output_dir, f"PAYMENTS_AS_OF_{date_today}_FOR_ALL_TENANTS.csv")
+    paths = [long_path] if long_format else []
+    rows_written = 0
+    done = 0
+    start = time.perf_counter()
+
+    with executor_cls(max_workers=max_workers, initializer=_init_worker) as executor, \
+            open(long_path if long_format else os.devnull, 'w', newline='') as long_file:
+
+        writer = csv.writer(long_file)
+        if long_format:
+            writer.writerow(rf.LONG_COLUMNS)
+
+        futures = {executor.submit(_rollforward_chunk, chunk, output_dir, long_format, date_today): len(chunk)
+                   for chunk in chunks}
+
+        for future in as_completed(futures):
+            output = future.result()
+
+            if long_format:
+                writer.writerows(output)
+                rows_written += len(output)
+            else:
+                paths.extend(path for id, path, rows in output)
+                rows_written += sum(rows for id, path, rows in output)
+
+            done += futures[future]
+            if progress:
+                progress(done, len(tenant_ids), time.perf_counter() - start)
+
+    elapsed = time.perf_counter() - start
+
+    if progress:
+        print("")
+
+    return {
+        'tenants': len(tenant_ids),
+        'rows': rows_written,
+        'paths': paths,
+        'seconds': elapsed,
+        'tenants_per_second': len(tenant_ids) / elapsed if elapsed else 0
+    }
@@ -0,0 +1,187 @@
+import csv
+import gzip
+import io
+import os
+import time
+from rich import print
+
+# project modules
+from lib.helper import sql_helper as sql
+
+# file extension added for each supported compression
+COMPRESSIONS = {
+    None: "",
+    'gzip': ".gz",
+    'zstd': ".zst",
+}
+
+PREVIEW_ROWS = 20
+
+def open_output(path, compression=None):
+    '''
+    opens a text file for writing csv data, compressing it on the fly if requested
+
+    Parameters
+    ---------
+    path: str
+        - file path to write to
+    compression (optional): str
+        - compression to apply ('gzip' or 'zstd', defaults to none)
+
+    Returns
+    ---------
+    output: file object
+        - text file opened for writing
+    '''
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression must match one of the following: {list(COMPRESSIONS)}")
+
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', newline='', compresslevel=6)
+
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the zstandard package (pipenv install zstandard)")
+
+        raw = open(path, 'wb')
+        writer = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(writer, encoding='utf-8', newline='')
+
+    return open(path, 'w', newline='')
+
+def output_path(path, compression=None):
+    '''
+    returns file path with the extension of the compression added (if not already present)
+    '''
+    extension = COMPRESSIONS.get(compression, "")
+    return path if path.endswith(extension) else f"{path}{extension}"
+
+def print_progress(rows, seconds):
+    '''
+    prints number of rows written and throughput of an export on a single line
+    '''
+    rate = rows / seconds if seconds else 0
+    print(f"[cyan]{rows:,} rows | {seconds:,.1f}s | {rate:,.0f} rows/s[/cyan]", end="\r")
+
+def stream_query_to_csv(query, params, columns, path, compression=None, chunksize=5000,
+                        cursor=None, progress=None):
+    '''
+    writes the results of a query to csv in chunks without loading all rows into memory
+
+    Parameters
+    ---------
+    query: str
+        - SQL query to export
+    params: tuple
+        - parameters for the query
+    columns: list
+        - header row of the csv file
+    path: str
+        - file path to write to (extension of the compression is added if missing)
+    compression (optional): str
+        - compression to apply ('gzip' or 'zstd', defaults to none)
+    chunksize (optional): int
+        - number of rows fetched from the cursor and written at a time
+    cursor (optional): sqlite3 Cursor
+        - cursor to run query with (defaults to cursor bound to current thread)
+    progress (optional): callable object
+        - called with (rows, seconds) after each chunk
+
+    Returns
+    ---------
+    summary: dict
+        - rows written, output path, elapsed seconds and throughput
+    '''
+    path = output_path(path, compression)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # a separate cursor so the caller's cursor is free while rows are being streamed
+    cursor = cursor or sql.get_cursor().connection.cursor()
+    cursor.execute(query, params)
+
+    rows_written = 0
+    start = time.perf_counter()
+
+    with open_output(path, compression) as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+
+            writer.writerows(rows)
+            rows_written += len(rows)
+
+            if progress:
+                progress(rows_written, time.perf_counter() - start)
+
+    elapsed = time.perf_counter() - start
+
+    if progress:
+        print("")
+
+    return {
+        'rows': rows_written,
+        'path': path,
+        'seconds': elapsed,
+        'rows_per_second': rows_written / elapsed if elapsed else 0
+    }
+
+def preview_query(query, params, limit=PREVIEW_ROWS):
+    '''
+    retreives the first rows and total row count of a query without running the full export
+
+    Parameters
+    ---------
+    query: str
+        - SQL query to preview
+    params: tuple
+        - parameters for the query
+    limit (optional): int
+        - maximum number of rows to return
+
+    Returns
+    ---------
+    rows: list
+        - first rows returned by the query
+    total: int
+        - total number of rows the query returns
+    '''
+    cursor = sql.get_cursor()
+    rows = cursor.execute(f"SELECT * FROM ({query}) LIMIT ?", (*params, limit)).fetchall()
+    total = cursor.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+    return rows, total
+
+def export_transactions(path, unit_id=None, start_date=None, end_date=None, compression=None,
+                        chunksize=5000, progress=print_progress):
+    '''
+    streams transactions (payments, expenses) to csv
+
+    Parameters
+    ---------
+    path: str
+        - file path to write to (extension of the compression is added if missing)
+    unit_id (optional): int
+        - id of Unit to filter on (defaults to all units)
+    start_date (optional): str
+        - only include transactions made on or after this date (YYYY-MM-DD)
+    end_date (optional): str
+        - only include transactions made on or before this date (YYYY-MM-DD)
+    compression (optional): str
+        - compression to apply ('gzip' or 'zstd', defaults to none)
+    chunksize (optional): int
+        - number of rows fetched and written at a time
+    progress (optional): callable object
+        - called with (rows, seconds) after each chunk (set to None to silence)
+
+    Returns
+    ---------
+    summary: dict
+        - rows written, output path, elapsed seconds and throughput
+    '''
+    query, params, columns = sql.transactions_query(unit_id, start_date=start_date, end_date=end_date)
+    return stream_query_to_csv(query, params, columns, path, compression, chunksize, progress=progress)
@@ -0,0 +1,362 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# project modules
+from lib.helper import sql_helper as sql
+
+# same colors as the pdf report (matplotlib default cycle for categories)
+TYPE_COLORS = {'expense': 'red', 'payment': 'green', 'net': 'blue'}
+CATEGORY_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
+                   '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+def report_data(year, snapshot=None):
+    '''
+    aggregates everything the html report draws in one pass over the transactions
+
+    Parameters
+    ---------
+    year: int
+        - year for report
+    snapshot (optional): str
+        - snapshot folder to read transactions from instead of the DB
+
+    Returns
+    ---------
+    data: dict
+        - compact, column-oriented aggregates (embedded in the report as JSON):
+        - units: 'all' followed by each unit with transactions up to the report year
+        - years: every year up to the report year
+        - yearly: [expense, payment] per unit and year (in the order of units and years)
+        - categories: category names per transaction type
+        - category_totals: amount per unit and category in the report year, per transaction type
+        - vacancy: vacancy rate, lost rent and days per unit for the report year
+    '''
+    if snapshot:
+        from lib.helper.snapshot import read_transactions
+        df = read_transactions(snapshot, max_year=year)
+    else:
+        df = sql.get_all_transactions(max_year=year, with_year=True)
+
+    df_year = df[df['Year'] == year]
+    units = sorted(int(unit) for unit in df['Unit'].unique())
+    years = sorted({int(y) for y in df['Year'].unique()} | {year})
+
+    # totals by unit, year and type; the 'all' row is the sum over units
+    by_year = (df.groupby(['Unit', 'Year', 'Type'])['Amount'].sum()
+               .unstack('Type')
+               .reindex(columns=['expense', 'payment'])
+               .reindex(pd.MultiIndex.from_product([units, years], names=['Unit', 'Year']))
+               .fillna(0))
+    yearly = by_year.to_numpy().reshape(len(units), len(years), 2)
+    yearly = np.concatenate([df.groupby(['Year', 'Type'])['Amount'].sum().unstack('Type')
+                             .reindex(index=years, columns=['expense', 'payment']).fillna(0)
+                             .to_numpy()[np.newaxis], yearly])
+
+    categories = {}
+    category_totals = {}
+    for ttype in ('payment', 'expense'):
+        totals = (df_year[df_year['Type'] == ttype]
+                  .groupby(['Unit', 'Category'])['Amount'].sum()
+                  .unstack('Category')
+                  .reindex(units)
+                  .fillna(0))
+        values = totals.to_numpy(dtype=float)
+        categories[ttype] = [str(category) for category in totals.columns]
+        category_totals[ttype] = np.round(np.vstack([values.sum(axis=0), values]), 2).tolist()
+
+    from lib.helper.occupancy import OccupancyIndex
+    from lib.helper.snapshot import read_occupancy
+    index = read_occupancy(snapshot) if snapshot else OccupancyIndex.build()
+    vacancy = index.vacancy_for_year(year)
+
+    return {
+        'year': year,
+        'units': ['all', *units],
+        'years': years,
+        'yearly': np.round(yearly, 2).tolist(),
+        'categories': categories,
+        'category_totals': category_totals,
+        'vacancy': {
+            'units': [int(unit) for unit in vacancy.index],
+            'rate': np.round(vacancy['Vacancy Rate'].to_numpy(dtype=float), 4).tolist(),
+            'lost': np.round(vacancy['Lost Rent'].to_numpy(dtype=float), 2).tolist(),
+            'vacant_days': int(vacancy['Vacant Days'].sum()),
+            'available_days': int(vacancy['Available Days'].sum()),
+        },
+        'colors': {'types': TYPE_COLORS, 'categories': CATEGORY_COLORS},
+    }
+
+def generate_html_report(year, path, snapshot=None):
+    '''
+    generates and saves a single-file html report for specified year
+
+    Only aggregates are computed here; charts are drawn as SVG by the browser from the embedded JSON,
+    and unit pages are drawn as they are scrolled into view.
+
+    Parameters
+    ---------
+    year: int
+        - year for report
+    path: str
+        - file path to save report
+    snapshot (optional): str
+        - snapshot folder to read transactions from instead of the DB
+
+    Returns
+    ---------
+    summary: dict
+        - number of units, size of the file in bytes and elapsed seconds
+    '''
+    start = time.perf_counter()
+    data = report_data(year, snapshot)
+
+    # "</" would end the script element early
+    payload = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+    html = TEMPLATE.replace('{{TITLE}}', f'Revenue Report - {year}').replace('{{DATA}}', payload)
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(html)
+
+    return {'units': len(data['units']) - 1, 'bytes': len(html.encode('utf-8')),
+            'seconds': time.perf_counter() - start}
+
+# ///////////////////////////////////////////////////////////////
+# PAGE TEMPLATE
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{{TITLE}}</title>
+<style>
+  body { margin: 0; font-family: Helvetica, Arial, sans-serif; color: #141919; background: #f4f6f8; }
+  header { padding: 48px; background: #1f3f77; color: white; text-align: center; }
+  header h1 { margin: 0; font-size: 56px; font-weight: normal; }
+  header p { margin: 8px 0 0; font-size: 32px; }
+  section { margin: 24px auto; max-width: 1100px; padding: 16px 24px; background: white; box-shadow: 0 1px 3px #0002; }
+  section h2 { margin: 0 0 8px; font-size: 28px; }
+  .section-cover { background: none; box-shadow: none; text-align: center; }
+  .section-cover p { color: #555; }
+  .grid { display: grid; grid-template-columns: 1fr 1fr; gap: 8px; }
+  .totals { text-align: right; font-weight: bold; font-size: 14px; line-height: 1.5; }
+  .unit { min-height: 640px; }
+  svg { width: 100%; height: auto; font-size: 12px; }
+  svg text.title { font-size: 16px; }
+  footer { padding: 16px; color: grey; font-style: italic; }
+</style>
+</head>
+<body>
+<header><h1>Revenue Report</h1><p id="year"></p></header>
+<main id="report"></main>
+<footer>{{TITLE}}</footer>
+<script id="report-data" type="application/json">{{DATA}}</script>
+<script>
+(function () {
+  const data = JSON.parse(document.getElementById('report-data').textContent);
+  const NS = 'http://www.w3.org/2000/svg';
+  const typeColors = data.colors.types;
+  const categoryColors = data.colors.categories;
+  const yearIndex = data.years.indexOf(data.year);
+  const money = v => '$' + Math.round(v).toLocaleString();
+
+  function el(tag, attrs, text) {
+    const node = document.createElementNS(NS, tag);
+    for (const key in attrs || {}) node.setAttribute(key, attrs[key]);
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function html(tag, text, cls) {
+    const node = document.createElement(tag);
+    if (text !== undefined) node.textContent = text;
+    if (cls) node.className = cls;
+    return node;
+  }
+
+  function frame(title, width, height) {
+    const svg = el('svg', {viewBox: `0 0 ${width} ${height}`});
+    svg.appendChild(el('text', {x: width / 2, y: 18, 'text-anchor': 'middle', class: 'title'}, title));
+    return svg;
+  }
+
+  function scale(values, top, bottom) {
+    const lo = Math.min(0, ...values), hi = Math.max(0, ...values);
+    const span = (hi - lo) || 1;
+    return {y: v => bottom - (v - lo) / span * (bottom - top), lo: lo, hi: hi};
+  }
+
+  function yAxis(svg, s, left, right, label) {
+    for (const v of [s.lo, (s.lo + s.hi) / 2, s.hi]) {
+      svg.appendChild(el('line', {x1: left, x2: right, y1: s.y(v), y2: s.y(v), stroke: '#ddd'}));
+      svg.appendChild(el('text', {x: left - 4, y: s.y(v) + 4, 'text-anchor': 'end'}, v.toFixed(0)));
+    }
+    svg.appendChild(el('text', {x: 12, y: 40, 'font-size': 11}, label));
+  }
+
+  function legend(svg, names, colors, x, y) {
+    names.forEach((name, i) => {
+      svg.appendChild(el('rect', {x: x, y: y + i * 16, width: 10, height: 10, fill: colors[i]}));
+      svg.appendChild(el('text', {x: x + 14, y: y + i * 16 + 9}, name));
+    });
+  }
+
+  // grouped bars, one group per label and one bar per series
+  function barChart(title, labels, series, names, colors, label) {
+    const W = 520, H = 300, left = 48, right = W - 8, top = 40, bottom = H - 40;
+    const svg = frame(title, W, H);
+    const s = scale(series.flat(), top, bottom);
+    yAxis(svg, s, left, right, label);
+    const group = (right - left) / Math.max(labels.length, 1);
+    const bar = group * 0.8 / series.length;
+    labels.forEach((name, i) => {
+      series.forEach((values, j) => {
+        const y0 = s.y(0), y1 = s.y(values[i]);
+        svg.appendChild(el('rect', {x: left + i * group + group * 0.1 + j * bar, y: Math.min(y0, y1),
+                                    width: bar, height: Math.abs(y1 - y0), fill: colors[j]}));
+      });
+      if (labels.length <= 30)
+        svg.appendChild(el('text', {x: left + (i + 0.5) * group, y: bottom + 14, 'text-anchor': 'middle'}, name));
+    });
+    if (names) legend(svg, names, colors, left + 8, top);
+    return svg;
+  }
+
+  function lineChart(title, xs, series, names, colors) {
+    const W = 520, H = 300, left = 48, right = W - 90, top = 40, bottom = H - 30;
+    const svg = frame(title, W, H);
+    const s = scale(series.flat(), top, bottom);
+    yAxis(svg, s, left, right, 'Amount (in $1,000s)');
+    const x = i => left + (xs.length > 1 ? i / (xs.length - 1) : 0.5) * (right - left);
+    series.forEach((values, j) => {
+      svg.appendChild(el('polyline', {points: values.map((v, i) => `${x(i)},${s.y(v)}`).join(' '),
+                                      fill: 'none', stroke: colors[j], 'stroke-width': 2}));
+      values.forEach((v, i) => svg.appendChild(el('circle', {cx: x(i), cy: s.y(v), r: 3.5,
+                                                              fill: colors[j], stroke: 'black'})));
+    });
+    xs.forEach((year, i) => svg.appendChild(el('text', {x: x(i), y: bottom + 16, 'text-anchor': 'middle'}, year)));
+    legend(svg, names, colors, right + 10, top);
+    return svg;
+  }
+
+  // slices sorted largest first; labels of slices under 5% are hidden as in the pdf report
+  function pieChart(title, names, values, colors) {
+    const W = 520, H = 300, cx = 200, cy = 165, r = 115;
+    const svg = frame(title, W, H);
+    const order = values.map((v, i) => i).filter(i => values[i] > 0).sort((a, b) => values[b] - values[a]);
+    const total = order.reduce((sum, i) => sum + values[i], 0);
+    let angle = -Math.PI / 2;
+    order.forEach((i, k) => {
+      const share = values[i] / total, next = angle + share * 2 * Math.PI;
+      const point = a => `${cx + r * Math.cos(a)},${cy + r * Math.sin(a)}`;
+      const d = share >= 0.9999 ? `M${cx - r},${cy}a${r},${r} 0 1,0 ${2 * r},0a${r},${r} 0 1,0 ${-2 * r},0`
+        : `M${cx},${cy}L${point(angle)}A${r},${r} 0 ${share > 0.5 ? 1 : 0},1 ${point(next)}Z`;
+      svg.appendChild(el('path', {d: d, fill: colors[k % colors.length], stroke: 'white'}));
+      if (share >= 0.05) {
+        const mid = (angle + next) / 2;
+        svg.appendChild(el('text', {x: cx + r * 0.6 * Math.cos(mid), y: cy + r * 0.6 * Math.sin(mid) + 4,
+                                    'text-anchor': 'middle'}, (share * 100).toFixed(1) + '%'));
+      }
+      angle = next;
+    });
+    legend(svg, order.map(i => names[i]), order.map((i, k) => colors[k % colors.length]), 340, 40);
+    return svg;
+  }
+
+  function yearlySeries(u) {
+    const rows = data.yearly[u];
+    const expense = rows.map(row => row[0] / 1000), payment = rows.map(row => row[1] / 1000);
+    return [expense, payment, payment.map((v, i) => v - expense[i])];
+  }
+
+  function unitPage(u) {
+    const unit = data.units[u];
+    const [expense, payment] = data.yearly[u][yearIndex];
+    const page = html('section', undefined, 'unit');
+    page.appendChild(html('h2', unit === 'all' ? 'Analytics for All Units' : `Unit ${unit} Analytics`));
+    const totals = html('div', undefined, 'totals');
+    for (const line of [`Total Income: ${money(payment)}`, `Total Expenses: ${money(expense)}`,
+                        `Net Income: ${money(payment - expense)}`])
+      totals.appendChild(html('div', line));
+    page.appendChild(totals);
+
+    page.dataset.unit = u;
+    return page;
+  }
+
+  function drawUnitPage(page) {
+    const u = Number(page.dataset.unit);
+    const [expense, payment] = data.yearly[u][yearIndex];
+    const grid = html('div', undefined, 'grid');
+    grid.appendChild(lineChart('Transactions by Year', data.years, yearlySeries(u), ['expense', 'payment', 'net'],
+                               [typeColors.expense, typeColors.payment, typeColors.net]));
+    const typeOrder = expense >= payment ? ['expense', 'payment'] : ['payment', 'expense'];
+    grid.appendChild(pieChart('Transactions by Type', ['expense', 'payment'], [expense, payment],
+                              typeOrder.map(t => typeColors[t])));
+    grid.appendChild(pieChart('Payments by Category', data.categories.payment,
+                              data.category_totals.payment[u], categoryColors));
+    grid.appendChild(pieChart('Expenses by Category', data.categories.expense,
+                              data.category_totals.expense[u], categoryColors));
+    page.appendChild(grid);
+  }
+
+  function sectionCover(title, descr) {
+    const cover = html('section', undefined, 'section-cover');
+    cover.appendChild(html('h2', title));
+    cover.appendChild(html('p', descr));
+    return cover;
+  }
+
+  const report = document.getElementById('report');
+  document.getElementById('year').textContent = data.year;
+
+  report.appendChild(sectionCover('All Units', 'Analytics for aggregated unit data'));
+
+  const units = data.units.slice(1);
+  const overview = html('section');
+  const expenses = units.map((unit, i) => data.yearly[i + 1][yearIndex][0] / 1000);
+  const payments = units.map((unit, i) => data.yearly[i + 1][yearIndex][1] / 1000);
+  overview.appendChild(barChart('Transactions by Unit', units.map(unit => `Unit ${unit}`),
+                                [expenses, payments, payments.map((v, i) => v - expenses[i])],
+                                ['expense', 'payment', 'net'],
+                                [typeColors.expense, typeColors.payment, typeColors.net], 'Amount (in $1,000s)'));
+  report.appendChild(overview);
+
+  const vacancy = data.vacancy;
+  const vacancyPage = html('section');
+  const vacancyTotals = html('div', undefined, 'totals');
+  vacancyTotals.appendChild(html('div', `Vacant Days: ${vacancy.vacant_days.toLocaleString()} of ${vacancy.available_days.toLocaleString()}`));
+  vacancyTotals.appendChild(html('div', `Lost Rent: ${money(vacancy.lost.reduce((a, b) => a + b, 0))}`));
+  vacancyPage.appendChild(vacancyTotals);
+  const vacancyGrid = html('div', undefined, 'grid');
+  const vacancyLabels = vacancy.units.map(unit => `Unit ${unit}`);
+  vacancyGrid.appendChild(barChart('Vacancy Rate by Unit', vacancyLabels, [vacancy.rate.map(v => v * 100)],
+                                   null, ['orange'], 'Share of days vacant (%)'));
+  vacancyGrid.appendChild(barChart('Rent Lost to Vacancy by Unit', vacancyLabels, [vacancy.lost.map(v => v / 1000)],
+                                   null, ['red'], 'Amount (in $1,000s)'));
+  vacancyPage.appendChild(vacancyGrid);
+  report.appendChild(vacancyPage);
+
+  const pages = [unitPage(0)];
+  report.appendChild(pages[0]);
+  report.appendChild(sectionCover('Individual Units', 'Analytics for individual rental units'));
+  units.forEach((unit, i) => { pages.push(unitPage(i + 1)); report.appendChild(pages[i + 1]); });
+
+  // unit charts are drawn when scrolled into view (or all at once before printing)
+  const drawn = new WeakSet();
+  const draw = page => { if (!drawn.has(page)) { drawn.add(page); drawUnitPage(page); } };
+  if ('IntersectionObserver' in window) {
+    const observer = new IntersectionObserver(entries => entries.forEach(entry => {
+      if (entry.isIntersecting) { draw(entry.target); observer.unobserve(entry.target); }
+    }), {rootMargin: '600px'});
+    pages.forEach(page => observer.observe(page));
+  } else {
+    pages.forEach(draw);
+  }
+  window.addEventListener('beforeprint', () => pages.forEach(draw));
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,361 @@
+import os
+import time
+import pandas as pd
+from datetime import date
+from rich import print
+
+# project modules
+from lib import Payment
+from lib import Expense
+from lib.helper import sql_helper as sql
+from lib.helper import validation as val
+
+# class, parent id column and parent lookup column for each kind of import
+IMPORT_KINDS = {
+    'payment': (Payment, 'tenant_id', 'tenant'),
+    'expense': (Expense, 'unit_id', 'unit'),
+}
+
+# default mapping of csv headers (case-insensitive) to class attributes
+DEFAULT_COLUMN_MAPS = {
+    'payment': {
+        'date': 'pmt_date',
+        'amount': 'amount',
+        'method': 'method',
+        'category': 'category',
+        'tenant': 'tenant',
+        'payer': 'tenant',
+        'description': 'tenant',
+        'tenant id': 'tenant_id',
+        'unit': 'unit',
+        'unit id': 'unit_id',
+    },
+    'expense': {
+        'date': 'exp_date',
+        'amount': 'amount',
+        'description': 'descr',
+        'category': 'category',
+        'unit': 'unit',
+        'unit id': 'unit_id',
+    },
+}
+
+# day ordinals of deposit dates are counted from this date
+EPOCH = date(1970, 1, 1)
+
+DEFAULT_VALUES = {
+    'payment': {'category': 'rent'},
+    'expense': {},
+}
+
+def _normalize_key(value):
+    '''
+    returns lower-case value with repeated whitespace removed for use as a lookup key
+    '''
+    return " ".join(str(value).lower().split())
+
+def build_parent_lookup(kind):
+    '''
+    builds dictionary used to resolve tenants or units referenced by name in imported rows
+
+    Parameters
+    ---------
+    kind: str
+        - type of import ('payment' or 'expense')
+
+    Returns
+    ---------
+    lookup: dict
+        - parent id keyed by normalized id, name/email (tenants) or address (units)
+        - keys shared by more than one parent map to None so they are rejected instead of guessed
+    '''
+    if kind == 'payment':
+        rows = sql.get_cursor().execute("SELECT id, name, email_address FROM tenants").fetchall()
+    else:
+        rows = sql.get_cursor().execute("SELECT id, address FROM units").fetchall()
+
+    lookup = {}
+    for id, *keys in rows:
+        lookup[str(id)] = id
+        for key in keys:
+            for variant in {_normalize_key(key), _normalize_key(str(key).replace("\n", ", "))}:
+                lookup[variant] = id if lookup.get(variant, id) == id else None
+
+    return lookup
+
+def normalize_chunk(chunk, kind, column_map, lookup):
+    '''
+    maps csv columns to class attributes and cleans values so they can be validated
+
+    Parameters
+    ---------
+    chunk: Pandas DataFrame
+        - rows read from csv (all values as strings)
+    kind: str
+        - type of import ('payment' or 'expense')
+    column_map: dict
+        - class attribute for each csv header (case-insensitive)
+    lookup: dict
+        - parent lookup built by build_parent_lookup
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - rows with one column per class attribute and the parent id column
+    '''
+    cls, parent_col, parent_key = IMPORT_KINDS[kind]
+    column_map = {_normalize_key(key): value for key, value in column_map.items()}
+
+    df = pd.DataFrame(index=chunk.index)
+    for header in chunk.columns:
+        attr = column_map.get(_normalize_key(header))
+        if attr:
+            df[attr] = chunk[header].str.strip()
+
+    for attr, default in DEFAULT_VALUES[kind].items():
+        if attr not in df.columns:
+            df[attr] = default
+        else:
+            df[attr] = df[attr].mask(df[attr] == "", default)
+
+    if 'amount' in df.columns:
+        # bank exports use signs and currency formatting, debits and credits are both stored as positive amounts
+        amounts = df['amount'].str.replace(r"[$,\s]", "", regex=True).str.replace(r"^\((.*)\)$", r"\1", regex=True)
+        df['amount'] = pd.to_numeric(amounts, errors='coerce').abs()
+
+    for attr in ('pmt_date', 'exp_date'):
+        if attr in df.columns:
+            # dates which cannot be parsed (e.g. 2025-13-40) are left missing so the row is rejected
+            dates = pd.to_datetime(df[attr], format='mixed', errors='coerce')
+            df[attr] = dates.dt.strftime('%Y-%m-%d')
+
+    for attr in ('method', 'category'):
+        if attr in df.columns:
+            df[attr] = df[attr].str.lower()
+
+    # resolve parent id from explicit id column first, then from names via the lookup
+    parent_ids = pd.to_numeric(df[parent_col], errors='coerce') if parent_col in df.columns \
+        else pd.Series(float('nan'), index=df.index)
+
+    if parent_key in df.columns:
+        resolved = df[parent_key].map(lambda key: lookup.get(_normalize_key(key)))
+        parent_ids = parent_ids.fillna(pd.to_numeric(resolved, errors='coerce'))
+
+    # whole numbers become ints (validated like parent_id_validation), anything else is left missing
+    df[parent_col] = parent_ids.where(parent_ids == parent_ids.round()).astype("Int64")
+
+    return df
+
+def check_columns(kind, headers, column_map, match_tenants=False):
+    '''
+    raises ValueError if the csv headers do not map to every column needed to insert rows
+
+    Parameters
+    ---------
+    kind: str
+        - type of import ('payment' or 'expense')
+    headers: list
+        - headers of the csv file
+    column_map: dict
+        - class attribute for each csv header (case-insensitive)
+    match_tenants (optional): boolean
+        - indicates whether payments without a tenant column can be matched by the matching engine
+    '''
+    cls, parent_col, parent_key = IMPORT_KINDS[kind]
+    column_map = {_normalize_key(key): value for key, value in column_map.items()}
+
+    mapped = {column_map.get(_normalize_key(header)) for header in headers} | set(DEFAULT_VALUES[kind])
+    missing = [col for col in cls.DB_COLUMNS[1:] if col != parent_col and col not in mapped]
+
+    # the parent is resolved from its id or name, payments can also be matched on amount and method
+    if not mapped & {parent_col, parent_key} and not (kind == 'payment' and match_tenants):
+        missing.append(f"{parent_col} (or {parent_key})")
+
+    if missing:
+        raise ValueError(f"CSV has no column for: {', '.join(missing)} "
+                         f"(headers found: {', '.join(headers)}, map headers with column_map)")
+
+def match_unresolved(df, matcher, unit_lookup=None):
+    '''
+    matches payments without a resolved tenant using the matching engine
+
+    Parameters
+    ---------
+    df: Pandas DataFrame
+        - normalized payment rows (modified in place with matched tenant ids)
+    matcher: TenantMatcher instance
+        - matcher indexed over active tenants
+    unit_lookup (optional): dict
+        - unit lookup built by build_parent_lookup('expense'), resolves units referenced by address
+
+    Returns
+    ---------
+    review: Pandas Series
+        - candidates (as text) for rows which matched more than one tenant without a clear winner
+    '''
+    review = {}
+    unresolved = df.index[df['tenant_id'].isna()]
+
+    # unit referenced by the deposit (id column first, then address), missing if the csv has neither
+    unit_ids = pd.to_numeric(df['unit_id'], errors='coerce') if 'unit_id' in df.columns \
+        else pd.Series(float('nan'), index=df.index)
+    if 'unit' in df.columns and unit_lookup:
+        resolved = df['unit'].map(lambda key: unit_lookup.get(_normalize_key(key)))
+        unit_ids = unit_ids.fillna(pd.to_numeric(resolved, errors='coerce'))
+
+    # day ordinal of each deposit, so tenants who have since moved out still match their older deposits
+    dates = pd.to_datetime(df['pmt_date'], format='%Y-%m-%d', errors='coerce') if 'pmt_date' in df.columns \
+        else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    days = (dates - pd.Timestamp(EPOCH)).dt.days + EPOCH.toordinal()
+
+    for idx in unresolved:
+        unit_id = unit_ids.at[idx]
+        day = days.at[idx]
+        tenant_id, scores = matcher.match(
+            payer=df.at[idx, 'tenant'] if 'tenant' in df.columns else None,
+            amount=df.at[idx, 'amount'] if 'amount' in df.columns else None,
+            method=df.at[idx, 'method'] if 'method' in df.columns else None,
+            unit_id=int(unit_id) if unit_id == unit_id else None,
+            day=int(day) if day == day else None
+        )
+
+        if tenant_id is not None:
+            df.at[idx, 'tenant_id'] = tenant_id
+        elif scores:
+            review[idx] = ", ".join(f"{id} ({score:.2f})" for id, score in scores[:5])
+
+    return pd.Series(review, dtype=object)
+
+def insert_rows(cls, df):
+    '''
+    inserts validated rows in a single transaction
+
+    Parameters
+    ---------
+    cls: class
+        - class whose table the rows are inserted into
+    df: Pandas DataFrame
+        - validated rows with one column per DB column (excluding id)
+    '''
+    columns = cls.DB_COLUMNS[1:]
+    query = f"INSERT INTO {cls.TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    values = df[list(columns)].astype(object).where(df[list(columns)].notna(), None)
+    parent_col = next(iter(cls.PARENT_DICT))
+    values[parent_col] = values[parent_col].astype(int)
+
+    try:
+        sql.CURSOR.executemany(query, values.itertuples(index=False, name=None))
+        sql.CONN.commit()
+    except Exception:
+        sql.CONN.rollback()
+        raise
+
+def print_progress(rows, seconds):
+    '''
+    prints number of rows processed and throughput of an import on a single line
+    '''
+    rate = rows / seconds if seconds else 0
+    print(f"[cyan]{rows:,} rows | {seconds:,.1f}s | {rate:,.0f} rows/s[/cyan]", end="\r")
+
+def import_csv(path, kind, column_map=None, chunksize=10000, reject_path=None, match_tenants=True,
+               review_path=None, progress=print_progress):
+    '''
+    streams a csv file (e.g. bank statement export) into the payments or expenses table
+
+    Parameters
+    ---------
+    path: str
+        - file path of csv to import
+    kind: str
+        - type of import ('payment' or 'expense')
+    column_map (optional): dict
+        - class attribute for each csv header (defaults to DEFAULT_COLUMN_MAPS[kind])
+    chunksize (optional): int
+        - number of rows read, validated and inserted at a time (one transaction per chunk)
+    reject_path (optional): str
+        - file path to save rejected rows with their errors (defaults to <path>_REJECTS.csv)
+    match_tenants (optional): boolean
+        - indicates whether payments without a resolvable tenant go through the matching engine
+    review_path (optional): str
+        - file path to save payments which need a manual tenant match (defaults to <path>_REVIEW.csv)
+    progress (optional): callable object
+        - called with (rows, seconds) after each chunk (set to None to silence)
+
+    Returns
+    ---------
+    summary: dict
+        - rows read, inserted, rejected and queued for review, output paths, elapsed seconds and throughput
+    '''
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must match one of the following: {list(IMPORT_KINDS)}")
+
+    cls = IMPORT_KINDS[kind][0]
+    column_map = column_map or DEFAULT_COLUMN_MAPS[kind]
+    reject_path = reject_path or f"{os.path.splitext(path)[0]}_REJECTS.csv"
+    review_path = review_path or f"{os.path.splitext(path)[0]}_REVIEW.csv"
+    lookup = build_parent_lookup(kind)
+
+    matcher = None
+    unit_lookup = None
+    if kind == 'payment' and match_tenants:
+        from lib.helper.matching import TenantMatcher
+        matcher = TenantMatcher.build()
+        unit_lookup = build_parent_lookup('expense')
+
+    rows_read = 0
+    rows_inserted = 0
+    rows_rejected = 0
+    rows_review = 0
+    start = time.perf_counter()
+
+    for output_path in (reject_path, review_path):
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    headers = pd.read_csv(path, nrows=0).columns.tolist()
+    check_columns(kind, headers, column_map, matcher is not None)
+
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False):
+        rows_read += len(chunk)
+        df = normalize_chunk(chunk, kind, column_map, lookup)
+
+        if matcher:
+            review = match_unresolved(df, matcher, unit_lookup)
+            if len(review):
+                chunk.loc[review.index].assign(candidates=review).to_csv(
+                    review_path, mode='a', header=not os.path.exists(review_path), index=False)
+                df = df.drop(review.index)
+                chunk = chunk.drop(review.index)
+                rows_review += len(review)
+
+        report = val.validate_frame(cls, df)
+
+        if report['valid'].any():
+            insert_rows(cls, df[report['valid']])
+
+        rejects = chunk[~report['valid']].assign(errors=report['errors'][~report['valid']])
+        if len(rejects):
+            rejects.to_csv(reject_path, mode='a', header=not os.path.exists(reject_path), index=False)
+
+        rows_inserted += int(report['valid'].sum())
+        rows_rejected += len(rejects)
+
+        if progress:
+            progress(rows_read, time.perf_counter() - start)
+
+    elapsed = time.perf_counter() - start
+
+    if progress:
+        print("")
+
+    return {
+        'rows': rows_read,
+        'inserted': rows_inserted,
+        'rejected': rows_rejected,
+        'reject_path': reject_path if rows_rejected else None,
+        'review': rows_review,
+        'review_path': review_path if rows_review else None,
+        'seconds': elapsed,
+        'rows_per_second': rows_read / elapsed if elapsed else 0
+    }
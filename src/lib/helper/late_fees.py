@@ -0,0 +1,166 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper.payment_index import EPOCH_ORDINAL
+from lib.helper.rent_roll import RentRollBuilder
+from lib.helper.rollforward import LATE_AFTER_DAYS
+
+TABLE = "late_fee_assessments"
+DB_COLUMNS = ("id", "tenant_id", "unit_id", "due_date", "rent_due", "paid_on_time", "amount", "assessed_date")
+DF_COLUMNS = ("id", "Tenant ID", "Unit", "Due Date", "Rent Due", "Paid On Time", "Late Fee", "Assessed Date")
+
+def create_table():
+    '''
+    creates the ledger of assessed late fees (one fee per tenant and rent period)
+    '''
+    sql.CURSOR.execute("""
+        CREATE TABLE IF NOT EXISTS late_fee_assessments (
+        id INTEGER PRIMARY KEY,
+        tenant_id INTEGER,
+        unit_id INTEGER,
+        due_date DATE,
+        rent_due FLOAT,
+        paid_on_time FLOAT,
+        amount FLOAT,
+        assessed_date DATE,
+        UNIQUE (tenant_id, due_date),
+        FOREIGN KEY (tenant_id) REFERENCES tenants(id) ON DELETE CASCADE,
+        FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE CASCADE)
+    """)
+    sql.CONN.commit()
+
+    sql.create_indexes(TABLE, [('unit_id', 'due_date')])
+
+    sql.track_table_version(TABLE)
+
+def drop_table():
+    '''
+    drops the ledger of assessed late fees
+    '''
+    sql.drop_table(TABLE)
+
+def late_periods(close_date=None, since_date=None):
+    '''
+    evaluates the on-time rule for every tenant active in the month being closed, all at once
+
+    A rent period is late once its cutoff has passed if less than the monthly rent was paid before the cutoff
+    (rent and late fee are those in effect on the due date).
+
+    Parameters
+    ---------
+    close_date (optional): str
+        - last day of the close in YYYY-MM-DD format (defaults to today)
+    since_date (optional): str
+        - only evaluate periods due on or after this date (defaults to every period since move in)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - one row per late period with the columns of the ledger (excluding id)
+    summary: dict
+        - tenants and periods evaluated
+    '''
+    close = date.fromisoformat(close_date).toordinal() if close_date else sql.today_ordinal()
+    since = date.fromisoformat(since_date).toordinal() if since_date else 0
+    month_start = date.fromordinal(close).replace(day=1).toordinal()
+
+    builder = RentRollBuilder.build(close)
+    occ = builder.occupancy
+
+    # tenants who lived in a unit at any point during the month being closed
+    tenancies = np.flatnonzero((occ.starts <= close) & (occ.ends > month_start))
+    rows, starts, paid, paid_on_time = builder.period_payments(tenancies, close)
+
+    units = occ.units[tenancies][rows]
+    rents, fees = builder.rent_in_effect(units, starts)
+
+    evaluated = (starts + LATE_AFTER_DAYS <= close) & (starts >= since)
+    late = evaluated & (rents - paid_on_time > 0) & (fees > 0)
+
+    df = pd.DataFrame({
+        'tenant_id': occ.tenant_ids[tenancies][rows][late],
+        'unit_id': occ.unit_ids[units][late],
+        'due_date': np.datetime_as_string((starts[late] - EPOCH_ORDINAL).astype('datetime64[D]')),
+        'rent_due': rents[late],
+        'paid_on_time': paid_on_time[late],
+        'amount': fees[late],
+        'assessed_date': date.fromordinal(close).isoformat(),
+    }, columns=list(DB_COLUMNS[1:]))
+
+    return df, {'tenants': len(tenancies), 'periods': int(evaluated.sum())}
+
+def assess_late_fees(close_date=None, since_date=None):
+    '''
+    records late fees owed by every tenant active in the month being closed in a single transaction
+
+    Running again for the same close creates nothing (each tenant and due date can only be assessed once).
+
+    Parameters
+    ---------
+    close_date (optional): str
+        - last day of the close in YYYY-MM-DD format (defaults to today)
+    since_date (optional): str
+        - only assess periods due on or after this date (defaults to every period since move in)
+
+    Returns
+    ---------
+    summary: dict
+        - tenants and periods evaluated, late periods found, fees inserted and elapsed seconds
+    '''
+    start = time.perf_counter()
+    df, summary = late_periods(close_date, since_date)
+
+    inserted = 0
+    if len(df):
+        query = f"""
+            INSERT OR IGNORE INTO {TABLE} ({', '.join(df.columns)})
+            VALUES ({', '.join('?' * len(df.columns))})
+        """
+
+        with sql.WRITE_LOCK:
+            try:
+                sql.CURSOR.executemany(query, df.astype(object).itertuples(index=False, name=None))
+                inserted = sql.CURSOR.rowcount
+                sql.CONN.commit()
+            except Exception:
+                sql.CONN.rollback()
+                raise
+
+    return {**summary, 'late': len(df), 'inserted': inserted, 'seconds': time.perf_counter() - start}
+
+def get_assessments(tenant_id=None, unit_id=None):
+    '''
+    retrieves assessed late fees
+
+    Parameters
+    ---------
+    tenant_id (optional): int
+        - id of Tenant to filter on
+    unit_id (optional): int
+        - id of Unit to filter on
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - assessed late fees sorted by tenant and due date
+    '''
+    filters = []
+    params = []
+    if tenant_id:
+        filters.append("tenant_id = ?")
+        params.append(tenant_id)
+    if unit_id:
+        filters.append("unit_id = ?")
+        params.append(unit_id)
+
+    query = f"SELECT {', '.join(DB_COLUMNS)} FROM {TABLE}"
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    query += " ORDER BY tenant_id, due_date"
+
+    rows = sql.get_cursor().execute(query, params).fetchall()
+    return pd.DataFrame(rows, columns=DF_COLUMNS).set_index('id')
@@ -0,0 +1,486 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper.payment_index import EPOCH_ORDINAL
+from lib.helper.rent_history import RentSchedule
+from lib.helper.rent_roll import period_grid
+from lib.helper.rollforward import LATE_AFTER_DAYS
+
+TABLE = "ledger_entries"
+DB_COLUMNS = ("id", "tenant_id", "entry_date", "kind", "category", "debit", "credit", "balance",
+              "payment_id", "late_fee_id")
+DF_COLUMNS = ("id", "Tenant ID", "Date", "Kind", "Category", "Debit", "Credit", "Balance",
+              "Payment ID", "Late Fee ID")
+
+# entries of a tenant are ordered by date, charges before payments, then by id
+# (balance of an entry includes every entry before it)
+ORDER = "entry_date, kind, id"
+
+def _balance_triggers():
+    '''
+    returns statements creating triggers which keep running balances up to date on every change
+
+    Only entries after the changed entry are updated, so a back-dated correction re-balances just the suffix.
+    The triggers are skipped while ledger_state.deferred is set (bulk loads re-balance with a window function).
+    '''
+    active = "(SELECT deferred FROM ledger_state) = 0"
+    own_balance = """
+        UPDATE ledger_entries
+        SET balance = COALESCE((
+            SELECT p.balance FROM ledger_entries AS p
+            WHERE p.tenant_id = NEW.tenant_id AND (p.entry_date, p.kind, p.id) < (NEW.entry_date, NEW.kind, NEW.id)
+            ORDER BY p.entry_date DESC, p.kind DESC, p.id DESC LIMIT 1
+        ), 0) + NEW.debit - NEW.credit
+        WHERE id = NEW.id;
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_entries_balance_insert
+        AFTER INSERT ON ledger_entries WHEN {active}
+        BEGIN
+            {own_balance}
+            UPDATE ledger_entries SET balance = balance + NEW.debit - NEW.credit
+            WHERE tenant_id = NEW.tenant_id AND (entry_date, kind, id) > (NEW.entry_date, NEW.kind, NEW.id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_entries_balance_delete
+        AFTER DELETE ON ledger_entries WHEN {active}
+        BEGIN
+            UPDATE ledger_entries SET balance = balance - OLD.debit + OLD.credit
+            WHERE tenant_id = OLD.tenant_id AND (entry_date, kind, id) > (OLD.entry_date, OLD.kind, OLD.id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_ledger_entries_balance_update
+        AFTER UPDATE OF tenant_id, entry_date, kind, debit, credit ON ledger_entries WHEN {active}
+        BEGIN
+            UPDATE ledger_entries SET balance = balance - OLD.debit + OLD.credit
+            WHERE tenant_id = OLD.tenant_id AND (entry_date, kind, id) > (OLD.entry_date, OLD.kind, OLD.id) AND id != NEW.id;
+            UPDATE ledger_entries SET balance = balance + NEW.debit - NEW.credit
+            WHERE tenant_id = NEW.tenant_id AND (entry_date, kind, id) > (NEW.entry_date, NEW.kind, NEW.id);
+            {own_balance}
+        END
+        """,
+    ]
+
+def _source_triggers():
+    '''
+    returns statements creating triggers which post payments and assessed late fees to the ledger
+
+    Payments are credits. A security deposit is also charged as a debit when it is received.
+    '''
+    deposit_charge = """
+        INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, payment_id)
+        SELECT NEW.tenant_id, NEW.pmt_date, 'charge', NEW.category, NEW.amount, 0, NEW.id
+        WHERE NEW.category = 'security deposit';
+    """
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_payments_ledger_insert
+        AFTER INSERT ON payments
+        BEGIN
+            {deposit_charge}
+            INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, payment_id)
+            VALUES (NEW.tenant_id, NEW.pmt_date, 'payment', NEW.category, 0, NEW.amount, NEW.id);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_payments_ledger_update
+        AFTER UPDATE OF tenant_id, pmt_date, category, amount ON payments
+        BEGIN
+            DELETE FROM ledger_entries WHERE payment_id = NEW.id AND kind = 'charge';
+            {deposit_charge}
+            UPDATE ledger_entries
+            SET tenant_id = NEW.tenant_id, entry_date = NEW.pmt_date, category = NEW.category, credit = NEW.amount
+            WHERE payment_id = NEW.id AND kind = 'payment';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_ledger_delete
+        AFTER DELETE ON payments
+        BEGIN
+            DELETE FROM ledger_entries WHERE payment_id = OLD.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_late_fee_assessments_ledger_insert
+        AFTER INSERT ON late_fee_assessments
+        BEGIN
+            INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, late_fee_id)
+            VALUES (NEW.tenant_id, date(NEW.due_date, '+{LATE_AFTER_DAYS} days'), 'charge', 'late fee',
+                    NEW.amount, 0, NEW.id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_late_fee_assessments_ledger_delete
+        AFTER DELETE ON late_fee_assessments
+        BEGIN
+            DELETE FROM ledger_entries WHERE late_fee_id = OLD.id;
+        END
+        """,
+    ]
+
+def create_table():
+    '''
+    creates the tenant ledger (charges as debits, payments as credits, running balance per tenant)
+    and posts existing payments, late fees and rent charges if the ledger is new
+    (tenants, units, payments, late_fee_assessments and rent_history tables must exist)
+    '''
+    exists = sql.CURSOR.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE,)).fetchone()
+
+    sql.CURSOR.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_entries (
+        id INTEGER PRIMARY KEY,
+        tenant_id INTEGER,
+        entry_date DATE,
+        kind TEXT,
+        category TEXT,
+        debit FLOAT NOT NULL DEFAULT 0,
+        credit FLOAT NOT NULL DEFAULT 0,
+        balance FLOAT NOT NULL DEFAULT 0,
+        payment_id INTEGER,
+        late_fee_id INTEGER,
+        FOREIGN KEY (tenant_id) REFERENCES tenants(id) ON DELETE CASCADE)
+    """)
+    sql.CURSOR.execute("CREATE TABLE IF NOT EXISTS ledger_state (id INTEGER PRIMARY KEY CHECK (id = 1), deferred INTEGER NOT NULL)")
+    sql.CURSOR.execute("INSERT OR IGNORE INTO ledger_state (id, deferred) VALUES (1, 0)")
+
+    # running balance order, so the latest balance of a tenant is one index lookup
+    sql.CURSOR.execute("CREATE INDEX IF NOT EXISTS idx_ledger_entries_tenant_id_entry_date_kind_id ON ledger_entries (tenant_id, entry_date, kind, id)")
+    sql.CURSOR.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ledger_entries_payment_id_kind ON ledger_entries (payment_id, kind) WHERE payment_id IS NOT NULL")
+    sql.CURSOR.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ledger_entries_late_fee_id ON ledger_entries (late_fee_id) WHERE late_fee_id IS NOT NULL")
+    sql.CURSOR.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ledger_entries_rent_charges ON ledger_entries (tenant_id, entry_date)
+        WHERE kind = 'charge' AND category = 'rent'
+    """)
+
+    for statement in _balance_triggers() + _source_triggers():
+        sql.CURSOR.execute(statement)
+    sql.CONN.commit()
+
+    sql.track_table_version(TABLE)
+
+    if not exists:
+        rebuild()
+
+def drop_table():
+    '''
+    drops the tenant ledger
+    '''
+    sql.drop_table(TABLE)
+    sql.drop_table("ledger_state")
+
+def _set_deferred(deferred):
+    '''
+    turns the running balance triggers off (bulk loads) or back on
+    '''
+    sql.CURSOR.execute("UPDATE ledger_state SET deferred = ? WHERE id = 1", (int(deferred),))
+
+def _rebalance(changed=None):
+    '''
+    recalculates running balances with a window function (call with triggers deferred)
+
+    Parameters
+    ---------
+    changed (optional): str
+        - name of a table of (tenant_id, from_date) rows, only entries of those tenants on or after
+          from_date are summed and rewritten, starting from the balance before from_date
+          (defaults to every entry)
+    '''
+    if changed is None:
+        sql.CURSOR.execute(f"""
+            UPDATE ledger_entries
+            SET balance = w.running
+            FROM (
+                SELECT id, SUM(debit - credit) OVER (PARTITION BY tenant_id ORDER BY {ORDER}) AS running
+                FROM ledger_entries
+            ) AS w
+            WHERE ledger_entries.id = w.id
+        """)
+        return
+
+    sql.CURSOR.execute(f"""
+        WITH openings AS (
+            SELECT c.tenant_id, c.from_date, COALESCE((
+                SELECT p.balance FROM ledger_entries AS p
+                WHERE p.tenant_id = c.tenant_id AND p.entry_date < c.from_date
+                ORDER BY p.entry_date DESC, p.kind DESC, p.id DESC LIMIT 1
+            ), 0) AS opening
+            FROM {changed} AS c
+        )
+        UPDATE ledger_entries
+        SET balance = w.running
+        FROM (
+            SELECT l.id, o.opening + SUM(l.debit - l.credit)
+                OVER (PARTITION BY l.tenant_id ORDER BY l.entry_date, l.kind, l.id) AS running
+            FROM ledger_entries AS l
+            JOIN openings AS o
+            ON l.tenant_id = o.tenant_id AND l.entry_date >= o.from_date
+        ) AS w
+        WHERE ledger_entries.id = w.id
+    """)
+
+def expected_rent_charges(through_date=None):
+    '''
+    returns the monthly rent charge of every tenant from move in up to a date (same periods as rollforwards)
+
+    Each charge is the rent in effect on its due date, so rent changes only apply from their effective date.
+
+    Parameters
+    ---------
+    through_date (optional): str
+        - last date to charge rent for in YYYY-MM-DD format (defaults to today)
+
+    Returns
+    ---------
+    tenant_ids: NumPy array
+        - tenant id of each rent charge
+    days: NumPy array
+        - day ordinal of each rent charge
+    amounts: NumPy array
+        - monthly rent in effect on each day
+    '''
+    through = date.fromisoformat(through_date).toordinal() if through_date else sql.today_ordinal()
+
+    tenants = sql.get_cursor().execute("""
+        SELECT t.id, t.move_in_day, t.move_out_day, t.unit_id, u.monthly_rent
+        FROM tenants AS t
+        JOIN units AS u
+        ON t.unit_id = u.id
+        WHERE t.move_in_day IS NOT NULL
+    """).fetchall()
+
+    if not tenants:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+
+    ids, move_ins, move_outs, unit_ids, rents = zip(*tenants)
+    stops = np.array([through + 1 if out is None else min(out, through + 1) for out in move_outs])
+    starts, valid = period_grid(np.array(move_ins), stops)
+
+    rows, cols = np.nonzero(valid)
+    days = starts[rows, cols]
+    unit_ids = np.array(unit_ids, dtype=np.int64)[rows]
+
+    # units without rent history are charged their current rent
+    amounts, _ = RentSchedule.build(sorted(set(unit_ids.tolist()))).in_effect(unit_ids, days)
+    amounts = np.where(np.isnan(amounts), np.array(rents, dtype=np.float64)[rows], amounts)
+
+    return np.array(ids, dtype=np.int64)[rows], days, amounts
+
+def _to_dates(days):
+    '''
+    converts day ordinals to a list of YYYY-MM-DD strings
+    '''
+    return np.datetime_as_string((np.asarray(days) - EPOCH_ORDINAL).astype('datetime64[D]')).tolist()
+
+def post_rent_charges(through_date=None):
+    '''
+    brings rent charges in the ledger in line with tenancies up to a date in a single transaction
+
+    Missing charges are added and charges outside a tenancy (e.g. after a move out was entered) are removed.
+    Charges which no longer match the rent in effect (e.g. after a retroactive rent adjustment) are replaced.
+    Only balances from the earliest changed date of each tenant are recalculated, so running it again is cheap.
+
+    Parameters
+    ---------
+    through_date (optional): str
+        - last date to charge rent for in YYYY-MM-DD format (defaults to today)
+
+    Returns
+    ---------
+    summary: dict
+        - charges added, charges removed, tenants re-balanced and elapsed seconds
+    '''
+    start = time.perf_counter()
+    tenant_ids, days, amounts = expected_rent_charges(through_date)
+
+    # existing rent charges come from the partial index on (tenant_id, entry_date)
+    existing = sql.CURSOR.execute(f"""
+        SELECT id, tenant_id, CAST(julianday(entry_date) - {sql.JULIAN_DAY_OFFSET} AS INTEGER), debit
+        FROM ledger_entries
+        WHERE kind = 'charge' AND category = 'rent'
+    """).fetchall()
+    existing = np.array(existing, dtype=np.float64).reshape(-1, 4)
+    ids, existing_tenants, existing_days = existing[:, :3].T.astype(np.int64)
+    existing_amounts = existing[:, 3]
+
+    # compare (tenant, day) pairs as single integer keys
+    scale = np.int64(1 << 32)
+    expected_keys = tenant_ids * scale + days
+    existing_keys = existing_tenants * scale + existing_days
+
+    # a charge on an expected (tenant, day) is still stale when its amount differs from the rent in effect
+    matched = np.zeros(len(existing_keys), dtype=bool)
+    if len(expected_keys):
+        order = np.argsort(expected_keys)
+        pos = order[np.minimum(np.searchsorted(expected_keys, existing_keys, sorter=order), len(order) - 1)]
+        matched = (expected_keys[pos] == existing_keys) & np.isclose(amounts[pos], existing_amounts)
+
+    stale = ~matched
+    missing = ~np.isin(expected_keys, existing_keys[matched])
+
+    changed = pd.DataFrame({
+        'tenant_id': np.concatenate([tenant_ids[missing], existing_tenants[stale]]),
+        'day': np.concatenate([days[missing], existing_days[stale]]),
+    }).groupby('tenant_id')['day'].min()
+
+    if changed.empty:
+        return {'added': 0, 'removed': 0, 'tenants': 0, 'seconds': time.perf_counter() - start}
+
+    with sql.WRITE_LOCK:
+        try:
+            sql.CURSOR.execute("CREATE TEMP TABLE IF NOT EXISTS changed_tenants (tenant_id INTEGER PRIMARY KEY, from_date DATE)")
+            sql.CURSOR.execute("DELETE FROM changed_tenants")
+            sql.CURSOR.executemany("INSERT INTO changed_tenants VALUES (?, ?)",
+                                   zip(changed.index.tolist(), _to_dates(changed.to_numpy())))
+
+            _set_deferred(True)
+            sql.CURSOR.executemany("DELETE FROM ledger_entries WHERE id = ?", ((id,) for id in ids[stale].tolist()))
+            sql.CURSOR.executemany("""
+                INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit)
+                VALUES (?, ?, 'charge', 'rent', ?, 0)
+            """, zip(tenant_ids[missing].tolist(), _to_dates(days[missing]), amounts[missing].tolist()))
+            _rebalance("changed_tenants")
+            _set_deferred(False)
+
+            sql.CONN.commit()
+        except Exception:
+            sql.CONN.rollback()
+            raise
+
+    return {'added': int(missing.sum()), 'removed': int(stale.sum()), 'tenants': len(changed),
+            'seconds': time.perf_counter() - start}
+
+def rebuild(through_date=None):
+    '''
+    clears the ledger and posts every payment, assessed late fee and rent charge again in a single transaction
+
+    Parameters
+    ---------
+    through_date (optional): str
+        - last date to charge rent for in YYYY-MM-DD format (defaults to today)
+
+    Returns
+    ---------
+    summary: dict
+        - entries posted and elapsed seconds
+    '''
+    start = time.perf_counter()
+
+    with sql.WRITE_LOCK:
+        try:
+            _set_deferred(True)
+            sql.CURSOR.execute("DELETE FROM ledger_entries")
+            sql.CURSOR.execute("""
+                INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, payment_id)
+                SELECT tenant_id, pmt_date, 'charge', category, amount, 0, id
+                FROM payments WHERE category = 'security deposit'
+            """)
+            sql.CURSOR.execute("""
+                INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, payment_id)
+                SELECT tenant_id, pmt_date, 'payment', category, 0, amount, id
+                FROM payments
+            """)
+            sql.CURSOR.execute(f"""
+                INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit, late_fee_id)
+                SELECT tenant_id, date(due_date, '+{LATE_AFTER_DAYS} days'), 'charge', 'late fee', amount, 0, id
+                FROM late_fee_assessments
+            """)
+            tenant_ids, days, amounts = expected_rent_charges(through_date)
+            sql.CURSOR.executemany("""
+                INSERT INTO ledger_entries (tenant_id, entry_date, kind, category, debit, credit)
+                VALUES (?, ?, 'charge', 'rent', ?, 0)
+            """, zip(tenant_ids.tolist(), _to_dates(days), amounts.tolist()))
+            _rebalance()
+            _set_deferred(False)
+
+            entries = sql.CURSOR.execute("SELECT COUNT(*) FROM ledger_entries").fetchone()[0]
+            sql.CONN.commit()
+        except Exception:
+            sql.CONN.rollback()
+            raise
+
+    return {'entries': entries, 'seconds': time.perf_counter() - start}
+
+def get_balance(tenant_id, as_of_date=None):
+    '''
+    returns balance owed by a tenant (one index lookup of the latest running balance)
+
+    Parameters
+    ---------
+    tenant_id: int
+        - id of tenant
+    as_of_date (optional): str
+        - date in YYYY-MM-DD format (defaults to the latest entry)
+
+    Returns
+    ---------
+    output: float
+        - charges minus payments up to the date (0 if the tenant has no entries)
+    '''
+    filt = " AND entry_date <= ?" if as_of_date else ""
+    params = (tenant_id, as_of_date) if as_of_date else (tenant_id,)
+
+    row = sql.get_cursor().execute(f"""
+        SELECT balance FROM ledger_entries
+        WHERE tenant_id = ?{filt}
+        ORDER BY entry_date DESC, kind DESC, id DESC LIMIT 1
+    """, params).fetchone()
+
+    return row[0] if row else 0.0
+
+def get_balances():
+    '''
+    returns latest balance of every tenant with ledger entries
+
+    Returns
+    ---------
+    output: Pandas Series
+        - balance indexed by tenant id
+    '''
+    rows = sql.get_cursor().execute("""
+        SELECT tenant_id, balance FROM (
+            SELECT tenant_id, balance, ROW_NUMBER() OVER (PARTITION BY tenant_id ORDER BY entry_date DESC, kind DESC, id DESC) AS n
+            FROM ledger_entries
+        ) WHERE n = 1
+    """).fetchall()
+
+    return pd.Series(dict(rows), name='Balance', dtype=float).rename_axis('Tenant ID')
+
+def get_statement(tenant_id, start_date=None, end_date=None):
+    '''
+    retrieves ledger entries of a tenant in running balance order
+
+    Parameters
+    ---------
+    tenant_id: int
+        - id of tenant
+    start_date (optional): str
+        - first date to include in YYYY-MM-DD format
+    end_date (optional): str
+        - last date to include in YYYY-MM-DD format
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - one row per entry indexed by id
+    '''
+    query = f"SELECT {', '.join(DB_COLUMNS)} FROM {TABLE} WHERE tenant_id = ?"
+    params = [tenant_id]
+
+    if start_date:
+        query += " AND entry_date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND entry_date <= ?"
+        params.append(end_date)
+
+    rows = sql.get_cursor().execute(query + f" ORDER BY {ORDER}", params).fetchall()
+    df = pd.DataFrame(rows, columns=DF_COLUMNS).set_index('id')
+
+    return df.astype({'Payment ID': 'Int64', 'Late Fee ID': 'Int64'})
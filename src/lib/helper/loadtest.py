@@ -0,0 +1,137 @@
+import http.client
+import random
+import threading
+import time
+import numpy as np
+from urllib.parse import urlsplit
+
+# project modules
+from lib.helper import sql_helper as sql
+
+def default_paths(tenant_ids, unit_ids):
+    '''
+    returns mix of read requests used by the load test
+
+    Parameters
+    ---------
+    tenant_ids: list
+        - ids of tenants to request rollforwards and records for
+    unit_ids: list
+        - ids of units to request summaries and filtered lists for
+
+    Returns
+    ---------
+    paths: list
+        - request paths (repeated paths are weighted more heavily)
+    '''
+    paths = ["/units", "/tenants?limit=20", "/tenants?active=true", "/payments?limit=100", "/summary"]
+    paths += [f"/payments?limit=100&offset={offset}" for offset in (100, 200, 300)]
+    paths += [f"/summary?unit_id={id}" for id in unit_ids]
+    paths += [f"/expenses?unit_id={id}&limit=100" for id in unit_ids]
+    paths += [f"/tenants/{id}" for id in tenant_ids]
+    paths += [f"/tenants/{id}/rollforward" for id in tenant_ids] * 2
+    return paths
+
+def _worker(host, port, paths, count, revalidate, seed, results):
+    '''
+    sends requests over one keep-alive connection and appends (status, seconds) for each to results
+    '''
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    rng = random.Random(seed)
+    output = []
+
+    for _ in range(count):
+        path = rng.choice(paths)
+        headers = {"If-None-Match": etags[path]} if path in etags and rng.random() < revalidate else {}
+
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+        except (OSError, http.client.HTTPException):
+            status = 0
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        output.append((status, time.perf_counter() - start))
+
+    conn.close()
+    results.extend(output)
+
+def load_test(url=None, requests=2000, concurrency=16, revalidate=0.5, pool_size=8, paths=None, seed=0):
+    '''
+    sends concurrent read requests to a server and measures throughput and latency
+
+    Parameters
+    ---------
+    url (optional): str
+        - base url of a running server (defaults to starting a local server on a free port)
+    requests (optional): int
+        - total number of requests to send
+    concurrency (optional): int
+        - number of clients sending requests at the same time (each keeps one connection open)
+    revalidate (optional): float
+        - share of repeated requests which send the ETag received earlier (should return 304)
+    pool_size (optional): int
+        - number of read connections in the local server (ignored if url is set)
+    paths (optional): list
+        - request paths to choose from (defaults to default_paths)
+    seed (optional): int
+        - seed for the random choice of paths
+
+    Returns
+    ---------
+    summary: dict
+        - requests sent, count per status, elapsed seconds, requests per second and latency percentiles (ms)
+    '''
+    server = None
+    if url is None:
+        from lib.helper.server import start_background_server
+        server = start_background_server(pool_size)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    host, port = urlsplit(url).hostname, urlsplit(url).port or 80
+
+    if paths is None:
+        cursor = sql.get_cursor()
+        tenant_ids = [row[0] for row in cursor.execute("SELECT id FROM tenants ORDER BY id LIMIT 20").fetchall()]
+        unit_ids = [row[0] for row in cursor.execute("SELECT id FROM units ORDER BY id LIMIT 10").fetchall()]
+        paths = default_paths(tenant_ids, unit_ids)
+
+    results = []
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    threads = [threading.Thread(target=_worker, args=(host, port, paths, count, revalidate, seed + i, results))
+               for i, count in enumerate(counts)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if server:
+        server.shutdown()
+        server.server_close()
+
+    statuses = {}
+    for status, seconds in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    latencies = np.array([seconds for status, seconds in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+
+    return {
+        'url': url,
+        'requests': len(results),
+        'statuses': statuses,
+        'seconds': elapsed,
+        'requests_per_second': len(results) / elapsed if elapsed else 0,
+        'p50_ms': float(p50),
+        'p95_ms': float(p95),
+        'p99_ms': float(p99),
+    }
@@ -0,0 +1,195 @@
+import re
+from collections import Counter
+
+# project modules
+from lib.helper import sql_helper as sql
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    '''
+    returns set of lower-case words in text (single characters are ignored)
+    '''
+    if not isinstance(text, str):
+        return set()
+    return {token for token in TOKEN_REGEX.findall(text.lower()) if len(token) > 1}
+
+class TenantMatcher:
+    '''
+    A class to match deposits without a tenant id to the tenants living in a unit on the deposit date
+
+    Constants
+    ---------
+    WEIGHTS: dict
+        - contribution of each matching signal to a candidate's score (sums to 1)
+    MIN_SCORE: float
+        - lowest score accepted as a match
+    MIN_MARGIN: float
+        - lowest lead the best candidate needs over the runner-up to be accepted
+
+    Attributes
+    ---------
+    tenants: dict
+        - (name tokens, unit id, monthly rent, usual method, move in day, move out day) keyed by tenant id
+    by_token: dict
+        - tenant ids keyed by name token
+    by_rent: dict
+        - tenant ids keyed by monthly rent (in cents)
+    by_unit: dict
+        - tenant ids keyed by unit id
+
+    Methods
+    ---------
+    - candidates: returns ids of tenants active on the deposit date sharing at least one signal with it
+    - score: returns candidates and their scores for a deposit, best first
+    - match: returns matched tenant id or the candidates to review for a deposit
+
+    Class Methods
+    ---------
+    - build: creates matcher over every tenancy (past and current) using two queries
+    '''
+    WEIGHTS = {'name': 0.5, 'rent': 0.25, 'unit': 0.15, 'method': 0.1}
+    MIN_SCORE = 0.6
+    MIN_MARGIN = 0.15
+
+    def __init__(self, tenants):
+        '''
+        Constructs the necessary attributes for the TenantMatcher object.
+
+        Parameters
+        ---------
+        tenants: list
+            - rows of (id, name, unit id, monthly rent, usual method, move in day, move out day)
+        '''
+        self.tenants = {}
+        self.by_token = {}
+        self.by_rent = {}
+        self.by_unit = {}
+
+        for id, name, unit_id, monthly_rent, method, move_in_day, move_out_day in tenants:
+            tokens = tokenize(name)
+            self.tenants[id] = (tokens, unit_id, monthly_rent, method, move_in_day, move_out_day)
+
+            for token in tokens:
+                self.by_token.setdefault(token, set()).add(id)
+            self.by_rent.setdefault(round(monthly_rent * 100), set()).add(id)
+            self.by_unit.setdefault(unit_id, set()).add(id)
+
+    def __repr__(self):
+        return f"<TenantMatcher: {len(self.tenants)} tenants>"
+
+    @classmethod
+    def build(cls):
+        '''
+        creates matcher over every tenancy (past and current) using two queries
+
+        Returns
+        ---------
+        TenantMatcher instance
+            - matcher indexed by name tokens, rent and unit (tenants are filtered by deposit date when matching)
+        '''
+        cursor = sql.get_cursor()
+
+        query_tenants = """
+            SELECT t.id, t.name, t.unit_id, u.monthly_rent, t.move_in_day, t.move_out_day
+            FROM tenants AS t
+            JOIN units AS u
+            ON t.unit_id = u.id
+        """
+        rows = cursor.execute(query_tenants).fetchall()
+
+        query_methods = """
+            SELECT tenant_id, method, COUNT(*)
+            FROM payments
+            GROUP BY tenant_id, method
+        """
+        method_counts = {}
+        for tenant_id, method, count in cursor.execute(query_methods).fetchall():
+            method_counts.setdefault(tenant_id, Counter())[method] = count
+
+        usual_method = {id: counts.most_common(1)[0][0] for id, counts in method_counts.items()}
+
+        return cls([(id, name, unit_id, rent, usual_method.get(id), move_in_day, move_out_day)
+                    for id, name, unit_id, rent, move_in_day, move_out_day in rows])
+
+    def candidates(self, payer=None, amount=None, unit_id=None, day=None):
+        '''
+        returns ids of tenants active on the deposit day (defaults to today) sharing at least one signal
+        (name token, rent, unit) with a deposit
+        '''
+        day = day or sql.today_ordinal()
+        ids = set()
+        for token in tokenize(payer):
+            ids |= self.by_token.get(token, set())
+        if amount is not None and amount == amount:
+            ids |= self.by_rent.get(round(amount * 100), set())
+        if unit_id is not None:
+            ids |= self.by_unit.get(unit_id, set())
+
+        # a tenant can only pay for days they lived in the unit (moved out tenants match their older deposits)
+        return {id for id in ids
+                if self.tenants[id][4] <= day and (self.tenants[id][5] is None or self.tenants[id][5] > day)}
+
+    def score(self, payer=None, amount=None, method=None, unit_id=None, day=None):
+        '''
+        returns candidates and their scores for a deposit, best first
+
+        Parameters
+        ---------
+        payer (optional): str
+            - payer name or transaction description
+        amount (optional): float
+            - dollar value of deposit
+        method (optional): str
+            - payment method of deposit
+        unit_id (optional): int
+            - unit referenced by deposit
+        day (optional): int
+            - day ordinal of deposit (defaults to today)
+
+        Returns
+        ---------
+        scores: list
+            - (tenant id, score between 0 and 1) sorted by score in descending order
+        '''
+        payer_tokens = tokenize(payer)
+        scores = []
+
+        for id in self.candidates(payer, amount, unit_id, day):
+            tokens, tenant_unit, monthly_rent, usual_method, move_in_day, move_out_day = self.tenants[id]
+
+            score = self.WEIGHTS['name'] * (len(tokens & payer_tokens) / len(tokens) if tokens else 0)
+            if amount is not None and monthly_rent:
+                # full credit for exact rent, partial credit for partial payments
+                score += self.WEIGHTS['rent'] * (1 if round(amount, 2) == round(monthly_rent, 2)
+                                                 else 0.4 if 0 < amount < monthly_rent else 0)
+            score += self.WEIGHTS['unit'] * (unit_id is not None and unit_id == tenant_unit)
+            score += self.WEIGHTS['method'] * (method is not None and method == usual_method)
+
+            scores.append((id, round(score, 4)))
+
+        return sorted(scores, key=lambda item: (-item[1], item[0]))
+
+    def match(self, payer=None, amount=None, method=None, unit_id=None, day=None):
+        '''
+        returns matched tenant id or the candidates to review for a deposit
+
+        Returns
+        ---------
+        tenant_id: int or None
+            - id of matched tenant (None if no candidate is clearly the best)
+        scores: list
+            - (tenant id, score) of every candidate, best first
+        '''
+        scores = self.score(payer, amount, method, unit_id, day)
+
+        if not scores:
+            return None, scores
+
+        best = scores[0][1]
+        runner_up = scores[1][1] if len(scores) > 1 else 0
+
+        if best >= self.MIN_SCORE and best - runner_up >= self.MIN_MARGIN:
+            return scores[0][0], scores
+
+        return None, scores
@@ -0,0 +1,363 @@
+import os
+import json
+import math
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# upper bounds (seconds) of histogram buckets, from a fast indexed lookup to a full report
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+class Counter:
+    '''
+    A class to count events, optionally split by label values (e.g. one count per model)
+
+    Attributes
+    ---------
+    name: str
+        - name of the metric
+    help: str
+        - description of the metric
+    labels: tuple
+        - names of the labels (values are passed positionally in the same order)
+    values: dict
+        - count per tuple of label values
+
+    Methods
+    ---------
+    - inc: adds to the count for the label values
+    - samples: returns (suffix, label values, value) for every count
+    '''
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<Counter {self.name}: {sum(self.values.values()):,}>"
+
+    def inc(self, *label_values, amount=1):
+        '''
+        adds to the count for the label values
+
+        Parameters
+        ---------
+        label_values: str
+            - one value per label
+        amount (optional): int or float
+            - amount to add
+        '''
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        '''
+        returns (suffix, label values, value) for every count
+        '''
+        with self._lock:
+            return [("_total" if not self.name.endswith("_total") else "", key, value)
+                    for key, value in sorted(self.values.items())]
+
+class Histogram:
+    '''
+    A class to record the distribution of durations (or sizes), optionally split by label values
+
+    Attributes
+    ---------
+    name: str
+        - name of the metric
+    help: str
+        - description of the metric
+    labels: tuple
+        - names of the labels (values are passed positionally in the same order)
+    buckets: tuple
+        - upper bound of each bucket (a final +Inf bucket is implied)
+    values: dict
+        - [count per bucket, sum, count] per tuple of label values
+
+    Methods
+    ---------
+    - observe: records a value for the label values
+    - time: records the seconds spent in a with block
+    - samples: returns (suffix, label values, value) for every bucket, sum and count
+    '''
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<Histogram {self.name}: {sum(state[2] for state in self.values.values()):,} observations>"
+
+    def observe(self, value, *label_values):
+        '''
+        records a value for the label values
+
+        Parameters
+        ---------
+        value: float
+            - observed value (e.g. seconds)
+        label_values: str
+            - one value per label
+        '''
+        # index of the first bucket the value fits in (len(buckets) for +Inf)
+        position = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+
+        with self._lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][position] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        '''
+        records the seconds spent in a with block (also when it raises)
+
+        Parameters
+        ---------
+        label_values: str
+            - one value per label
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        '''
+        returns (suffix, label values, value) for every bucket (cumulative), sum and count
+        '''
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                    cumulative += bucket_count
+                    samples.append(("_bucket", key + (bound,), cumulative))
+                samples.append(("_sum", key, total))
+                samples.append(("_count", key, count))
+        return samples
+
+class Registry:
+    '''
+    A class to hold every metric of the process and export them
+
+    Attributes
+    ---------
+    metrics: dict
+        - metric per name
+
+    Methods
+    ---------
+    - counter: returns the counter with the name (created on first use)
+    - histogram: returns the histogram with the name (created on first use)
+    - to_prometheus: returns all metrics in the Prometheus text exposition format
+    - to_json: returns all metrics as a JSON-serializable dict
+    - write: saves all metrics to a file
+    - reset: clears the values of every metric
+    '''
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, labels, **kwargs)
+            elif not isinstance(metric, cls) or metric.labels != tuple(labels):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, help, labels=()):
+        '''
+        returns the counter with the name (created on first use)
+        '''
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        '''
+        returns the histogram with the name (created on first use)
+        '''
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def to_prometheus(self):
+        '''
+        returns all metrics in the Prometheus text exposition format
+
+        Returns
+        ---------
+        text: str
+            - HELP and TYPE lines followed by one line per sample
+        '''
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+
+            for suffix, key, value in metric.samples():
+                names = metric.labels + (("le",) if suffix == "_bucket" else ())
+                pairs = ",".join(f'{label}="{_label_value(val)}"' for label, val in zip(names, key))
+                base = name[:-len("_total")] if suffix == "_total" else name
+                lines.append(f"{base}{suffix}{{{pairs}}} {_number(value)}" if pairs
+                             else f"{base}{suffix} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        '''
+        returns all metrics as a JSON-serializable dict
+
+        Returns
+        ---------
+        metrics: dict
+            - per metric: type, help and one entry per set of label values
+            (counters: value; histograms: count, sum and cumulative bucket counts)
+        '''
+        output = {}
+        for name, metric in sorted(self.metrics.items()):
+            with metric._lock:
+                items = sorted(metric.values.items())
+
+            values = []
+            for key, state in items:
+                entry = {'labels': dict(zip(metric.labels, key))}
+                if metric.type == "counter":
+                    entry['value'] = state
+                else:
+                    counts, total, count = state
+                    cumulative = [sum(counts[:i + 1]) for i in range(len(counts))]
+                    entry.update({'count': count, 'sum': total,
+                                  'buckets': dict(zip([*map(str, metric.buckets), "+Inf"], cumulative))})
+                values.append(entry)
+
+            output[name] = {'type': metric.type, 'help': metric.help, 'values': values}
+
+        return output
+
+    def write(self, path, format=None):
+        '''
+        saves all metrics to a file (replaced atomically, so a scraper never reads a partial file)
+
+        Parameters
+        ---------
+        path: str
+            - file path to save metrics to
+        format (optional): str
+            - 'prometheus' or 'json' (defaults to json for .json files, else prometheus)
+        '''
+        format = format or ("json" if path.endswith(".json") else "prometheus")
+        if format == "json":
+            text = json.dumps(self.to_json(), indent=2)
+        elif format == "prometheus":
+            text = self.to_prometheus()
+        else:
+            raise ValueError("Metrics format must match one of the following:", ["prometheus", "json"])
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        '''
+        clears the values of every metric
+        '''
+        for metric in self.metrics.values():
+            with metric._lock:
+                metric.values.clear()
+
+def _label_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# ///////////////////////////////////////////////////////////////
+# METRICS OF THE APPLICATION
+
+REGISTRY = Registry()
+
+QUERIES = REGISTRY.counter("rental_queries_total", "Queries run through sql_helper", ("helper",))
+QUERY_SECONDS = REGISTRY.histogram("rental_query_seconds", "Time to run and fetch queries in sql_helper", ("helper",))
+ROWS_HYDRATED = REGISTRY.counter("rental_rows_hydrated_total", "Table rows turned into model instances", ("model",))
+CACHE_LOOKUPS = REGISTRY.counter("rental_cache_lookups_total", "Lookups in in-process caches", ("cache", "result"))
+ROLLFORWARDS = REGISTRY.counter("rental_rollforwards_total", "Payment rollforwards computed")
+ROLLFORWARD_SECONDS = REGISTRY.histogram("rental_rollforward_seconds", "Time to compute a payment rollforward")
+REPORT_PAGES = REGISTRY.counter("rental_report_pages_total", "Report pages added to reports", ("source",))
+PAGE_RENDER_SECONDS = REGISTRY.histogram("rental_report_page_render_seconds", "Time to render a report page")
+RECEIPTS = REGISTRY.counter("rental_receipts_total", "Payment receipts printed to pdf")
+RECEIPT_SECONDS = REGISTRY.histogram("rental_receipt_seconds", "Time to print a payment receipt")
+HTTP_REQUESTS = REGISTRY.counter("rental_http_requests_total", "HTTP requests handled by the server", ("method", "status"))
+HTTP_SECONDS = REGISTRY.histogram("rental_http_request_seconds", "Time to handle an HTTP request", ("method",))
+
+def query(func):
+    '''
+    decorator which counts and times calls of a sql_helper query function (labelled with its name)
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        QUERIES.inc(func.__name__)
+        with QUERY_SECONDS.time(func.__name__):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+def hydrated(model, rows, cached):
+    '''
+    counts table rows turned into model instances
+
+    Parameters
+    ---------
+    model: str
+        - name of the model class (e.g. 'Payment')
+    rows: int
+        - number of rows turned into instances
+    cached: int
+        - number of those rows whose instance was already in the identity map of the class (the all dict)
+    '''
+    ROWS_HYDRATED.inc(model, amount=rows)
+    CACHE_LOOKUPS.inc("identity_map", "hit", amount=cached)
+    CACHE_LOOKUPS.inc("identity_map", "miss", amount=rows - cached)
+
+def counted(counter, histogram):
+    '''
+    returns a decorator which counts and times calls of a function with unlabelled metrics
+
+    Parameters
+    ---------
+    counter: Counter
+        - counter incremented on every call
+    histogram: Histogram
+        - histogram recording the seconds of every call
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            counter.inc()
+            with histogram.time():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
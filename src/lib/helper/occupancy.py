@@ -0,0 +1,317 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper.payment_index import to_ordinals, from_ordinal, EPOCH_ORDINAL
+
+# end day used for tenancies without a move out date
+OPEN_END = np.iinfo(np.int64).max // 2
+
+DAYS_PER_YEAR = 365
+
+def _day_ordinals(dates):
+    '''
+    converts a column of dates (text or datetimes) to day ordinals, missing dates become OPEN_END
+    '''
+    days = np.array(dates, dtype='datetime64[D]')
+    return np.where(np.isnat(days), OPEN_END, days.astype(np.int64) + EPOCH_ORDINAL)
+
+class OccupancyIndex:
+    '''
+    A class to answer occupancy questions (who lived where and when) from sorted tenancy intervals
+
+    A tenant occupies a unit from their move in day up to (but not including) their move out day.
+
+    Attributes
+    ---------
+    unit_ids: NumPy array
+        - sorted ids of all units
+    acquired: NumPy array
+        - day ordinal each unit was acquired (same order as unit_ids)
+    rents: NumPy array
+        - monthly rent of each unit (same order as unit_ids)
+    units: NumPy array
+        - position in unit_ids of the unit of each tenancy (tenancies sorted by unit and move in)
+    starts: NumPy array
+        - move in day ordinal of each tenancy
+    ends: NumPy array
+        - move out day ordinal of each tenancy (OPEN_END if not moved out)
+    tenant_ids: NumPy array
+        - tenant id of each tenancy
+    names: list
+        - tenant name of each tenancy
+    offsets: NumPy array
+        - position of the first tenancy of each unit (tenancies of unit i are offsets[i]:offsets[i + 1])
+    merged_units, merged_starts, merged_ends: NumPy array
+        - occupied intervals of each unit with overlapping tenancies combined
+
+    Methods
+    ---------
+    - occupants: returns ids of tenants occupying a unit on a day
+    - occupied_units: returns ids of units occupied on a day
+    - vacant_units: returns ids of units owned but not occupied on a day
+    - occupied_days: returns number of days each unit was occupied between two days
+    - vacancy: returns available, occupied and vacant days, vacancy rate and lost rent per unit for a period
+    - vacancy_for_year: returns vacancy per unit for a calendar year (up to today for the current year)
+    - timeline: returns occupied and vacant segments of a unit in date order
+
+    Class Methods
+    ---------
+    - build: creates index over all units and tenants using two queries
+    - from_frames: creates index from unit and tenant DataFrames (e.g. read from a snapshot)
+    '''
+    def __init__(self, unit_ids, acquired, rents, units, starts, ends, tenant_ids, names):
+        '''
+        Constructs the necessary attributes for the OccupancyIndex object (tenancies must be sorted by unit and start).
+        '''
+        self.unit_ids = np.asarray(unit_ids, dtype=np.int64)
+        self.acquired = np.asarray(acquired, dtype=np.int64)
+        self.rents = np.asarray(rents, dtype=np.float64)
+        self.units = np.asarray(units, dtype=np.int64)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.tenant_ids = np.asarray(tenant_ids, dtype=np.int64)
+        self.names = list(names)
+
+        self.offsets = np.searchsorted(self.units, np.arange(len(self.unit_ids) + 1), side='left')
+        self._merge()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __repr__(self):
+        return f"<OccupancyIndex: {len(self.unit_ids)} units, {len(self)} tenancies>"
+
+    @classmethod
+    def build(cls):
+        '''
+        creates index over all units and tenants using two queries
+
+        Returns
+        ---------
+        OccupancyIndex instance
+            - index of every tenancy grouped by unit
+        '''
+        cursor = sql.get_cursor()
+
+        units = cursor.execute("SELECT id, acquisition_date, monthly_rent FROM units ORDER BY id").fetchall()
+        tenancies = cursor.execute("""
+            SELECT unit_id, move_in_day, move_out_day, id, name
+            FROM tenants
+            WHERE move_in_day IS NOT NULL
+            ORDER BY unit_id, move_in_day, id
+        """).fetchall()
+
+        unit_ids, acquisition_dates, rents = zip(*units) if units else ((), (), ())
+        acquired = to_ordinals(list(acquisition_dates)) if units else []
+
+        unit_col, starts, ends, tenant_ids, names = zip(*tenancies) if tenancies else ((),) * 5
+        positions = np.searchsorted(np.asarray(unit_ids, dtype=np.int64), np.asarray(unit_col, dtype=np.int64))
+        ends = [OPEN_END if end is None else end for end in ends]
+
+        return cls(unit_ids, acquired, rents, positions, starts, ends, tenant_ids, names)
+
+    @classmethod
+    def from_frames(cls, units, tenants):
+        '''
+        creates index from unit and tenant DataFrames (e.g. read from a snapshot)
+
+        Parameters
+        ---------
+        units: Pandas DataFrame
+            - units in the layout of Unit.get_dataframe (dates as text or datetimes)
+        tenants: Pandas DataFrame
+            - tenants in the layout of Tenant.get_dataframe (dates as text or datetimes)
+
+        Returns
+        ---------
+        OccupancyIndex instance
+            - index of every tenancy grouped by unit
+        '''
+        units = units.sort_values('id')
+        tenants = tenants[tenants['Move In Date'].notna()].sort_values(['Unit ID', 'Move In Date', 'id'])
+
+        unit_ids = units['id'].to_numpy(dtype=np.int64)
+        positions = np.searchsorted(unit_ids, tenants['Unit ID'].to_numpy(dtype=np.int64))
+
+        return cls(unit_ids, _day_ordinals(units['Acquisition Date']), units['Monthly Rent'], positions,
+                   _day_ordinals(tenants['Move In Date']), _day_ordinals(tenants['Move Out Date']),
+                   tenants['id'], tenants['Name'])
+
+    def _merge(self):
+        '''
+        combines overlapping tenancies of each unit into occupied intervals
+        '''
+        if not len(self):
+            self.merged_units = self.merged_starts = self.merged_ends = np.array([], dtype=np.int64)
+            return
+
+        # running max of end within each unit, a new interval starts when a tenancy begins after it
+        running_end = pd.Series(self.ends).groupby(self.units).cummax().to_numpy()
+        new_interval = np.ones(len(self), dtype=bool)
+        new_interval[1:] = (self.units[1:] != self.units[:-1]) | (self.starts[1:] > running_end[:-1])
+
+        first = np.flatnonzero(new_interval)
+        self.merged_units = self.units[first]
+        self.merged_starts = self.starts[first]
+        self.merged_ends = np.maximum.reduceat(self.ends, first)
+
+    def _position(self, unit_id):
+        '''
+        returns position of a unit in unit_ids (raises ValueError if the unit does not exist)
+        '''
+        position = np.searchsorted(self.unit_ids, unit_id)
+        if position == len(self.unit_ids) or self.unit_ids[position] != unit_id:
+            raise ValueError(f"unit {unit_id} does not exist")
+        return int(position)
+
+    def occupants(self, unit_id, day):
+        '''
+        returns ids of tenants occupying a unit on a day
+
+        Parameters
+        ---------
+        unit_id: int
+            - id of unit
+        day: int
+            - day ordinal
+
+        Returns
+        ---------
+        output: list
+            - ids of tenants whose tenancy covers the day (empty if vacant)
+        '''
+        position = self._position(unit_id)
+        lo, hi = self.offsets[position], self.offsets[position + 1]
+
+        # only tenancies starting on or before the day can cover it
+        hi = lo + np.searchsorted(self.starts[lo:hi], day, side='right')
+        covering = self.ends[lo:hi] > day
+
+        return self.tenant_ids[lo:hi][covering].tolist()
+
+    def occupied_units(self, day):
+        '''
+        returns ids of units occupied on a day
+        '''
+        covering = (self.merged_starts <= day) & (self.merged_ends > day)
+        return self.unit_ids[np.unique(self.merged_units[covering])]
+
+    def vacant_units(self, day=None):
+        '''
+        returns ids of units owned but not occupied on a day (defaults to today)
+        '''
+        day = day or sql.today_ordinal()
+        occupied = np.zeros(len(self.unit_ids), dtype=bool)
+        occupied[np.searchsorted(self.unit_ids, self.occupied_units(day))] = True
+
+        return self.unit_ids[(self.acquired <= day) & ~occupied]
+
+    def occupied_days(self, start, end):
+        '''
+        returns number of days each unit was occupied on or after start and before end
+
+        Parameters
+        ---------
+        start: int
+            - day ordinal of the first day in the period
+        end: int
+            - day ordinal after the last day in the period
+
+        Returns
+        ---------
+        output: NumPy array
+            - occupied days per unit (same order as unit_ids), days before acquisition are not counted
+        '''
+        lower = np.maximum(np.maximum(self.merged_starts, start), self.acquired[self.merged_units])
+        overlap = np.clip(np.minimum(self.merged_ends, end) - lower, 0, None)
+
+        return np.bincount(self.merged_units, weights=overlap, minlength=len(self.unit_ids)).astype(np.int64)
+
+    def vacancy(self, start, end):
+        '''
+        returns available, occupied and vacant days, vacancy rate and lost rent per unit for a period
+
+        Parameters
+        ---------
+        start: int
+            - day ordinal of the first day in the period
+        end: int
+            - day ordinal after the last day in the period
+
+        Returns
+        ---------
+        df: Pandas DataFrame
+            - one row per unit owned during the period (lost rent assumes the unit's current monthly rent)
+        '''
+        available = np.clip(end - np.maximum(self.acquired, start), 0, None)
+        occupied = np.minimum(self.occupied_days(start, end), available)
+        vacant = available - occupied
+
+        df = pd.DataFrame({
+            'Available Days': available,
+            'Occupied Days': occupied,
+            'Vacant Days': vacant,
+            'Vacancy Rate': np.divide(vacant, available, out=np.zeros(len(vacant)), where=available > 0),
+            'Monthly Rent': self.rents,
+            'Lost Rent': vacant * self.rents * 12 / DAYS_PER_YEAR,
+        }, index=pd.Index(self.unit_ids, name='Unit'))
+
+        return df[df['Available Days'] > 0]
+
+    def vacancy_for_year(self, year):
+        '''
+        returns vacancy per unit for a calendar year (up to today for the current year)
+        '''
+        start = date(year, 1, 1).toordinal()
+        end = min(date(year + 1, 1, 1).toordinal(), sql.today_ordinal() + 1)
+
+        return self.vacancy(start, end)
+
+    def timeline(self, unit_id, end=None):
+        '''
+        returns occupied and vacant segments of a unit in date order
+
+        Parameters
+        ---------
+        unit_id: int
+            - id of unit
+        end (optional): int
+            - day ordinal the timeline ends on (defaults to tomorrow, so an open tenancy or vacancy ends today)
+
+        Returns
+        ---------
+        df: Pandas DataFrame
+            - one row per tenancy and per vacancy gap from acquisition to end
+        '''
+        position = self._position(unit_id)
+        end = end or sql.today_ordinal() + 1
+        lo, hi = self.offsets[position], self.offsets[position + 1]
+
+        segments = [(int(start), int(min(stop, end)), int(id), name) for start, stop, id, name in
+                    zip(self.starts[lo:hi], self.ends[lo:hi], self.tenant_ids[lo:hi], self.names[lo:hi])
+                    if start < end]
+
+        # gaps between merged intervals (and before the first / after the last) are vacancies
+        merged = self.merged_units == position
+        cursor = int(self.acquired[position])
+        for start, stop in zip(self.merged_starts[merged], self.merged_ends[merged]):
+            if start > cursor and cursor < end:
+                segments.append((cursor, int(min(start, end)), None, None))
+            cursor = max(cursor, int(stop))
+        if cursor < end:
+            segments.append((cursor, end, None, None))
+
+        segments.sort(key=lambda segment: (segment[0], segment[2] is not None))
+
+        return pd.DataFrame([{
+            'Start': from_ordinal(start),
+            'End': from_ordinal(stop - 1),
+            'Days': stop - start,
+            'Status': 'occupied' if id is not None else 'vacant',
+            'Tenant ID': id,
+            'Tenant': name,
+        } for start, stop, id, name in segments],
+            columns=['Start', 'End', 'Days', 'Status', 'Tenant ID', 'Tenant']).astype({'Tenant ID': 'Int64'})
@@ -0,0 +1,277 @@
+import numpy as np
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper import validation as val
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_ordinals(dates):
+    '''
+    converts dates in YYYY-MM-DD format to integer day ordinals (same as date.toordinal)
+
+    Parameters
+    ---------
+    dates: list or str
+        - dates in YYYY-MM-DD format
+
+    Returns
+    ---------
+    output: NumPy array or int
+        - day ordinals for each date
+    '''
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+    return int(days) if np.ndim(days) == 0 else days
+
+def from_ordinal(day):
+    '''
+    converts an integer day ordinal to a date string in YYYY-MM-DD format
+    '''
+    return date.fromordinal(int(day)).isoformat()
+
+class PaymentIndex:
+    '''
+    A class to hold the payments of a single tenant as date-sorted parallel arrays
+
+    Constants
+    ---------
+    CATEGORIES: tuple
+        - payment categories, position in tuple is the code stored in categories
+    METHODS: tuple
+        - payment methods, position in tuple is the code stored in methods
+
+    Attributes
+    ---------
+    days: NumPy array
+        - sorted integer day ordinals of payment dates
+    amounts: NumPy array
+        - dollar value of each payment
+    categories: NumPy array
+        - category code of each payment (-1 if not in CATEGORIES)
+    methods: NumPy array
+        - method code of each payment (-1 if not in METHODS)
+    ids: NumPy array
+        - id of each payment
+
+    Methods
+    ---------
+    - range: returns positions of payments made on or after start and before end
+    - total: returns total amount paid between start and end
+    - assign_periods: returns the period each payment applies to
+    - period_totals: returns total paid per period
+    - on_time_totals: returns total paid per period before each period's on-time cutoff
+    - payment: returns payment row for a position in the index
+
+    Class Methods
+    ---------
+    - from_rows: creates index from payment rows
+    - build_all: creates one index per tenant from a single query
+    '''
+    CATEGORIES = val.PMT_CATEGORIES
+    METHODS = val.APPROVED_METHODS
+
+    def __init__(self, days, amounts, categories, methods, ids):
+        '''
+        Constructs the necessary attributes for the PaymentIndex object (arrays must be sorted by days).
+        '''
+        self.days = np.asarray(days, dtype=np.int64)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.categories = np.asarray(categories, dtype=np.int8)
+        self.methods = np.asarray(methods, dtype=np.int8)
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.days)
+
+    def __repr__(self):
+        return f"<PaymentIndex: {len(self)} payments>"
+
+    @classmethod
+    def _codes(cls, values, options):
+        '''
+        converts values to their position in options (-1 if not found)
+        '''
+        lookup = {option: code for code, option in enumerate(options)}
+        return np.fromiter((lookup.get(value, -1) for value in values), dtype=np.int8, count=len(values))
+
+    @classmethod
+    def from_rows(cls, rows):
+        '''
+        creates index from payment rows
+
+        Parameters
+        ---------
+        rows: list
+            - payment rows of (id, category, amount, pmt_date, method)
+
+        Returns
+        ---------
+        PaymentIndex instance
+            - index of the payments sorted by date
+        '''
+        ids, categories, amounts, dates, methods = zip(*rows) if rows else ((),) * 5
+        days = to_ordinals(list(dates)) if rows else np.array([], dtype=np.int64)
+        order = np.argsort(days, kind='stable')
+
+        return cls(
+            days=days[order],
+            amounts=np.array(amounts, dtype=np.float64)[order],
+            categories=cls._codes(categories, cls.CATEGORIES)[order],
+            methods=cls._codes(methods, cls.METHODS)[order],
+            ids=np.array(ids, dtype=np.int64)[order]
+        )
+
+    @classmethod
+    def build_all(cls, tenant_ids=None, cursor=None):
+        '''
+        creates one index per tenant from a single query
+
+        Parameters
+        ---------
+        tenant_ids (optional): list
+            - ids of tenants to build indexes for (defaults to all tenants)
+        cursor (optional): sqlite3 Cursor
+            - cursor to run query with (defaults to cursor bound to current thread)
+
+        Returns
+        ---------
+        indexes: dict
+            - PaymentIndex instances keyed by tenant id (tenants without payments get an empty index)
+        '''
+        cursor = cursor or sql.get_cursor()
+
+        filt = ""
+        params = ()
+        if tenant_ids is not None:
+            params = tuple(tenant_ids)
+            filt = f" WHERE tenant_id IN ({', '.join('?' * len(params))})"
+
+        # pmt_day is a generated day ordinal column, so no date strings are parsed here
+        query = "SELECT id, category, amount, pmt_day, method, tenant_id FROM payments" + filt + \
+            " ORDER BY tenant_id, pmt_day, id"
+        rows = cursor.execute(query, params).fetchall()
+
+        indexes = {id: cls.from_rows([]) for id in tenant_ids} if tenant_ids is not None else {}
+        if not rows:
+            return indexes
+
+        ids, categories, amounts, days, methods, tenants = zip(*rows)
+        tenants = np.array(tenants, dtype=np.int64)
+        all_index = cls(
+            days=days,
+            amounts=amounts,
+            categories=cls._codes(categories, cls.CATEGORIES),
+            methods=cls._codes(methods, cls.METHODS),
+            ids=ids
+        )
+
+        # rows are sorted by tenant, so each tenant is a contiguous block
+        tenant_ids_found, starts = np.unique(tenants, return_index=True)
+        stops = np.append(starts[1:], len(tenants))
+
+        for tenant_id, start, stop in zip(tenant_ids_found, starts, stops):
+            block = slice(start, stop)
+            indexes[int(tenant_id)] = cls(all_index.days[block], all_index.amounts[block],
+                                          all_index.categories[block], all_index.methods[block],
+                                          all_index.ids[block])
+
+        return indexes
+
+    def _mask(self, category):
+        '''
+        returns boolean array selecting payments of the specified category (all if None)
+        '''
+        if category is None:
+            return np.ones(len(self), dtype=bool)
+        return self.categories == self.CATEGORIES.index(category)
+
+    def range(self, start=None, end=None):
+        '''
+        returns positions of payments made on or after start and before end
+
+        Parameters
+        ---------
+        start (optional): int
+            - day ordinal of the first day in the range (defaults to first payment)
+        end (optional): int
+            - day ordinal after the last day in the range (defaults to last payment)
+
+        Returns
+        ---------
+        output: slice
+            - positions of payments in the range
+        '''
+        lo = 0 if start is None else np.searchsorted(self.days, start, side='left')
+        hi = len(self) if end is None else np.searchsorted(self.days, end, side='left')
+        return slice(int(lo), int(hi))
+
+    def total(self, start=None, end=None, category=None):
+        '''
+        returns total amount paid between start and end for the specified category
+        '''
+        block = self.range(start, end)
+        return float(self.amounts[block][self._mask(category)[block]].sum())
+
+    def assign_periods(self, period_ends):
+        '''
+        returns the period each payment applies to
+
+        Parameters
+        ---------
+        period_ends: NumPy array
+            - sorted day ordinals on which each period ends (exclusive)
+
+        Returns
+        ---------
+        output: NumPy array
+            - position of the first period ending after each payment
+            - payments before the first period apply to the first period
+            - payments after the last period are set to len(period_ends)
+        '''
+        return np.searchsorted(period_ends, self.days, side='right')
+
+    def period_totals(self, period_ends, category=None):
+        '''
+        returns total paid per period for the specified category
+        '''
+        periods = self.assign_periods(period_ends)
+        mask = self._mask(category) & (periods < len(period_ends))
+        return np.bincount(periods[mask], weights=self.amounts[mask], minlength=len(period_ends))
+
+    def on_time_totals(self, period_ends, cutoffs, category=None):
+        '''
+        returns total paid per period before each period's on-time cutoff
+
+        Parameters
+        ---------
+        period_ends: NumPy array
+            - sorted day ordinals on which each period ends (exclusive)
+        cutoffs: NumPy array
+            - day ordinal for each period on or after which a payment is late
+        category (optional): str
+            - payment category to total (defaults to all categories)
+
+        Returns
+        ---------
+        output: NumPy array
+            - total paid on time in each period
+        '''
+        periods = self.assign_periods(period_ends)
+        mask = self._mask(category) & (periods < len(period_ends))
+        on_time = self.days[mask] < np.asarray(cutoffs)[periods[mask]]
+        return np.bincount(periods[mask][on_time], weights=self.amounts[mask][on_time], minlength=len(period_ends))
+
+    def payment(self, position):
+        '''
+        returns payment row of (id, category, amount, pmt_date, method) for a position in the index
+        '''
+        category = self.categories[position]
+        method = self.methods[position]
+        return (
+            int(self.ids[position]),
+            self.CATEGORIES[category] if category >= 0 else None,
+            float(self.amounts[position]),
+            from_ordinal(self.days[position]),
+            self.METHODS[method] if method >= 0 else None
+        )
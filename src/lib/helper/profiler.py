@@ -0,0 +1,403 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import cProfile
+import functools
+import threading
+import pandas as pd
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# project modules
+from lib.helper import sql_helper as sql
+
+PROFILE_DIR = "./outputs/profiles"
+
+# time spent in each category is reported separately for every procedure
+CATEGORIES = ("sql", "render", "input")
+
+# profiler collecting timings (None unless profiling was enabled)
+ACTIVE = None
+
+def timed(category):
+    '''
+    returns a context manager which adds the time spent in the with block to the running procedure
+
+    Does nothing unless profiling is enabled, so hot paths can be instrumented permanently.
+
+    Parameters
+    ---------
+    category: str
+        - one of CATEGORIES (e.g. 'render')
+    '''
+    return ACTIVE.timed(category) if ACTIVE else nullcontext()
+
+class TimedCursor(sqlite3.Cursor):
+    '''
+    A cursor which reports the time spent executing and fetching each statement to a profiler
+
+    SQLite steps through the results of a query as rows are fetched, so fetch time is added to
+    the last statement executed on the cursor.
+    '''
+    profiler = None
+    query = None
+
+    def execute(self, query, params=()):
+        self.query = query
+        with self.profiler.statement(query):
+            return super().execute(query, params)
+
+    def executemany(self, query, params):
+        self.query = query
+        with self.profiler.statement(query):
+            return super().executemany(query, params)
+
+    def executescript(self, script):
+        self.query = script
+        with self.profiler.statement(script):
+            return super().executescript(script)
+
+    def fetchone(self):
+        with self.profiler.statement(self.query, fetch=True):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with self.profiler.statement(self.query, fetch=True):
+            return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        with self.profiler.statement(self.query, fetch=True):
+            return super().fetchall()
+
+class StackSampler(threading.Thread):
+    '''
+    A thread which samples the call stack of another thread at a fixed interval
+
+    Attributes
+    ---------
+    thread_id: int
+        - identifier of the sampled thread
+    interval: float
+        - seconds between samples
+    stacks: Counter
+        - number of samples per call stack (frames from outermost to innermost, separated by ';')
+    '''
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+class Profiler:
+    '''
+    A class to record wall and CPU time of menu procedures, split into SQL, rendering and user input
+
+    Attributes
+    ---------
+    output_dir: str
+        - folder to save profiles in
+    cprofile: boolean
+        - True to run each procedure under cProfile
+    sample_interval: float
+        - seconds between call stack samples for flame graphs (None to disable sampling)
+    top: int
+        - number of slowest procedure runs to keep detailed profiles for
+    runs: list
+        - timings of each procedure run (dict per run)
+    statements: dict
+        - [executions, seconds] per SQL statement
+
+    Methods
+    ---------
+    - enable: starts collecting timings (SQL on the shared cursor is timed from now on)
+    - disable: stops collecting timings and restores the shared cursor
+    - instrument: wraps a function of a module so the time spent in it is added to a category
+    - procedure: times a procedure run (used in a with block)
+    - timed: adds the time spent in a with block to the running procedure
+    - statement: adds the time spent running a SQL statement to the running procedure
+    - summary: returns timings per procedure
+    - statement_summary: returns timings per SQL statement
+    - dump: saves summaries and the profiles of the slowest runs
+    '''
+    def __init__(self, output_dir=PROFILE_DIR, cprofile=False, sample_interval=None, top=5):
+        '''
+        Constructs the necessary attributes for the Profiler object.
+
+        Parameters
+        ---------
+        output_dir (optional): str
+            - folder to save profiles in
+        cprofile (optional): boolean
+            - True to run each procedure under cProfile (pstats files are saved for the slowest runs)
+        sample_interval (optional): float
+            - seconds between call stack samples (folded stack files are saved for the slowest runs)
+        top (optional): int
+            - number of slowest procedure runs to keep detailed profiles for
+        '''
+        self.output_dir = output_dir
+        self.cprofile = cprofile
+        self.sample_interval = sample_interval
+        self.top = top
+        self.runs = []
+        self.statements = {}
+
+        self._current = None
+        self._depth = dict.fromkeys(CATEGORIES, 0)
+        self._cursor = None
+        self._patched = []
+
+    def __repr__(self):
+        return f"<Profiler: {len(self.runs)} runs, {len(self.statements)} statements>"
+
+    # ///////////////////////////////////////////////////////////////
+    # ENABLE AND DISABLE
+
+    def enable(self):
+        '''
+        starts collecting timings (SQL on the shared cursor is timed from now on)
+        '''
+        global ACTIVE
+        if ACTIVE is self:
+            return
+        ACTIVE = self
+
+        self._cursor = sql.CURSOR
+        cursor = sql.CONN.cursor(factory=TimedCursor)
+        cursor.profiler = self
+        sql.CURSOR = cursor
+
+    def disable(self):
+        '''
+        stops collecting timings and restores the shared cursor and instrumented functions
+        '''
+        global ACTIVE
+        ACTIVE = None
+
+        if self._cursor is not None:
+            sql.CURSOR = self._cursor
+            self._cursor = None
+
+        for module, name, func in reversed(self._patched):
+            setattr(module, name, func)
+        self._patched = []
+
+    def instrument(self, module, name, category):
+        '''
+        wraps a function of a module so the time spent in it is added to a category
+
+        Parameters
+        ---------
+        module: module
+            - module the function is looked up in by its callers (e.g. a module which did `from rich import print`)
+        name: str
+            - name of the function in the module
+        category: str
+            - one of CATEGORIES
+        '''
+        func = getattr(module, name)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.timed(category):
+                return func(*args, **kwargs)
+
+        self._patched.append((module, name, func))
+        setattr(module, name, wrapper)
+
+    # ///////////////////////////////////////////////////////////////
+    # TIMING
+
+    @contextmanager
+    def procedure(self, label):
+        '''
+        times a procedure run (used in a with block)
+
+        Parameters
+        ---------
+        label: str
+            - name of the procedure (e.g. menu option label)
+        '''
+        run = {'procedure': label, 'wall': 0.0, 'cpu': 0.0, 'sql_statements': 0,
+               **dict.fromkeys(CATEGORIES, 0.0)}
+        previous, self._current = self._current, run
+
+        profile = cProfile.Profile() if self.cprofile else None
+        sampler = StackSampler(threading.get_ident(), self.sample_interval) if self.sample_interval else None
+        if sampler:
+            sampler.start()
+
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield run
+        finally:
+            if profile:
+                profile.disable()
+            if sampler:
+                sampler.stop()
+
+            run['wall'] = time.perf_counter() - start_wall
+            run['cpu'] = time.process_time() - start_cpu
+            # time waiting on the user is not time the app was slow
+            run['active'] = run['wall'] - run['input']
+            run['profile'] = profile
+            run['stacks'] = sampler.stacks if sampler else None
+
+            self._current = previous
+            self.runs.append(run)
+            self._keep_slowest()
+
+    @contextmanager
+    def timed(self, category):
+        '''
+        adds the time spent in a with block to the running procedure
+
+        Parameters
+        ---------
+        category: str
+            - one of CATEGORIES
+        '''
+        # nested blocks of the same category (e.g. a fetch inside an execute) are only counted once
+        self._depth[category] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[category] -= 1
+            if self._depth[category] == 0 and self._current is not None:
+                self._current[category] += time.perf_counter() - start
+
+    @contextmanager
+    def statement(self, query, fetch=False):
+        '''
+        adds the time spent running a SQL statement to the running procedure and to the statement totals
+
+        Parameters
+        ---------
+        query: str
+            - SQL statement
+        fetch (optional): boolean
+            - True when fetching rows of a statement already executed (not counted as an execution)
+        '''
+        start = time.perf_counter()
+        try:
+            with self.timed('sql'):
+                yield
+        finally:
+            seconds = time.perf_counter() - start
+
+            key = " ".join(str(query).split())
+            totals = self.statements.setdefault(key, [0, 0.0])
+            totals[0] += 0 if fetch else 1
+            totals[1] += seconds
+
+            if self._current is not None and not fetch:
+                self._current['sql_statements'] += 1
+
+    def _keep_slowest(self):
+        '''
+        drops detailed profiles of all but the slowest runs so memory stays bounded
+        '''
+        detailed = [run for run in self.runs if run['profile'] or run['stacks']]
+        for run in sorted(detailed, key=lambda run: run['active'], reverse=True)[self.top:]:
+            run['profile'] = None
+            run['stacks'] = None
+
+    # ///////////////////////////////////////////////////////////////
+    # OUTPUT
+
+    def summary(self):
+        '''
+        returns timings per procedure
+
+        Returns
+        ---------
+        df: Pandas DataFrame
+            - runs, total and slowest active seconds, and total wall, CPU, SQL, render and input seconds
+            per procedure (slowest first)
+        '''
+        columns = ['wall', 'cpu', 'active', *CATEGORIES, 'sql_statements']
+        runs = pd.DataFrame(self.runs, columns=['procedure', *columns])
+
+        df = runs.groupby('procedure')[columns].sum()
+        df.insert(0, 'runs', runs.groupby('procedure').size())
+        df.insert(1, 'max_active', runs.groupby('procedure')['active'].max())
+
+        return df.sort_values('active', ascending=False).round(4)
+
+    def statement_summary(self):
+        '''
+        returns timings per SQL statement
+
+        Returns
+        ---------
+        df: Pandas DataFrame
+            - executions, total and mean seconds per statement (slowest first)
+        '''
+        df = pd.DataFrame([(query, calls, seconds) for query, (calls, seconds) in self.statements.items()],
+                          columns=['statement', 'executions', 'seconds'])
+        df['mean_ms'] = df['seconds'] / df['executions'].clip(lower=1) * 1000
+
+        return df.sort_values('seconds', ascending=False).reset_index(drop=True).round(4)
+
+    def dump(self, output_dir=None):
+        '''
+        saves summaries and the profiles of the slowest runs
+
+        Files saved:
+        - procedures.csv and statements.csv: outputs of summary and statement_summary
+        - <rank>_<procedure>.pstats: cProfile stats of a slow run (open with pstats or snakeviz)
+        - <rank>_<procedure>.folded: sampled call stacks of a slow run, one "frame;frame;frame count" line
+        per stack (input for flamegraph.pl or speedscope)
+
+        Parameters
+        ---------
+        output_dir (optional): str
+            - folder to save files in (defaults to output_dir of the profiler)
+
+        Returns
+        ---------
+        paths: list
+            - paths of the saved files
+        '''
+        output_dir = output_dir or self.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        paths = [os.path.join(output_dir, "procedures.csv"), os.path.join(output_dir, "statements.csv")]
+        self.summary().to_csv(paths[0])
+        self.statement_summary().to_csv(paths[1], index=False)
+
+        detailed = [run for run in self.runs if run['profile'] or run['stacks']]
+        for rank, run in enumerate(sorted(detailed, key=lambda run: run['active'], reverse=True), start=1):
+            name = f"{rank:02d}_{re.sub(r'[^a-z0-9]+', '_', run['procedure'].lower()).strip('_')}"
+
+            if run['profile']:
+                paths.append(os.path.join(output_dir, f"{name}.pstats"))
+                run['profile'].dump_stats(paths[-1])
+
+            if run['stacks']:
+                paths.append(os.path.join(output_dir, f"{name}.folded"))
+                with open(paths[-1], 'w') as file:
+                    for stack, count in run['stacks'].most_common():
+                        file.write(f"{stack} {count}\n")
+
+        return paths
@@ -0,0 +1,373 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper import validation as val
+
+TABLE = "rent_history"
+DB_COLUMNS = ("id", "unit_id", "effective_date", "monthly_rent", "late_fee")
+DF_COLUMNS = ("id", "Unit", "Effective Date", "Monthly Rent", "Late Fee")
+
+# unit columns which can be adjusted in bulk (both are recorded in the history)
+ADJUSTABLE_FIELDS = ("monthly_rent", "late_fee")
+
+def _history_triggers():
+    '''
+    returns statements creating triggers which record the rent of every unit when it is added or changed
+
+    A change made through the Unit model (e.g. "Update Unit Information") takes effect today. Bulk adjustments
+    record their own effective date first, so the update trigger finds the new rent already recorded.
+    '''
+    today = "date('now', 'localtime')"
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_units_rent_history_insert
+        AFTER INSERT ON units
+        BEGIN
+            INSERT OR REPLACE INTO rent_history (unit_id, effective_date, monthly_rent, late_fee)
+            VALUES (NEW.id, COALESCE(NEW.acquisition_date, {today}), NEW.monthly_rent, NEW.late_fee);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_units_rent_history_update
+        AFTER UPDATE OF monthly_rent, late_fee ON units
+        WHEN NOT EXISTS (
+            SELECT 1 FROM rent_history AS h
+            WHERE h.id = (
+                SELECT id FROM rent_history
+                WHERE unit_id = NEW.id AND effective_date <= {today}
+                ORDER BY effective_date DESC LIMIT 1
+            )
+            AND h.monthly_rent = NEW.monthly_rent AND h.late_fee = NEW.late_fee
+        )
+        BEGIN
+            INSERT INTO rent_history (unit_id, effective_date, monthly_rent, late_fee)
+            VALUES (NEW.id, {today}, NEW.monthly_rent, NEW.late_fee)
+            ON CONFLICT (unit_id, effective_date)
+            DO UPDATE SET monthly_rent = excluded.monthly_rent, late_fee = excluded.late_fee;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_units_rent_history_delete
+        AFTER DELETE ON units
+        BEGIN
+            DELETE FROM rent_history WHERE unit_id = OLD.id;
+        END
+        """,
+    ]
+
+def create_table():
+    '''
+    creates the history of rents in effect for each unit (one row per unit and effective date)
+    and records the current rent of units without history as of their acquisition date
+    (units table must exist)
+    '''
+    sql.CURSOR.execute("""
+        CREATE TABLE IF NOT EXISTS rent_history (
+        id INTEGER PRIMARY KEY,
+        unit_id INTEGER NOT NULL,
+        effective_date DATE NOT NULL,
+        monthly_rent NUMERIC,
+        late_fee NUMERIC,
+        UNIQUE (unit_id, effective_date),
+        FOREIGN KEY (unit_id) REFERENCES units(id) ON DELETE CASCADE)
+    """)
+
+    for statement in _history_triggers():
+        sql.CURSOR.execute(statement)
+
+    sql.CURSOR.execute("""
+        INSERT INTO rent_history (unit_id, effective_date, monthly_rent, late_fee)
+        SELECT u.id, COALESCE(u.acquisition_date, date('now', 'localtime')), u.monthly_rent, u.late_fee
+        FROM units AS u
+        WHERE NOT EXISTS (SELECT 1 FROM rent_history AS h WHERE h.unit_id = u.id)
+    """)
+    sql.CONN.commit()
+
+    sql.track_table_version(TABLE)
+
+def drop_table():
+    '''
+    drops the history of rents
+    '''
+    sql.drop_table(TABLE)
+
+def get_rent_history(unit_id=None):
+    '''
+    returns the rents in effect for each unit over time
+
+    Parameters
+    ---------
+    unit_id (optional): int
+        - id of Unit to filter on (defaults to all units)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - one row per unit and effective date, sorted by unit and date
+    '''
+    filt = " WHERE unit_id = ?" if unit_id else ""
+    params = (unit_id,) if unit_id else ()
+
+    rows = sql.get_cursor().execute(f"""
+        SELECT {', '.join(DB_COLUMNS)} FROM rent_history{filt}
+        ORDER BY unit_id, effective_date
+    """, params).fetchall()
+
+    return pd.DataFrame(rows, columns=DF_COLUMNS)
+
+# ///////////////////////////////////////////////////////////////
+# RENT IN EFFECT
+
+class RentSchedule:
+    '''
+    A class to look up the rent and late fee in effect for many (unit, day) pairs at once
+
+    History rows are sorted by one integer key per (unit, effective day), so the rent in effect for any
+    number of periods is found with a single as-of search (the latest change on or before each day).
+
+    Attributes
+    ---------
+    keys: NumPy array
+        - sorted (unit id, effective day ordinal) keys of the history rows
+    rents: NumPy array
+        - monthly rent from each effective day
+    late_fees: NumPy array
+        - late fee from each effective day
+
+    Methods
+    ---------
+    - in_effect: returns the rent and late fee in effect for each (unit, day) pair
+
+    Class Methods
+    ---------
+    - build: loads the rent history of units using one query
+    '''
+    SCALE = np.int64(1 << 32)
+
+    def __init__(self, unit_ids, days, rents, late_fees):
+        '''
+        Constructs the necessary attributes for the RentSchedule object.
+
+        Parameters
+        ---------
+        unit_ids, days, rents, late_fees: array-like
+            - unit id, effective day ordinal, monthly rent and late fee of each history row (any order)
+        '''
+        keys = np.asarray(unit_ids, dtype=np.int64) * self.SCALE + np.asarray(days, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+
+        self.keys = keys[order]
+        self.rents = np.asarray(rents, dtype=np.float64)[order]
+        self.late_fees = np.asarray(late_fees, dtype=np.float64)[order]
+
+    def __repr__(self):
+        return f"<RentSchedule: {len(self.keys)} rent changes>"
+
+    @classmethod
+    def build(cls, unit_ids=None, cursor=None):
+        '''
+        loads the rent history of units using one query
+
+        Parameters
+        ---------
+        unit_ids (optional): list
+            - ids of units to load (defaults to all units)
+        cursor (optional): sqlite3 Cursor
+            - cursor to run the query with (defaults to cursor bound to current thread)
+
+        Returns
+        ---------
+        RentSchedule instance
+        '''
+        cursor = cursor or sql.get_cursor()
+
+        filt = ""
+        params = ()
+        if unit_ids is not None:
+            params = tuple(unit_ids)
+            filt = f" WHERE unit_id IN ({', '.join('?' * len(params))})"
+
+        rows = cursor.execute(f"""
+            SELECT unit_id, CAST(julianday(effective_date) - {sql.JULIAN_DAY_OFFSET} AS INTEGER), monthly_rent, late_fee
+            FROM rent_history{filt}
+        """, params).fetchall()
+
+        return cls(*zip(*rows)) if rows else cls((), (), (), ())
+
+    def in_effect(self, unit_ids, days):
+        '''
+        returns the rent and late fee in effect for each (unit, day) pair
+
+        Days before the first recorded change of a unit use its first recorded rent.
+
+        Parameters
+        ---------
+        unit_ids: int or NumPy array
+            - unit id of each pair (a single id applies to every day)
+        days: NumPy array
+            - day ordinal of each pair (e.g. rent due dates)
+
+        Returns
+        ---------
+        rents: NumPy array
+            - monthly rent in effect on each day (NaN for units without history)
+        late_fees: NumPy array
+            - late fee in effect on each day (NaN for units without history)
+        '''
+        days = np.asarray(days, dtype=np.int64)
+        unit_ids = np.broadcast_to(np.asarray(unit_ids, dtype=np.int64), days.shape)
+
+        if not len(self.keys):
+            return np.full(days.shape, np.nan), np.full(days.shape, np.nan)
+
+        # latest change on or before each day, but never a row of the previous unit
+        last = np.searchsorted(self.keys, unit_ids * self.SCALE + days, side='right') - 1
+        first = np.searchsorted(self.keys, unit_ids * self.SCALE, side='left')
+        pos = np.minimum(np.maximum(last, first), len(self.keys) - 1)
+        found = self.keys[pos] // self.SCALE == unit_ids
+
+        return np.where(found, self.rents[pos], np.nan), np.where(found, self.late_fees[pos], np.nan)
+
+# ///////////////////////////////////////////////////////////////
+# BULK ADJUSTMENTS
+
+def _adjustment(field, percent, amount, unit_ids, acquired_after, acquired_before):
+    '''
+    returns the SQL expression of the adjusted value and the filter on units (with their parameters)
+    '''
+    if field not in ADJUSTABLE_FIELDS:
+        raise ValueError("Field must match one of the following:", list(ADJUSTABLE_FIELDS))
+    if (percent is None) == (amount is None):
+        raise ValueError("Enter either a percentage or a fixed amount to adjust by")
+
+    # rounded to cents so the preview shows exactly what is written
+    expr = f"ROUND({field} * (1 + ? / 100.0), 2)" if percent is not None else f"ROUND({field} + ?, 2)"
+    expr_params = (float(percent if percent is not None else amount),)
+
+    filt = "WHERE 1 = 1"
+    filt_params = []
+
+    if unit_ids:
+        filt += f" AND id IN ({', '.join('?' * len(unit_ids))})"
+        filt_params.extend(unit_ids)
+
+    # dates are stored as YYYY-MM-DD text, so string comparison matches date order
+    for date_value, operator in ((acquired_after, ">="), (acquired_before, "<=")):
+        if date_value is not None:
+            filt += f" AND acquisition_date {operator} ?"
+            filt_params.append(val.date_validation(date_value))
+
+    return expr, expr_params, filt, tuple(filt_params)
+
+def preview_adjustment(field="monthly_rent", percent=None, amount=None, unit_ids=None,
+                       acquired_after=None, acquired_before=None):
+    '''
+    returns the current and adjusted value of every unit an adjustment applies to (nothing is written)
+
+    Parameters
+    ---------
+    field (optional): str
+        - 'monthly_rent' or 'late_fee'
+    percent (optional): float
+        - percentage to adjust by (e.g. 3 for a 3% increase, -5 for a 5% decrease)
+    amount (optional): float
+        - fixed amount to adjust by (e.g. 50 or -25), used instead of percent
+    unit_ids (optional): list
+        - ids of units to adjust (defaults to all units)
+    acquired_after (optional): str
+        - only adjust units acquired on or after this date (YYYY-MM-DD)
+    acquired_before (optional): str
+        - only adjust units acquired on or before this date (YYYY-MM-DD)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - unit id, address, current value, adjusted value and change, one row per unit
+    '''
+    expr, expr_params, filt, filt_params = _adjustment(field, percent, amount, unit_ids,
+                                                      acquired_after, acquired_before)
+
+    rows = sql.get_cursor().execute(f"""
+        SELECT id, address, {field}, {expr}
+        FROM units {filt}
+        ORDER BY id
+    """, expr_params + filt_params).fetchall()
+
+    df = pd.DataFrame(rows, columns=['Unit', 'Address', 'Current', 'Adjusted'])
+    df['Address'] = df['Address'].str.replace("\n", ", ")
+    df['Change'] = df['Adjusted'] - df['Current']
+
+    return df
+
+def apply_adjustment(field="monthly_rent", percent=None, amount=None, unit_ids=None,
+                     acquired_after=None, acquired_before=None, effective_date=None):
+    '''
+    adjusts the rent (or late fee) of many units with one set-based UPDATE and records it in the rent history,
+    in a single transaction
+
+    Parameters
+    ---------
+    field, percent, amount, unit_ids, acquired_after, acquired_before:
+        - see preview_adjustment
+    effective_date (optional): str
+        - first day the adjusted value applies (YYYY-MM-DD, defaults to today), earlier dates adjust
+          rollforwards retroactively
+
+    Returns
+    ---------
+    summary: dict
+        - units adjusted, total change per month and elapsed seconds
+    '''
+    from lib import Unit
+
+    start = time.perf_counter()
+    expr, expr_params, filt, filt_params = _adjustment(field, percent, amount, unit_ids,
+                                                      acquired_after, acquired_before)
+
+    effective_date = val.date_validation(effective_date) if effective_date else date.today().isoformat()
+    if effective_date > date.today().isoformat():
+        raise ValueError("Effective date cannot be in the future")
+
+    preview = preview_adjustment(field, percent, amount, unit_ids, acquired_after, acquired_before)
+    if (preview['Adjusted'] < 0).any():
+        raise ValueError(f"Adjustment would make {field} negative for units:",
+                         preview.loc[preview['Adjusted'] < 0, 'Unit'].tolist())
+
+    # the current value is the latest in the history, so earlier adjustments cannot be inserted before it
+    later = sql.CURSOR.execute(f"""
+        SELECT DISTINCT unit_id FROM rent_history
+        WHERE effective_date > ? AND unit_id IN (SELECT id FROM units {filt})
+    """, (effective_date, *filt_params)).fetchall()
+    if later:
+        raise ValueError(f"Rent of these units changed after {effective_date}:", [row[0] for row in later])
+
+    # history is recorded first, so the update trigger on units finds the new rent already recorded
+    other = next(col for col in ADJUSTABLE_FIELDS if col != field)
+    with sql.WRITE_LOCK:
+        try:
+            sql.CURSOR.execute(f"""
+                INSERT INTO rent_history (unit_id, effective_date, {field}, {other})
+                SELECT id, ?, {expr}, {other}
+                FROM units {filt}
+                ON CONFLICT (unit_id, effective_date)
+                DO UPDATE SET monthly_rent = excluded.monthly_rent, late_fee = excluded.late_fee
+            """, (effective_date, *expr_params, *filt_params))
+            sql.CURSOR.execute(f"UPDATE units SET {field} = {expr} {filt}", expr_params + filt_params)
+            adjusted = sql.CURSOR.rowcount
+            sql.CONN.commit()
+        except Exception:
+            sql.CONN.rollback()
+            raise
+
+    # refresh cached instances of adjusted units (their rows changed behind the identity map)
+    rows = sql.CURSOR.execute(f"SELECT {sql.column_list(Unit)} FROM units {filt}", filt_params).fetchall()
+    for row in rows:
+        if row[0] in Unit.all:
+            Unit.instance_from_db(row)
+
+    return {'units': adjusted, 'change': float(preview['Change'].sum()), 'effective_date': effective_date,
+            'seconds': time.perf_counter() - start}
@@ -0,0 +1,387 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper.occupancy import OccupancyIndex
+from lib.helper.payment_index import EPOCH_ORDINAL, PaymentIndex, from_ordinal
+from lib.helper.rent_history import RentSchedule
+from lib.helper.rollforward import LATE_AFTER_DAYS
+
+COLUMNS = ["As Of", "Unit", "Address", "Status", "Tenant ID", "Tenant", "Move In Date",
+           "Monthly Rent", "Balance", "Last Payment Date", "Last Payment Amount"]
+
+def period_grid(move_in_days, stop_days):
+    '''
+    returns monthly rent periods of many tenancies at once (same periods as rollforward.period_bounds)
+
+    Parameters
+    ---------
+    move_in_days: NumPy array
+        - move in day ordinal of each tenancy
+    stop_days: NumPy array
+        - day ordinal before which periods must start (e.g. move out day)
+
+    Returns
+    ---------
+    starts: NumPy array
+        - 2D array (tenancy x period) of day ordinals each period starts
+    valid: NumPy array
+        - 2D boolean array marking periods which start before the stop day
+    '''
+    move_ins = np.asarray(move_in_days, dtype=np.int64) - EPOCH_ORDINAL
+    n_periods = int(((np.asarray(stop_days) - EPOCH_ORDINAL - move_ins).max(initial=0)) // 28 + 2)
+
+    days = move_ins.astype('datetime64[D]')
+    first_month = days.astype('datetime64[M]')
+    first_day = (days - first_month.astype('datetime64[D]')).astype(np.int64) + 1
+
+    months = first_month[:, None] + np.arange(n_periods)
+    month_lengths = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+
+    # adding one month at a time clips the day to the length of each month and never grows back
+    period_days = np.minimum.accumulate(np.minimum(first_day[:, None], month_lengths), axis=1)
+
+    starts = months.astype('datetime64[D]').astype(np.int64) + period_days - 1 + EPOCH_ORDINAL
+    valid = starts < np.asarray(stop_days, dtype=np.int64)[:, None]
+
+    return starts, valid
+
+class RentRollBuilder:
+    '''
+    A class to build rent rolls (unit, current tenant, rent, balance, last payment) for any as-of date
+
+    Attributes
+    ---------
+    occupancy: OccupancyIndex instance
+        - tenancies of every unit
+    addresses: NumPy array
+        - address of each unit (same order as occupancy.unit_ids)
+    late_fees: NumPy array
+        - late fee of each unit (same order as occupancy.unit_ids)
+    payments: PaymentIndex instance
+        - payments of all tenants up to the last as-of date, sorted by date
+    payment_tenants: NumPy array
+        - tenant id of each payment in payments
+    schedule: RentSchedule instance
+        - rent history of every unit
+    starts: NumPy array
+        - 2D array (tenancy x period) of day ordinals each rent period starts
+    valid: NumPy array
+        - 2D boolean array marking periods before each tenant's move out
+
+    Methods
+    ---------
+    - rent_in_effect: returns the rent and late fee in effect for many (unit, day) pairs at once
+    - period_payments: returns rent periods started by a day with the rent paid in each, for many tenancies at once
+    - as_of: returns rent roll for a single day
+    - series: returns rent rolls for many days in one DataFrame
+
+    Class Methods
+    ---------
+    - build: loads everything needed for rent rolls up to a day using five queries
+    '''
+    def __init__(self, occupancy, addresses, late_fees, payments, payment_tenants, max_day, schedule=None):
+        '''
+        Constructs the necessary attributes for the RentRollBuilder object.
+        '''
+        self.occupancy = occupancy
+        self.addresses = np.asarray(addresses, dtype=object)
+        self.late_fees = np.asarray(late_fees, dtype=np.float64)
+        self.payments = payments
+        self.payment_tenants = np.asarray(payment_tenants, dtype=np.int64)
+        self.schedule = schedule if schedule is not None else RentSchedule((), (), (), ())
+
+        stop_days = np.minimum(occupancy.ends, max_day + 1)
+        self.starts, self.valid = period_grid(occupancy.starts, stop_days)
+
+        # payments sorted by tenant then day, so each tenant's payments are a contiguous block
+        self._order = np.lexsort((payments.days, self.payment_tenants))
+
+    def __repr__(self):
+        return f"<RentRollBuilder: {len(self.occupancy.unit_ids)} units, {len(self.payments)} payments>"
+
+    @classmethod
+    def build(cls, max_day=None):
+        '''
+        loads everything needed for rent rolls up to a day using five queries
+
+        Parameters
+        ---------
+        max_day (optional): int
+            - last day ordinal rent rolls will be built for (defaults to today)
+
+        Returns
+        ---------
+        RentRollBuilder instance
+        '''
+        max_day = max_day or sql.today_ordinal()
+        cursor = sql.get_cursor()
+
+        occupancy = OccupancyIndex.build()
+
+        units = dict((id, (address, late_fee)) for id, address, late_fee in
+                     cursor.execute("SELECT id, address, late_fee FROM units").fetchall())
+        addresses, late_fees = zip(*(units[id] for id in occupancy.unit_ids.tolist())) if units else ((), ())
+
+        rows = cursor.execute("""
+            SELECT id, category, amount, pmt_day, method, tenant_id
+            FROM payments
+            WHERE pmt_day <= ?
+            ORDER BY pmt_day, id
+        """, (max_day,)).fetchall()
+
+        ids, categories, amounts, days, methods, tenant_ids = zip(*rows) if rows else ((),) * 6
+        payments = PaymentIndex(days, amounts, PaymentIndex._codes(categories, PaymentIndex.CATEGORIES),
+                                PaymentIndex._codes(methods, PaymentIndex.METHODS), ids)
+
+        return cls(occupancy, addresses, late_fees, payments, tenant_ids, max_day, RentSchedule.build(cursor=cursor))
+
+    def rent_in_effect(self, units, days):
+        '''
+        returns the rent and late fee in effect for many (unit, day) pairs at once
+
+        Parameters
+        ---------
+        units: NumPy array
+            - position of each unit in occupancy.unit_ids
+        days: int or NumPy array
+            - day ordinal of each pair (e.g. rent due dates)
+
+        Returns
+        ---------
+        rents: NumPy array
+            - monthly rent in effect on each day (current rent of units without history)
+        late_fees: NumPy array
+            - late fee in effect on each day (current late fee of units without history)
+        '''
+        occ = self.occupancy
+        units = np.asarray(units)
+        rents, late_fees = self.schedule.in_effect(occ.unit_ids[units], np.broadcast_to(days, units.shape))
+
+        return (np.where(np.isnan(rents), occ.rents[units], rents),
+                np.where(np.isnan(late_fees), self.late_fees[units], late_fees))
+
+    def _current_tenancies(self, day):
+        '''
+        returns position of the tenancy occupying each unit on a day (-1 if vacant)
+        '''
+        occ = self.occupancy
+        covering = np.flatnonzero((occ.starts <= day) & (occ.ends > day))
+
+        # tenancies are sorted by unit then move in, so the last covering tenancy is the latest move in
+        current = np.full(len(occ.unit_ids), -1, dtype=np.int64)
+        current[occ.units[covering]] = covering
+        return current
+
+    def period_payments(self, tenancies, day):
+        '''
+        returns rent periods started by a day with the rent paid in each, for many tenancies at once
+
+        Parameters
+        ---------
+        tenancies: NumPy array
+            - positions of tenancies in the occupancy index
+        day: int
+            - as-of day ordinal (later periods and payments are ignored)
+
+        Returns
+        ---------
+        rows: NumPy array
+            - position in tenancies of each period (periods of a tenancy are contiguous and in date order)
+        starts: NumPy array
+            - day ordinal each period starts (rent due date)
+        paid: NumPy array
+            - rent paid in each period
+        paid_on_time: NumPy array
+            - rent paid in each period before its late cutoff
+        '''
+        occ = self.occupancy
+        if not len(tenancies):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([]), np.array([])
+
+        starts = self.starts[tenancies]
+        included = self.valid[tenancies] & (starts <= day)
+        ends = np.append(starts[:, 1:], starts[:, -1:] + 31, axis=1)
+
+        # flatten included periods into one sorted key space of (row, day) so payments of all tenants are assigned at once
+        rows, cols = np.nonzero(included)
+        scale = np.int64(1 << 32)
+        end_keys = rows * scale + ends[rows, cols]
+        cutoffs = starts[rows, cols] + LATE_AFTER_DAYS
+
+        pmt = self.payments
+        tenant_ids = occ.tenant_ids[tenancies]
+        order = np.argsort(tenant_ids, kind='stable')
+        is_rent = (pmt.categories == pmt.CATEGORIES.index('rent')) & (pmt.days <= day)
+
+        match = np.searchsorted(tenant_ids[order], self.payment_tenants)
+        match = np.minimum(match, len(order) - 1)
+        belongs = is_rent & (tenant_ids[order][match] == self.payment_tenants)
+        pmt_rows = order[match[belongs]]
+        pmt_days = pmt.days[belongs]
+        pmt_amounts = pmt.amounts[belongs]
+
+        period = np.searchsorted(end_keys, pmt_rows * scale + pmt_days, side='right')
+        in_range = period < len(end_keys)
+        in_range[in_range] = rows[period[in_range]] == pmt_rows[in_range]
+
+        paid = np.bincount(period[in_range], weights=pmt_amounts[in_range], minlength=len(end_keys))
+        on_time = pmt_days[in_range] < cutoffs[period[in_range]]
+        paid_on_time = np.bincount(period[in_range][on_time], weights=pmt_amounts[in_range][on_time],
+                                   minlength=len(end_keys))
+
+        return rows, starts[rows, cols], paid, paid_on_time
+
+    def _balances(self, tenancies, day):
+        '''
+        returns balance owed by each tenancy as of a day (rent and late fees due minus rent paid)
+        '''
+        occ = self.occupancy
+        rows, starts, paid, paid_on_time = self.period_payments(tenancies, day)
+
+        rents, late_fees = self.rent_in_effect(occ.units[tenancies][rows], starts)
+
+        # late fees are only charged once the cutoff of a period has passed
+        late = (starts + LATE_AFTER_DAYS <= day) & (rents - paid_on_time > 0)
+        owed = rents + late * late_fees - paid
+
+        return np.bincount(rows, weights=owed, minlength=len(tenancies))
+
+    def _last_payments(self, tenant_ids, day):
+        '''
+        returns day and amount of the last payment (any category) made by each tenant on or before a day
+        '''
+        pmt = self.payments
+        order = self._order
+        tenants_sorted = self.payment_tenants[order]
+        days_sorted = pmt.days[order]
+
+        # position after the last payment of each tenant on or before the day
+        keys = tenants_sorted * np.int64(1 << 32) + days_sorted
+        stop = np.searchsorted(keys, tenant_ids * np.int64(1 << 32) + day, side='right')
+        last = stop - 1
+        has_payment = (last >= 0) & (tenants_sorted[np.maximum(last, 0)] == tenant_ids)
+
+        last_days = np.where(has_payment, days_sorted[np.maximum(last, 0)], -1)
+        last_amounts = np.where(has_payment, pmt.amounts[order][np.maximum(last, 0)], np.nan)
+        return last_days, last_amounts
+
+    def as_of(self, day):
+        '''
+        returns rent roll for a single day
+
+        Parameters
+        ---------
+        day: int
+            - as-of day ordinal
+
+        Returns
+        ---------
+        df: Pandas DataFrame
+            - one row per unit owned on the day (vacant units have no tenant, balance or payment)
+        '''
+        occ = self.occupancy
+        owned = occ.acquired <= day
+        current = self._current_tenancies(day)
+        occupied = current >= 0
+        tenancies = current[occupied]
+
+        balances = np.full(len(occ.unit_ids), np.nan)
+        balances[occupied] = self._balances(tenancies, day)
+
+        last_days = np.full(len(occ.unit_ids), -1, dtype=np.int64)
+        last_amounts = np.full(len(occ.unit_ids), np.nan)
+        last_days[occupied], last_amounts[occupied] = self._last_payments(occ.tenant_ids[tenancies], day)
+
+        tenant_ids = pd.array(np.where(occupied, occ.tenant_ids[np.maximum(current, 0)], 0), dtype='Int64')
+        tenant_ids[~occupied] = pd.NA
+        names = np.array(occ.names + [None], dtype=object)[np.where(occupied, current, len(occ.names))]
+
+        df = pd.DataFrame({
+            'As Of': from_ordinal(day),
+            'Unit': occ.unit_ids,
+            'Address': self.addresses,
+            'Status': np.where(occupied, 'occupied', 'vacant'),
+            'Tenant ID': tenant_ids,
+            'Tenant': names,
+            'Move In Date': [from_ordinal(occ.starts[i]) if i >= 0 else None for i in current],
+            'Monthly Rent': self.rent_in_effect(np.arange(len(occ.unit_ids)), day)[0],
+            'Balance': balances,
+            'Last Payment Date': [from_ordinal(d) if d >= 0 else None for d in last_days],
+            'Last Payment Amount': last_amounts,
+        }, columns=COLUMNS)
+
+        return df[owned].reset_index(drop=True)
+
+    def series(self, days):
+        '''
+        returns rent rolls for many days in one DataFrame (inputs are loaded once for all days)
+        '''
+        return pd.concat([self.as_of(day) for day in days], ignore_index=True)
+
+def month_ends(start_date, end_date):
+    '''
+    returns day ordinals of the last day of each month between two dates (inclusive)
+
+    Parameters
+    ---------
+    start_date: str
+        - first date in YYYY-MM-DD format
+    end_date: str
+        - last date in YYYY-MM-DD format
+
+    Returns
+    ---------
+    output: list
+        - day ordinals of month ends on or after start_date and on or before end_date
+    '''
+    start = np.datetime64(start_date, 'M')
+    end = np.datetime64(end_date, 'D')
+    months = np.arange(start, end.astype('datetime64[M]') + 1)
+    last_days = (months + 1).astype('datetime64[D]') - 1
+
+    return [int(day) + EPOCH_ORDINAL for day in last_days.astype(np.int64)
+            if np.datetime64(start_date, 'D').astype(np.int64) <= day <= end.astype(np.int64)]
+
+def rent_roll(as_of_date=None):
+    '''
+    returns rent roll for a date (defaults to today)
+
+    Parameters
+    ---------
+    as_of_date (optional): str
+        - date in YYYY-MM-DD format
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - one row per unit with current tenant, rent, balance and last payment as of the date
+    '''
+    day = date.fromisoformat(as_of_date).toordinal() if as_of_date else sql.today_ordinal()
+    return RentRollBuilder.build(day).as_of(day)
+
+def month_end_rent_rolls(start_date, end_date=None):
+    '''
+    returns month-end rent rolls between two dates using a single load of the inputs
+
+    Parameters
+    ---------
+    start_date: str
+        - first date in YYYY-MM-DD format
+    end_date (optional): str
+        - last date in YYYY-MM-DD format (defaults to today)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - rent rolls for each month end stacked in date order (see the As Of column)
+    '''
+    end_date = end_date or date.today().isoformat()
+    days = month_ends(start_date, end_date)
+
+    if not days:
+        return pd.DataFrame(columns=COLUMNS)
+
+    return RentRollBuilder.build(max(days)).series(days)
@@ -1,16 +1,219 @@
+import os
+import hashlib
+import importlib.util
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+import matplotlib.image as mimage
 import matplotlib.ticker as mticker
+from matplotlib.figure import Figure
 from matplotlib.transforms import Bbox
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.backends.backend_pdf import PdfPages
-from functools import partial
+from functools import partial, lru_cache
 
 # project modules
 from lib.helper import sql_helper as sql
-from lib import Expense
-from lib import Payment
+from lib.helper import profiler
+from lib.helper import metrics
 
+# ///////////////////////////////////////////////////////////////
+# RENDERING
+
+def new_figure(figsize=(12, 8)):
+    '''
+    returns an empty figure drawn with the non-interactive Agg backend
+
+    Figures are not registered with pyplot, so no GUI backend is loaded and nothing
+    is kept alive after the page is saved.
+
+    Parameters
+    ---------
+    figsize (optional): tuple
+        - width and height of the figure in inches
+
+    Returns
+    ---------
+    fig: matplotly figure
+        - empty figure
+    '''
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+@lru_cache(maxsize=8)
+def load_background(path):
+    '''
+    returns the decoded pixels of a background image (decoded once per process, read-only)
+
+    Parameters
+    ---------
+    path: str
+        - file path of the image
+
+    Returns
+    ---------
+    img: NumPy array
+        - image pixels
+    '''
+    img = mimage.imread(path)
+    img.setflags(write=False)
+    return img
+
+def clear_figure(fig):
+    '''
+    removes everything drawn on a figure but keeps its axes, so the layout can be reused for another page
+
+    Parameters
+    ---------
+    fig: matplotly figure
+        - figure to clear
+    '''
+    for text in list(fig.texts):
+        text.remove()
+
+    for ax in fig.axes:
+        for artist in [*ax.lines, *ax.collections, *ax.patches, *ax.texts, *ax.images]:
+            artist.remove()
+        if ax.get_legend():
+            ax.get_legend().remove()
+        ax.set_title('')
+        ax.set_prop_cycle(None)  # restart default colors as on a new axes
+        ax.relim()
+
+
+# ///////////////////////////////////////////////////////////////
+# PAGE CACHE
+
+# folder holding one single-page pdf per rendered page, named by the fingerprint of its inputs
+REPORT_CACHE_DIR = "./outputs/report_cache"
+
+# bump when page layouts change so pages rendered by older code are not reused
+PAGE_CACHE_VERSION = f"1-matplotlib-{matplotlib.__version__}"
+
+# cached pages are spliced into the report with pypdf (in the Pipfile, every page is rendered without it)
+PAGE_CACHE_AVAILABLE = importlib.util.find_spec("pypdf") is not None
+
+def page_fingerprint(*inputs):
+    '''
+    returns a hash of everything a page is drawn from, so unchanged pages can be found in the cache
+
+    Parameters
+    ---------
+    inputs: any
+        - page name and inputs (DataFrames and Series are hashed by value, other inputs by repr)
+
+    Returns
+    ---------
+    fingerprint: str
+        - hex digest identifying the page
+    '''
+    digest = hashlib.sha256(PAGE_CACHE_VERSION.encode())
+
+    for item in inputs:
+        if isinstance(item, (pd.DataFrame, pd.Series)):
+            labels = item.columns if isinstance(item, pd.DataFrame) else [item.name]
+            digest.update(repr((list(labels), list(item.index.names))).encode())
+            digest.update(pd.util.hash_pandas_object(item, index=True).values.tobytes())
+        else:
+            digest.update(repr(item).encode())
+        digest.update(b"|")
+
+    return digest.hexdigest()
+
+class PageCache:
+    '''
+    A class to store rendered report pages on disk and splice them into a report
+
+    Attributes
+    ---------
+    folder: str
+        - folder holding one pdf file per cached page
+    pages: list
+        - file path of each page of the report being generated (in page order)
+
+    Methods
+    ---------
+    - add_cached: adds the cached page to the report if there is one
+    - add_figure: saves figure to the cache and adds it to the report
+    - write: merges the pages of the report into one pdf
+    '''
+    def __init__(self, folder=REPORT_CACHE_DIR):
+        '''
+        Constructs the necessary attributes for the PageCache object.
+
+        Parameters
+        ---------
+        folder (optional): str
+            - folder holding one pdf file per cached page (created if missing)
+        '''
+        os.makedirs(folder, exist_ok=True)
+
+        self.folder = folder
+        self.pages = []
+
+    def _path(self, fingerprint):
+        return os.path.join(self.folder, f"{fingerprint}.pdf")
+
+    def add_cached(self, fingerprint):
+        '''
+        adds the cached page to the report if there is one
+
+        Parameters
+        ---------
+        fingerprint: str
+            - fingerprint of the page inputs
+
+        Returns
+        ---------
+        found: bool
+            - True if the page was in the cache (nothing needs to be rendered)
+        '''
+        path = self._path(fingerprint)
+        if not os.path.exists(path):
+            return False
+
+        self.pages.append(path)
+        return True
+
+    def add_figure(self, fig, fingerprint):
+        '''
+        saves figure to the cache and adds it to the report
+
+        Parameters
+        ---------
+        fig: matplotly figure
+            - rendered page
+        fingerprint: str
+            - fingerprint of the page inputs
+        '''
+        path = self._path(fingerprint)
+
+        # written under a temporary name so an interrupted run never leaves a truncated page behind
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fig.savefig(tmp_path, format='pdf')
+        os.replace(tmp_path, path)
+
+        self.pages.append(path)
+
+    def write(self, path):
+        '''
+        merges the pages of the report into one pdf
+
+        Parameters
+        ---------
+        path: str
+            - file path to save report
+        '''
+        from pypdf import PdfWriter
+
+        writer = PdfWriter()
+        for page in self.pages:
+            writer.append(page)
+
+        with open(path, 'wb') as file:
+            writer.write(file)
+        writer.close()
 
 def text_figure(title_txt=None, subtitle_txt=None, subtitle2_txt=None, body_txt=None, 
                 font_color='black', color='white', background=None):
@@ -42,9 +245,9 @@ def text_figure(title_txt=None, subtitle_txt=None, subtitle2_txt=None, body_txt=
         4: {'txt': body_txt, 'height': .3, 'position': 0.8, 'fontsize': 30}
     }
     height_ratios = tuple(axes[i]['height'] for i in axes)
-    fig, (axes[1]['ax'], axes[2]['ax'], axes[3]['ax'], axes[4]['ax']) = \
-        plt.subplots(nrows=4, ncols=1, figsize=(12, 8), \
-                     height_ratios=height_ratios)
+    fig = new_figure()
+    (axes[1]['ax'], axes[2]['ax'], axes[3]['ax'], axes[4]['ax']) = \
+        fig.subplots(nrows=4, ncols=1, height_ratios=height_ratios)
 
     for i in axes:
         axis = axes[i]
@@ -63,13 +266,11 @@ def text_figure(title_txt=None, subtitle_txt=None, subtitle2_txt=None, body_txt=
     fig.patch.set_facecolor(color)
 
     if background:
-        img = plt.imread(background)
+        img = load_background(background)
         background_ax = fig.add_axes([0, 0, 1, 1], zorder=-1)
         background_ax.imshow(img, aspect='auto', extent=[0, 1, 0, 1])
         background_ax.axis('off')
 
-    plt.close(fig)
-
     return fig
 
 class Report:
@@ -80,25 +281,42 @@ class Report:
     ---------
     year: int
         - year for report
+    path: str
+        - file path to save report
+    snapshot: str
+        - snapshot folder transactions and tenancies are read from (None to read from the DB)
     report: PdfPages instance
-        - instance of pdf report
+        - instance of pdf report (None when pages go through the page cache)
+    cache: PageCache instance
+        - cache of rendered pages (None to render every page)
     units: list
         - list of units with transactions for specified year
+    rendered: int
+        - number of pages rendered
+    reused: int
+        - number of pages taken from the page cache
 
     Methods
     ---------
+    - fingerprint: returns fingerprint of the page inputs (None when the page cache is not used)
+    - add_cached_page: adds the cached page to the report if there is one
+    - save_page: adds rendered page to report (and to the page cache)
+    - close: saves the report
     - add_cover_page: creates cover page and adds to report
     - add_section_cover: creates section cover and adds to report
     - add_figure: adds matplotly figure as a page to report
     - group_data_for_year: groups data by specified year and column
+    - unit_totals: totals by year, type and category which every chart of a unit is drawn from
     - transaction_totals_annotation: creates figure showing transaction totals by type
     - add_transaction_bar: creates bar graph of transactions and adds to report
+    - add_vacancy_chart: creates bar graphs of vacancy rate and lost rent by unit and adds to report
     - transaction_line_subplot: creates line graph of transactions
     - transaction_pie_subplot: creates pie chart by category for specified transaction type
     - add_subplots: creates separate pages for each subplot and adds to report
+    - unit_page_template: returns the cleared figure and axes shared by every unit page
     - indiv_unit_charts: creates page for specified unit with subplots and adds to report
     '''
-    def __init__(self, year, path):
+    def __init__(self, year, path, snapshot=None, cache=None):
         '''
         Constructs the necessary attributes for the Report object.
 
@@ -106,27 +324,122 @@ class Report:
         ---------
         year: int
             - year for report
+        path: str
+            - file path to save report
+        snapshot (optional): str
+            - snapshot folder to read transactions from instead of the DB
+        cache (optional): PageCache instance
+            - cache of rendered pages, only pages whose inputs changed are rendered
         '''
         self.year = year
-        self.report = PdfPages(path)
+        self.path = path
+        self.snapshot = snapshot
+        self.cache = cache
+        self.report = None if cache else PdfPages(path)
+        self.rendered = 0
+        self.reused = 0
+
+        if snapshot:
+            from lib.helper.snapshot import read_transactions
+            transactions = read_transactions(snapshot, max_year=self.year)
+        else:
+            # year is a generated column in the DB, so filtering happens in SQL rather than by parsing dates
+            transactions = sql.get_all_transactions(max_year=self.year, with_year=True)
 
         self.df_dict = {
-            'transactions': sql.get_all_transactions(),
-            'expenses': Expense.get_dataframe(),
-            'payments': Payment.get_dataframe_w_unit()
+            'transactions': transactions,
+            'expenses': transactions[transactions['Type'] == 'expense'],
+            'payments': transactions[transactions['Type'] == 'payment']
         }
 
-        for type in self.df_dict:
-            df = self.df_dict[type]
-
-            df['Date'] = pd.to_datetime(df['Date'])
-            df['Year'] = self.df_dict[type]['Date'].dt.year
-            self.df_dict[type] = df[df['Year'] <= self.year]
-
         self.units = self.df_dict['transactions']['Unit'].unique()
 
+        # figure and axes of the unit page, built once and cleared for each unit
+        self._unit_page = None
+
         self.add_cover_page()
 
+    # ///////////////////////////////////////////////////////////////
+    # PAGE OUTPUT
+
+    def fingerprint(self, page, *inputs):
+        '''
+        returns fingerprint of the page inputs (None when the page cache is not used)
+
+        Parameters
+        ---------
+        page: str
+            - name of the page layout
+        inputs: any
+            - everything else the page is drawn from (the report year is always included)
+
+        Returns
+        ---------
+        fingerprint: str
+            - hex digest identifying the page
+        '''
+        if self.cache is None:
+            return None
+        return page_fingerprint(page, self.year, *inputs)
+
+    def add_cached_page(self, fingerprint):
+        '''
+        adds the cached page to the report if there is one
+
+        Parameters
+        ---------
+        fingerprint: str
+            - fingerprint of the page inputs (None when the page cache is not used)
+
+        Returns
+        ---------
+        found: bool
+            - True if the page was taken from the cache (nothing needs to be rendered)
+        '''
+        if fingerprint is None:
+            return False
+
+        if not self.cache.add_cached(fingerprint):
+            metrics.CACHE_LOOKUPS.inc("report_page", "miss")
+            return False
+
+        metrics.CACHE_LOOKUPS.inc("report_page", "hit")
+        metrics.REPORT_PAGES.inc("cache")
+        self.reused += 1
+        return True
+
+    def save_page(self, fig, fingerprint=None):
+        '''
+        adds rendered page to report (and to the page cache)
+
+        Parameters
+        ---------
+        fig: matplotly figure
+            - page to add to report
+        fingerprint (optional): str
+            - fingerprint of the page inputs (None when the page cache is not used)
+        '''
+        with profiler.timed('render'), metrics.PAGE_RENDER_SECONDS.time():
+            if self.cache:
+                self.cache.add_figure(fig, fingerprint)
+            else:
+                fig.savefig(self.report, format='pdf')
+
+        metrics.REPORT_PAGES.inc("rendered")
+        self.rendered += 1
+
+    def close(self):
+        '''
+        saves the report (cached and rendered pages are merged when the page cache is used)
+        '''
+        if self.cache:
+            self.cache.write(self.path)
+        else:
+            self.report.close()
+
+    # ///////////////////////////////////////////////////////////////
+    # PAGES
+
     def add_cover_page(self):
         '''
         creates cover page and adds to report
@@ -137,9 +450,12 @@ class Report:
             'font_color': 'white',
             'background': './img/blue_background.jpg'
         }
+        fingerprint = self.fingerprint('cover', params, os.path.getmtime(params['background']))
+        if self.add_cached_page(fingerprint):
+            return
+
         fig = text_figure(**params)
-        fig.savefig(self.report, format='pdf')
-        plt.close(fig)
+        self.save_page(fig, fingerprint)
 
     def add_section_cover(self, section, descr):
         '''
@@ -151,11 +467,14 @@ class Report:
             'font_color': '#141919',
             'background': './img/section_cover.png'
         }
+        fingerprint = self.fingerprint('section cover', params, os.path.getmtime(params['background']))
+        if self.add_cached_page(fingerprint):
+            return
+
         fig = text_figure(**params)
-        fig.savefig(self.report, format='pdf')
-        plt.close(fig)
+        self.save_page(fig, fingerprint)
 
-    def add_figure(self, fig):
+    def add_figure(self, fig, fingerprint=None):
         '''
         adds matplotly figure as a page to report
 
@@ -163,11 +482,12 @@ class Report:
         ---------
         fig: matplotly figure
             - figure to add to report
+        fingerprint (optional): str
+            - fingerprint of the page inputs (None when the page cache is not used)
         '''
         footer_txt = f'Revenue Report - {str(self.year)}'
         fig.text(.01, .01, footer_txt, ha='left', fontsize=12, style='italic', color='grey')
-        fig.savefig(self.report, format='pdf')
-        plt.close(fig)
+        self.save_page(fig, fingerprint)
 
     def group_data_for_year(self, df, col_to_group, unit='all'):
         '''
@@ -193,6 +513,25 @@ class Report:
 
         return df_agg
 
+    def unit_totals(self, unit='all'):
+        '''
+        totals by year, type and category which every chart of a unit is drawn from
+
+        Parameters
+        ---------
+        unit (optional): int or str
+            - unit ID to filter data on
+
+        Returns
+        ---------
+        totals: Pandas Series
+            - amount for each year, transaction type and category up to the report year
+        '''
+        df = self.df_dict['transactions']
+        df_unit = df if unit == 'all' else df[df['Unit'] == unit]
+
+        return df_unit.groupby(['Year', 'Type', 'Category'])['Amount'].sum()
+
     def transaction_totals_annotation(self, ax, unit='all'):
         '''
         creates figure showing transaction totals by type
@@ -241,7 +580,7 @@ class Report:
         Returns
         ---------
         fig: matplotly figure
-            - bar graph of transactions
+            - bar graph of transactions (None if the cached page was used)
         '''
         df = self.df_dict['transactions'].copy()
 
@@ -255,6 +594,10 @@ class Report:
         except:
             pass
 
+        fingerprint = self.fingerprint('transaction bar', df_pivot)
+        if self.add_cached_page(fingerprint):
+            return None
+
         unit_labels = [f"Unit {str(unit)}" for unit in df_pivot.index]
         colors = {'expense': 'red', 'payment': 'green', 'net': 'blue'}
 
@@ -266,10 +609,11 @@ class Report:
         left_shift = -bsize*(midbar-1)
         offset = left_shift
 
-        fig, ax = plt.subplots(figsize=(12,8))
+        fig = new_figure()
+        ax = fig.subplots()
 
         for column in df_pivot.columns:
-            plt.bar(x + offset, df_pivot[column], bsize, label=column, color=colors[column])
+            ax.bar(x + offset, df_pivot[column], bsize, label=column, color=colors[column])
             offset = offset + bsize
 
         ax.yaxis.set_major_formatter(mticker.StrMethodFormatter("{x:.0f}"))
@@ -279,11 +623,60 @@ class Report:
         ax.set_xticks(x + bsize + left_shift, unit_labels)
         ax.legend(loc='upper left', ncols=2)
 
-        self.add_figure(fig)
-        plt.close(fig)
+        self.add_figure(fig, fingerprint)
 
         return fig
     
+    def add_vacancy_chart(self):
+        '''
+        creates bar graphs of vacancy rate and lost rent by unit and adds to report
+
+        Returns
+        ---------
+        fig: matplotly figure
+            - bar graphs of vacancy for report year (None if the cached page was used)
+        '''
+        from lib.helper.occupancy import OccupancyIndex
+        from lib.helper.snapshot import read_occupancy
+
+        # tenancies come from the same source as the transactions, so a snapshot report never reads the DB
+        index = read_occupancy(self.snapshot) if self.snapshot else OccupancyIndex.build()
+        df = index.vacancy_for_year(self.year)
+
+        fingerprint = self.fingerprint('vacancy chart', df)
+        if self.add_cached_page(fingerprint):
+            return None
+
+        unit_labels = [f"Unit {str(unit)}" for unit in df.index]
+        x = np.arange(len(unit_labels))
+
+        fig = new_figure()
+        ax_rate, ax_lost = fig.subplots(nrows=1, ncols=2)
+
+        ax_rate.bar(x, df['Vacancy Rate'] * 100, color='orange')
+        ax_rate.yaxis.set_major_formatter(mticker.PercentFormatter(decimals=0))
+        ax_rate.set_ylabel('Share of days vacant')
+        ax_rate.set_title('Vacancy Rate by Unit', fontsize=16)
+        ax_rate.set_xticks(x, unit_labels, rotation=45 if len(x) > 8 else 0)
+
+        ax_lost.bar(x, df['Lost Rent'] / 1000, color='red')
+        ax_lost.yaxis.set_major_formatter(mticker.StrMethodFormatter("{x:.1f}"))
+        ax_lost.set_ylabel('Amount (in $1,000s)')
+        ax_lost.set_title('Rent Lost to Vacancy by Unit', fontsize=16)
+        ax_lost.set_xticks(x, unit_labels, rotation=45 if len(x) > 8 else 0)
+
+        summary_text = (
+            f"Vacant Days: {df['Vacant Days'].sum():,.0f} of {df['Available Days'].sum():,.0f}\n"
+            f"Lost Rent: ${df['Lost Rent'].sum():,.0f}"
+        )
+        fig.text(.99, .95, summary_text, ha='right', va='top', fontsize=10, fontweight='bold',
+                 bbox=dict(facecolor='white', alpha=0.5, edgecolor='gray'))
+        fig.subplots_adjust(top=0.85, wspace=0.3)
+
+        self.add_figure(fig, fingerprint)
+
+        return fig
+
     def transaction_line_subplot(self, ax, unit='all'):
         '''
         creates line graph of transactions with points for data
@@ -399,12 +792,48 @@ class Report:
             partial(self.transaction_pie_subplot, ttype='expenses')
         ]
 
-        for func in subplot_functions:
-            fig, ax = plt.subplots(figsize=(12,8))
-            ax = func(ax=ax)
-            self.add_figure(fig)
-            plt.close(fig)
+        totals = self.unit_totals() if self.cache else None
+
+        for i, func in enumerate(subplot_functions):
+            fingerprint = self.fingerprint('subplot', i, totals)
+            if self.add_cached_page(fingerprint):
+                continue
+
+            fig = new_figure()
+            func(ax=fig.subplots())
+            self.add_figure(fig, fingerprint)
     
+    def unit_page_template(self):
+        '''
+        returns the cleared figure and axes shared by every unit page
+
+        The grid of axes is laid out on first use only; later pages remove the previous
+        unit's artists instead of building a new figure.
+
+        Returns
+        ---------
+        fig: matplotly figure
+            - figure of the unit page
+        ax: dict
+            - axes of the page keyed by (row, column)
+        '''
+        if self._unit_page is None:
+            fig = new_figure()
+            grid = fig.subplots(nrows=3, ncols=2, width_ratios=(.5,.5), height_ratios=(.1, .45,.45))
+            ax = {(row, col): grid[row, col] for row in range(3) for col in range(2)}
+
+            ax[(0, 0)].axis('off')
+            ax[(0, 1)].axis('off')
+
+            # fig.tight_layout()
+            fig.subplots_adjust(hspace=0.5, wspace=0)
+
+            self._unit_page = (fig, ax)
+        else:
+            clear_figure(self._unit_page[0])
+
+        return self._unit_page
+
     def indiv_unit_charts(self, unit='all'):
         '''
         creates page for specified unit with subplots and adds to report
@@ -417,21 +846,23 @@ class Report:
         Returns
         ---------
         fig: matplotly figure
-            - figure containing multiple graphs for specified unit
+            - figure containing multiple graphs for specified unit (reused for the next unit page,
+            None if the cached page was used)
         '''
+        if self.cache:
+            fingerprint = self.fingerprint('unit page', unit, self.unit_totals(unit))
+            if self.add_cached_page(fingerprint):
+                return None
+        else:
+            fingerprint = None
+
         title = f"Unit {str(unit)} Analytics" if unit != 'all' else "Analytics for All Units"
-        ax = {}
+        fig, ax = self.unit_page_template()
 
-        fig, ((ax[(0, 0)], ax[(0, 1)]), (ax[(1, 0)], ax[(1, 1)]), (ax[2, 0], ax[(2, 1)])) = \
-            plt.subplots(nrows=3, ncols=2, figsize=(12, 8), \
-                        width_ratios=(.5,.5), height_ratios=(.1, .45,.45))
-        
-        ax[(0, 0)].axis('off')
         ax[(0, 0)].text(0, .5, title, fontsize=30, fontweight='bold',
                     horizontalalignment='left', verticalalignment='center',
                     transform=ax[(0, 0)].transAxes)
-        
-        ax[(0, 1)].axis('off')
+
         ax[(0, 1)] = self.transaction_totals_annotation(ax[(0, 1)], unit)
         
         ax[(1, 0)] = self.transaction_line_subplot(ax[(1, 0)], unit)
@@ -439,33 +870,55 @@ class Report:
         ax[(2, 0)] = self.transaction_pie_subplot(ax[(2, 0)], 'payments', unit)
         ax[(2, 1)] = self.transaction_pie_subplot(ax[(2, 1)], 'expenses', unit)
 
-        # fig.tight_layout()
-        fig.subplots_adjust(hspace=0.5, wspace=0)
-    
-        self.add_figure(fig)
-        plt.close(fig)
+        self.add_figure(fig, fingerprint)
 
         return fig
 
-def generate_income_report(year, path):
+def generate_income_report(year, path, snapshot=None, cache_dir=REPORT_CACHE_DIR, output_format='pdf'):
     '''
     generates and saves pdf report for specified year using Report class
 
+    Pages whose inputs are unchanged since an earlier run are spliced in from the page cache
+    instead of being rendered again (every page is rendered if pypdf is not installed).
+    With output_format 'html' a single-file html report drawn by the browser is saved instead.
+
     Parameters
     ---------
     year: int
         - year for report
     path: str
         - file path to save report
+    snapshot (optional): str
+        - snapshot folder to read transactions from instead of the DB
+    cache_dir (optional): str
+        - folder of the page cache (None to render every page)
+    output_format (optional): str
+        - 'pdf' or 'html'
+
+    Returns
+    ---------
+    summary: dict
+        - pages rendered, pages reused from the cache and whether the page cache was used
+          (html: units, file size and elapsed seconds)
     '''
-    rpt = Report(year, path)
+    if output_format == 'html':
+        from lib.helper.html_report import generate_html_report
+        return generate_html_report(year, path, snapshot)
+    if output_format != 'pdf':
+        raise ValueError("Report format must match one of the following:", ['pdf', 'html'])
+
+    cache = PageCache(cache_dir) if cache_dir and PAGE_CACHE_AVAILABLE else None
+    rpt = Report(year, path, snapshot, cache)
 
     rpt.add_section_cover('All Units', 'Analytics for aggregated unit data')
     rpt.add_transaction_bar()
+    rpt.add_vacancy_chart()
 
     rpt.indiv_unit_charts()
 
     rpt.add_section_cover('Individual Units', 'Analytics for individual rental units')
     for unit in rpt.units:
         rpt.indiv_unit_charts(unit)
-    rpt.report.close()
\ No newline at end of file
+    rpt.close()
+
+    return {'rendered': rpt.rendered, 'reused': rpt.reused, 'page_cache': cache is not None}
\ No newline at end of file
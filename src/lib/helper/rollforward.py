@@ -0,0 +1,228 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper import metrics
+from lib.helper.payment_index import PaymentIndex
+from lib.helper.rent_history import RentSchedule
+
+LATE_AFTER_DAYS = 11
+
+LONG_COLUMNS = ("Tenant ID", "Tenant", "Due Date", "Rent Due", "Back Due", "BOP Due",
+                "Pmt No.", "Check no.", "Method", "Date", "Amount",
+                "Late Fee", "Rent Owed", "Total Owed", "EOP Due")
+
+def load_rollforward_inputs(tenant_ids=None, cursor=None):
+    '''
+    retrieves tenants (joined to their unit) and payment indexes needed to build rollforwards
+
+    Parameters
+    ---------
+    tenant_ids (optional): list
+        - ids of tenants to load
+        - if set to None, loads all tenants
+    cursor (optional): sqlite3 Cursor
+        - cursor to run queries with (defaults to cursor bound to current thread)
+
+    Returns
+    ---------
+    tenants: list
+        - rows of (id, name, move_in_date, move_out_date, unit_id, monthly_rent, late_fee)
+    payments: dict
+        - PaymentIndex instances keyed by tenant id
+    schedule: RentSchedule instance
+        - rent history of the units of the tenants
+    '''
+    cursor = cursor or sql.get_cursor()
+
+    filt = ""
+    params = ()
+    if tenant_ids is not None:
+        params = tuple(tenant_ids)
+        filt = f" WHERE t.id IN ({', '.join('?' * len(params))})"
+
+    query_tenants = """
+        SELECT t.id, t.name, t.move_in_date, t.move_out_date, t.unit_id, u.monthly_rent, u.late_fee
+        FROM tenants AS t
+        JOIN units AS u
+        ON t.unit_id = u.id""" + filt + " ORDER BY t.id"
+
+    tenants = cursor.execute(query_tenants, params).fetchall()
+    payments = PaymentIndex.build_all([row[0] for row in tenants], cursor)
+    schedule = RentSchedule.build(sorted({row[4] for row in tenants}), cursor)
+
+    return tenants, payments, schedule
+
+def period_bounds(move_in_date, move_out_date):
+    '''
+    returns the monthly periods between move in and move out as day ordinals
+
+    Parameters
+    ---------
+    move_in_date: str
+        - move in date of tenant
+    move_out_date: str or None
+        - move out date of tenant (defaults to today if None)
+
+    Returns
+    ---------
+    starts: NumPy array
+        - day ordinal each period starts (rent due date)
+    ends: NumPy array
+        - day ordinal each period ends (exclusive)
+    cutoffs: NumPy array
+        - day ordinal on or after which a rent payment for the period is late
+    '''
+    pmt_start_date = datetime.strptime(move_in_date, '%Y-%m-%d')
+    pmt_stop_date = datetime.strptime(move_out_date, '%Y-%m-%d') if move_out_date else datetime.now()
+
+    starts = []
+    BOP = pmt_start_date
+    while BOP < pmt_stop_date:
+        starts.append(BOP.toordinal())
+        BOP += relativedelta(months=1)
+
+    starts = np.array(starts, dtype=np.int64)
+    ends = np.append(starts[1:], BOP.toordinal()) if len(starts) else starts
+    cutoffs = starts + LATE_AFTER_DAYS
+
+    return starts, ends, cutoffs
+
+@metrics.counted(metrics.ROLLFORWARDS, metrics.ROLLFORWARD_SECONDS)
+def rollforward_periods(move_in_date, move_out_date, monthly_rent, late_fee, payments, schedule=None, unit_id=None):
+    '''
+    applies payments to each monthly period between move in and move out
+
+    Parameters
+    ---------
+    move_in_date: str
+        - move in date of tenant
+    move_out_date: str or None
+        - move out date of tenant (defaults to today if None)
+    monthly_rent: float
+        - monthly rental charge (for periods without rent history)
+    late_fee: float
+        - charge for late payment (for periods without rent history)
+    payments: PaymentIndex instance
+        - payments made by tenant
+    schedule (optional): RentSchedule instance
+        - rent history, each period is charged the rent and late fee in effect on its due date
+    unit_id (optional): int
+        - id of the unit rented (required with schedule)
+
+    Returns
+    ---------
+    periods: list
+        - one dictionary per period with amounts due and the rent payments applied
+    '''
+    starts, ends, cutoffs = period_bounds(move_in_date, move_out_date)
+
+    rent_due = np.full(len(starts), float(monthly_rent))
+    late_fees = np.full(len(starts), float(late_fee))
+    if schedule is not None:
+        # as-of lookup of all periods at once, so a rent change never rewrites earlier periods
+        rents_in_effect, fees_in_effect = schedule.in_effect(unit_id, starts)
+        rent_due = np.where(np.isnan(rents_in_effect), rent_due, rents_in_effect)
+        late_fees = np.where(np.isnan(fees_in_effect), late_fees, fees_in_effect)
+
+    rent_paid = payments.period_totals(ends, 'rent')
+    rent_paid_on_time = payments.on_time_totals(ends, cutoffs, 'rent')
+
+    # determine if tenant owes a late fee
+    late = (rent_due - rent_paid_on_time) > 0
+    late_fee_owed = late * late_fees
+
+    rent_owed = rent_due - rent_paid
+    total_owed = late_fee_owed + rent_owed
+    eop_due = np.cumsum(total_owed)
+    back_due = np.append(0, eop_due[:-1])
+
+    # payments are sorted by date, so the rent payments for each period are a contiguous block
+    assigned = payments.assign_periods(ends)
+    is_rent = payments.categories == payments.CATEGORIES.index('rent')
+    blocks = np.searchsorted(assigned, np.arange(len(starts) + 1), side='left')
+
+    periods = []
+    for i, BOP in enumerate(starts):
+        payments_applied = [payments.payment(pos) for pos in range(blocks[i], blocks[i + 1]) if is_rent[pos]]
+
+        periods.append({
+            'Due Date': datetime.fromordinal(int(BOP)),
+            'Rent Due': float(rent_due[i]),
+            'Back Due': float(back_due[i]),
+            'BOP Due': float(rent_due[i]) + float(back_due[i]),
+            'payments': payments_applied,
+            'Late Fee': float(late_fee_owed[i]),
+            'Rent Owed': float(rent_owed[i]),
+            'Total Owed': float(total_owed[i]),
+            'EOP Due': float(eop_due[i])
+        })
+
+    return periods
+
+def build_rollforward(move_in_date, move_out_date, monthly_rent, late_fee, payments, schedule=None, unit_id=None):
+    '''
+    creates a detailed payment rollforward with one row per period and one set of columns per payment
+
+    Parameters
+    ---------
+    see rollforward_periods
+
+    Returns
+    ---------
+    output: Pandas DataFrame
+        - rollforward showing amounts owed at the beginning and end of each period
+    '''
+    rollforward_data = []
+
+    for period in rollforward_periods(move_in_date, move_out_date, monthly_rent, late_fee, payments,
+                                      schedule, unit_id):
+        BOP_dict = {key: period[key] for key in ('Due Date', 'Rent Due', 'Back Due', 'BOP Due')}
+        EOP_dict = {key: period[key] for key in ('Late Fee', 'Rent Owed', 'Total Owed', 'EOP Due')}
+
+        payment_dict = {}
+        for i, payment in enumerate(period['payments'], start=1):
+            payment_dict[f'Pmt {i}: Check no.'] = payment[0]
+            payment_dict[f'Pmt {i}: Method'] = payment[4]
+            payment_dict[f'Pmt {i}: Date'] = payment[3]
+            payment_dict[f'Pmt {i}: Amount'] = payment[2]
+
+        rollforward_data.append({**BOP_dict, **payment_dict, **EOP_dict})
+
+    return pd.DataFrame(rollforward_data)
+
+def build_rollforward_long(tenant_id, tenant_name, move_in_date, move_out_date, monthly_rent, late_fee, payments,
+                           schedule=None, unit_id=None):
+    '''
+    creates a payment rollforward in long format with one row per payment applied
+
+    Parameters
+    ---------
+    tenant_id: int
+        - id of tenant
+    tenant_name: str
+        - name of tenant
+    other parameters: see rollforward_periods
+
+    Returns
+    ---------
+    rows: list
+        - rows matching LONG_COLUMNS (periods without payments have a single row with blank payment fields)
+    '''
+    rows = []
+
+    for period in rollforward_periods(move_in_date, move_out_date, monthly_rent, late_fee, payments,
+                                      schedule, unit_id):
+        BOP_vals = [tenant_id, tenant_name, period['Due Date'].strftime('%Y-%m-%d'),
+                    period['Rent Due'], period['Back Due'], period['BOP Due']]
+        EOP_vals = [period['Late Fee'], period['Rent Owed'], period['Total Owed'], period['EOP Due']]
+
+        payment_vals = [[i, pmt[0], pmt[4], pmt[3], pmt[2]] for i, pmt in enumerate(period['payments'], start=1)]
+
+        for vals in payment_vals or [[None] * 5]:
+            rows.append(BOP_vals + vals + EOP_vals)
+
+    return rows
@@ -0,0 +1,155 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper.payment_index import EPOCH_ORDINAL
+
+# months between expenses for each recurring expense cadence
+MONTHS_PER_CADENCE = {
+    'monthly': 1,
+    'quarterly': 3,
+    'annually': 12,
+}
+
+def occurrence_days(start_dates, steps, stop_days):
+    '''
+    returns the dates each recurring template is due on, for many templates at once
+
+    Each occurrence falls on the day of the month of the start date (or the last day of shorter months).
+
+    Parameters
+    ---------
+    start_dates: list
+        - date of the first occurrence of each template in YYYY-MM-DD format
+    steps: NumPy array
+        - months between occurrences of each template
+    stop_days: NumPy array
+        - day ordinal of the last day occurrences may fall on for each template
+
+    Returns
+    ---------
+    templates: NumPy array
+        - position of the template of each occurrence (occurrences of a template are in date order)
+    days: NumPy array
+        - day ordinal of each occurrence
+    '''
+    starts = np.array(start_dates, dtype='datetime64[D]')
+    steps = np.asarray(steps, dtype=np.int64)
+    stops = (np.asarray(stop_days, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+    first_month = starts.astype('datetime64[M]')
+    first_day = (starts - first_month.astype('datetime64[D]')).astype(np.int64)
+
+    months_to_stop = (stops.astype('datetime64[M]') - first_month).astype(np.int64)
+    counts = np.where(stops >= starts, months_to_stop // steps + 1, 0)
+
+    # number each template's occurrences 0, 1, 2... in one flat array
+    templates = np.repeat(np.arange(len(starts)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    months = first_month[templates] + k * steps[templates]
+    month_lengths = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    days = months.astype('datetime64[D]') + np.minimum(first_day[templates], month_lengths - 1)
+
+    keep = days <= stops[templates]
+    return templates[keep], days[keep].astype(np.int64) + EPOCH_ORDINAL
+
+def due_expenses(through_date=None, unit_id=None):
+    '''
+    returns expenses due from recurring templates which have not been created yet
+
+    Occurrences on or before the latest expense already created from a template are skipped,
+    so expenses deleted by the user are not created again.
+
+    Parameters
+    ---------
+    through_date (optional): str
+        - last date to create expenses for in YYYY-MM-DD format (defaults to today)
+    unit_id (optional): int
+        - id of Unit to filter on (defaults to all units)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - one row per expense to create with the columns of the expenses table (excluding id)
+    '''
+    through = date.fromisoformat(through_date).toordinal() if through_date else sql.today_ordinal()
+    cursor = sql.get_cursor()
+
+    filt = ""
+    params = ()
+    if unit_id:
+        filt = " WHERE r.unit_id = ?"
+        params = (unit_id,)
+
+    # latest expense created from each template comes from the (recurring_id, exp_date) index
+    templates = cursor.execute("""
+        SELECT r.id, r.descr, r.category, r.amount, r.cadence, r.start_date, r.end_date, r.unit_id,
+            (SELECT MAX(e.exp_date) FROM expenses AS e WHERE e.recurring_id = r.id)
+        FROM recurring_expenses AS r""" + filt + " ORDER BY r.id", params).fetchall()
+
+    columns = ["descr", "category", "amount", "exp_date", "unit_id", "recurring_id"]
+    if not templates:
+        return pd.DataFrame(columns=columns)
+
+    ids, descrs, categories, amounts, cadences, start_dates, end_dates, unit_ids, latest = zip(*templates)
+
+    steps = np.array([MONTHS_PER_CADENCE[cadence] for cadence in cadences])
+    end_days = np.array([date.fromisoformat(end).toordinal() if end else through for end in end_dates])
+    positions, days = occurrence_days(start_dates, steps, np.minimum(end_days, through))
+
+    latest_days = np.array([date.fromisoformat(day).toordinal() if day else 0 for day in latest])
+    new = days > latest_days[positions]
+    positions, days = positions[new], days[new]
+
+    return pd.DataFrame({
+        'descr': np.array(descrs, dtype=object)[positions],
+        'category': np.array(categories, dtype=object)[positions],
+        'amount': np.array(amounts, dtype=np.float64)[positions],
+        'exp_date': np.datetime_as_string((days - EPOCH_ORDINAL).astype('datetime64[D]')),
+        'unit_id': np.array(unit_ids, dtype=np.int64)[positions],
+        'recurring_id': np.array(ids, dtype=np.int64)[positions],
+    }, columns=columns)
+
+def materialize_recurring_expenses(through_date=None, unit_id=None):
+    '''
+    creates every expense due from recurring templates across all units in a single transaction
+
+    Running again for the same dates creates nothing (each template and date can only be saved once).
+
+    Parameters
+    ---------
+    through_date (optional): str
+        - last date to create expenses for in YYYY-MM-DD format (defaults to today)
+    unit_id (optional): int
+        - id of Unit to filter on (defaults to all units)
+
+    Returns
+    ---------
+    summary: dict
+        - expenses due, expenses inserted and elapsed seconds
+    '''
+    start = time.perf_counter()
+    df = due_expenses(through_date, unit_id)
+
+    inserted = 0
+    if len(df):
+        query = f"""
+            INSERT OR IGNORE INTO expenses ({', '.join(df.columns)})
+            VALUES ({', '.join('?' * len(df.columns))})
+        """
+        rows = df.astype(object).itertuples(index=False, name=None)
+
+        with sql.WRITE_LOCK:
+            try:
+                sql.CURSOR.executemany(query, rows)
+                inserted = sql.CURSOR.rowcount
+                sql.CONN.commit()
+            except Exception:
+                sql.CONN.rollback()
+                raise
+
+    return {'due': len(df), 'inserted': inserted, 'seconds': time.perf_counter() - start}
@@ -0,0 +1,172 @@
+import re
+
+# project modules
+from lib.helper import sql_helper as sql
+from lib.helper import metrics
+
+# searchable columns of each table, every table gets its own FTS5 index named {table}_fts
+SEARCH_COLUMNS = {
+    "tenants": ("name", "email_address", "phone_number"),
+    "units": ("address",),
+    "expenses": ("descr",),
+}
+
+# label shown for each match (SQL expression over the source table aliased as s)
+LABELS = {
+    "tenants": "s.name || ' <' || s.email_address || '> ' || s.phone_number",
+    "units": "REPLACE(s.address, char(10), ', ')",
+    "expenses": "s.descr || ' (' || s.category || ', ' || s.exp_date || ', ' || s.amount || ')'",
+}
+
+RESULT_COLUMNS = ("kind", "id", "label", "rank")
+
+DEFAULT_LIMIT = 20
+
+# words of the search text, matched against the start of indexed words (e.g. "jul car" finds Julia Carter)
+WORD_REGEX = re.compile(r"\w+")
+
+def _index_triggers(table, columns):
+    '''
+    returns statements creating triggers which keep the external content index of a table in sync
+
+    Updates only re-index a row when a searchable column changed.
+    '''
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{col}" for col in columns)
+    old_values = ", ".join(f"OLD.{col}" for col in columns)
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert
+        AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+        AFTER UPDATE OF {cols} ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete
+        AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_values});
+        END
+        """,
+    ]
+
+def create_table():
+    '''
+    creates a full-text (FTS5) index over tenant names, emails and phone numbers, unit addresses
+    and expense descriptions, kept in sync by triggers (indexes created here are built from existing rows)
+    (tenants, units and expenses tables must exist)
+    '''
+    existing = {row[0] for row in sql.CURSOR.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    for table, columns in SEARCH_COLUMNS.items():
+        # external content: the index stores no copy of the text, and prefix indexes keep type-to-search fast
+        sql.CURSOR.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts
+            USING fts5({', '.join(columns)}, content='{table}', content_rowid='id',
+                       tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')
+        """)
+        for statement in _index_triggers(table, columns):
+            sql.CURSOR.execute(statement)
+
+        if f"{table}_fts" not in existing:
+            sql.CURSOR.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+    sql.CONN.commit()
+
+def drop_table():
+    '''
+    drops the full-text indexes and the triggers which keep them in sync
+    '''
+    for table in SEARCH_COLUMNS:
+        for event in ("insert", "update", "delete"):
+            sql.CURSOR.execute(f"DROP TRIGGER IF EXISTS trg_{table}_fts_{event}")
+        sql.drop_table(f"{table}_fts")
+
+def rebuild():
+    '''
+    rebuilds the full-text indexes from their tables and merges index segments (e.g. after bulk loads)
+    '''
+    with sql.WRITE_LOCK:
+        for table in SEARCH_COLUMNS:
+            sql.CURSOR.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+            sql.CURSOR.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')")
+        sql.CONN.commit()
+
+def match_expression(text):
+    '''
+    returns FTS5 query matching rows which contain a word starting with each word of the search text
+    (None if the text has no words)
+
+    Each word is quoted, so punctuation typed by users (e.g. "@" in emails) never causes syntax errors.
+    '''
+    words = WORD_REGEX.findall(text.lower())
+    return " ".join(f'"{word}"*' for word in words) or None
+
+@metrics.query
+def search(text, kinds=None, unit_id=None, limit=DEFAULT_LIMIT, cursor=None):
+    '''
+    returns the best matches for search text across tenants, units and expenses
+
+    Parameters
+    ---------
+    text: str
+        - words to search for, a word matches any indexed word it starts (e.g. "jul" finds "Julia")
+    kinds (optional): list
+        - tables to search ('tenants', 'units' and/or 'expenses', defaults to all)
+    unit_id (optional): int
+        - only return matches for this unit (the unit itself, its tenants and its expenses)
+    limit (optional): int
+        - maximum number of matches to return
+    cursor (optional): sqlite3 Cursor
+        - cursor to run the query with (defaults to cursor bound to current thread)
+
+    Returns
+    ---------
+    rows: list
+        - rows of (kind, id, label, rank), best matches first (lower rank is better)
+    '''
+    kinds = list(kinds) if kinds else list(SEARCH_COLUMNS)
+    unknown = [kind for kind in kinds if kind not in SEARCH_COLUMNS]
+    if unknown:
+        raise ValueError("Search kinds must match the following:", list(SEARCH_COLUMNS))
+
+    expression = match_expression(text)
+    if expression is None:
+        return []
+
+    # every match is ranked, each index only returns its best matches (FTS5 keeps the top of the rank order
+    # rather than sorting all matches) and the union is ranked again
+    selects = []
+    params = []
+    for kind in kinds:
+        filt = ""
+        if unit_id is not None:
+            filt = " AND s.id = ?" if kind == "units" else " AND s.unit_id = ?"
+        selects.append(f"""
+            SELECT * FROM (
+                SELECT '{kind}', s.id, {LABELS[kind]}, f.rank
+                FROM {kind}_fts AS f
+                JOIN {kind} AS s
+                ON s.id = f.rowid
+                WHERE {kind}_fts MATCH ?{filt}
+                ORDER BY f.rank
+                LIMIT ?
+            )
+        """)
+        params.extend((expression,) + ((unit_id,) if unit_id is not None else ()) + (limit,))
+
+    query = " UNION ALL ".join(selects) + " ORDER BY 4, 2 DESC LIMIT ?"
+    cursor = cursor or sql.get_cursor()
+
+    return cursor.execute(query, (*params, limit)).fetchall()
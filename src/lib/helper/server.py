@@ -0,0 +1,520 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+# project modules
+from lib import Unit, Tenant, Payment, Expense
+from lib.helper import sql_helper as sql
+from lib.helper import rollforward as rf
+from lib.helper import metrics
+from lib.helper import search
+
+RESOURCES = {
+    'units': Unit,
+    'tenants': Tenant,
+    'payments': Payment,
+    'expenses': Expense,
+}
+
+# query string parameters each list endpoint can be filtered on (all are ids)
+FILTERS = {
+    'units': (),
+    'tenants': ('unit_id',),
+    'payments': ('tenant_id',),
+    'expenses': ('unit_id',),
+}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+class HTTPError(Exception):
+    '''
+    A class for errors which are returned to the client with a status code
+    '''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _json_default(value):
+    '''
+    converts values the json module cannot serialize (numpy numbers, dates)
+    '''
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _clean(value):
+    '''
+    replaces NaN with None so the value is valid JSON
+    '''
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+def _int_param(params, key, default=None):
+    '''
+    returns query string parameter as an integer (raises HTTPError if it is not one)
+    '''
+    if key not in params:
+        return default
+    try:
+        return int(params[key][-1])
+    except ValueError:
+        raise HTTPError(400, f"{key} must be an integer")
+
+def _record(cls, row):
+    '''
+    returns a table row as a dictionary keyed by DB column
+    '''
+    return dict(zip(cls.DB_COLUMNS, row))
+
+def _instance_record(inst):
+    '''
+    returns the DB columns of an instance as a dictionary
+    '''
+    return {column: getattr(inst, column) for column in type(inst).DB_COLUMNS}
+
+# ///////////////////////////////////////////////////////////////
+# READ ENDPOINTS
+
+def list_records(resource, params):
+    '''
+    returns one page of rows from a resource's table
+
+    Parameters
+    ---------
+    resource: str
+        - name of resource (e.g. 'tenants')
+    params: dict
+        - query string parameters (limit, offset, filters in FILTERS, active for tenants)
+
+    Returns
+    ---------
+    output: dict
+        - items on the page, total number of matching rows, limit, offset and query string of the next page
+    '''
+    cls = RESOURCES[resource]
+    limit = min(max(_int_param(params, 'limit', DEFAULT_LIMIT), 1), MAX_LIMIT)
+    offset = max(_int_param(params, 'offset', 0), 0)
+
+    filt = []
+    values = []
+    for key in FILTERS[resource]:
+        value = _int_param(params, key)
+        if value is not None:
+            filt.append(f"{key} = ?")
+            values.append(value)
+
+    if resource == 'tenants' and params.get('active', [''])[-1].lower() in ('1', 'true'):
+        filt.append("(move_out_day IS NULL OR move_out_day > ?)")
+        values.append(sql.today_ordinal())
+
+    where = f" WHERE {' AND '.join(filt)}" if filt else ""
+    cursor = sql.get_cursor()
+
+    total = cursor.execute(f"SELECT COUNT(*) FROM {cls.TABLE}{where}", values).fetchone()[0]
+    rows = cursor.execute(f"SELECT {sql.column_list(cls)} FROM {cls.TABLE}{where} ORDER BY id LIMIT ? OFFSET ?",
+                          (*values, limit, offset)).fetchall()
+
+    next_page = None
+    if offset + limit < total:
+        next_params = {key: value[-1] for key, value in params.items()}
+        next_params.update(limit=limit, offset=offset + limit)
+        next_page = f"/{resource}?{urlencode(next_params)}"
+
+    return {
+        'items': [_record(cls, row) for row in rows],
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'next': next_page
+    }
+
+def get_record(resource, id):
+    '''
+    returns a single row from a resource's table (raises HTTPError if not found)
+    '''
+    cls = RESOURCES[resource]
+    row = sql.get_cursor().execute(f"SELECT {sql.column_list(cls)} FROM {cls.TABLE} WHERE id = ?", (id,)).fetchone()
+
+    if row is None:
+        raise HTTPError(404, f"{resource[:-1]} {id} not found")
+
+    return _record(cls, row)
+
+def get_summary(params):
+    '''
+    returns income summary by year (optionally for a single unit)
+    '''
+    df = sql.get_transaction_summary(_int_param(params, 'unit_id'))
+
+    return {
+        'items': [{'year': int(year), **{column: _clean(value) for column, value in row.items()}}
+                  for year, row in df.iterrows()]
+    }
+
+def get_rollforward(id):
+    '''
+    returns payment rollforward and current balance of a tenant (raises HTTPError if not found)
+    '''
+    tenants, payments, schedule = rf.load_rollforward_inputs([id])
+
+    if not tenants:
+        raise HTTPError(404, f"tenant {id} not found")
+
+    id, name, move_in_date, move_out_date, unit_id, monthly_rent, late_fee = tenants[0]
+    periods = rf.rollforward_periods(move_in_date, move_out_date, monthly_rent, late_fee, payments[id],
+                                     schedule, unit_id)
+
+    items = []
+    for period in periods:
+        item = {key.lower().replace(' ', '_'): value for key, value in period.items() if key != 'payments'}
+        item['payments'] = [{'id': pmt[0], 'category': pmt[1], 'amount': pmt[2], 'date': pmt[3], 'method': pmt[4]}
+                            for pmt in period['payments']]
+        items.append(item)
+
+    return {
+        'tenant_id': id,
+        'name': name,
+        'unit_id': unit_id,
+        'balance': items[-1]['eop_due'] if items else 0,
+        'items': items
+    }
+
+def get_search(params):
+    '''
+    returns the best full-text matches across tenants, units and expenses (raises HTTPError if invalid)
+
+    Parameters
+    ---------
+    params: dict
+        - query string parameters (q, kind as a comma-separated list, unit_id and limit)
+    '''
+    text = params.get('q', [''])[-1]
+    if not text.strip():
+        raise HTTPError(400, "q must be non-empty search text")
+
+    kinds = [kind for value in params.get('kind', []) for kind in value.split(',') if kind]
+    unknown = [kind for kind in kinds if kind not in search.SEARCH_COLUMNS]
+    if unknown:
+        raise HTTPError(400, f"kind must be one of: {', '.join(search.SEARCH_COLUMNS)}")
+
+    limit = min(max(_int_param(params, 'limit', search.DEFAULT_LIMIT), 1), MAX_LIMIT)
+    rows = search.search(text, kinds, _int_param(params, 'unit_id'), limit)
+
+    return {
+        'query': text,
+        'items': [dict(zip(search.RESULT_COLUMNS, row)) for row in rows]
+    }
+
+# ///////////////////////////////////////////////////////////////
+# WRITE ENDPOINTS
+
+def create_record(resource, body):
+    '''
+    validates and saves a new instance of a resource
+
+    Parameters
+    ---------
+    resource: str
+        - name of resource (e.g. 'tenants')
+    body: dict
+        - attribute values keyed by DB column (id is ignored)
+
+    Returns
+    ---------
+    output: dict
+        - saved row including its new id
+    '''
+    cls = RESOURCES[resource]
+    values = {key: value for key, value in body.items() if key in cls.DB_COLUMNS[1:]}
+
+    with sql.WRITE_LOCK:
+        try:
+            inst = cls(**values)
+        except TypeError as error:
+            raise HTTPError(400, str(error).split(") ", 1)[-1])
+        inst.save()
+
+    return _instance_record(inst)
+
+def update_record(resource, id, body):
+    '''
+    validates and saves changes to an existing instance of a resource
+
+    Parameters
+    ---------
+    resource: str
+        - name of resource (e.g. 'tenants')
+    id: int
+        - id of instance to update
+    body: dict
+        - attribute values to change keyed by DB column (id is ignored)
+
+    Returns
+    ---------
+    output: dict
+        - updated row
+    '''
+    cls = RESOURCES[resource]
+
+    with sql.WRITE_LOCK:
+        inst = cls.find_by_id(id)
+        if inst is None:
+            raise HTTPError(404, f"{resource[:-1]} {id} not found")
+
+        values = {key: value for key, value in body.items() if key in cls.DB_COLUMNS[1:]}
+        original = _instance_record(inst)
+
+        try:
+            for key, value in values.items():
+                setattr(inst, key, value)
+        except (ValueError, TypeError):
+            # setters validate one value at a time, restore the cached instance if any value is invalid
+            # (validators raise TypeError for values of the wrong type, e.g. a number as email)
+            for key in values:
+                setattr(inst, key, original[key])
+            raise
+
+        inst.update()
+
+    return _instance_record(inst)
+
+def delete_record(resource, id):
+    '''
+    deletes an existing instance of a resource
+    '''
+    cls = RESOURCES[resource]
+
+    with sql.WRITE_LOCK:
+        inst = cls.find_by_id(id)
+        if inst is None:
+            raise HTTPError(404, f"{resource[:-1]} {id} not found")
+        inst.delete()
+
+    return {'deleted': id}
+
+# ///////////////////////////////////////////////////////////////
+# ROUTING
+
+# (method, path pattern, handler, tables the response depends on)
+ROUTES = [
+    ("GET", r"/health", lambda match, params: {'status': 'ok'}, ()),
+    ("GET", r"/summary", lambda match, params: get_summary(params), ('expenses', 'payments', 'tenants')),
+    ("GET", r"/search", lambda match, params: get_search(params), ('tenants', 'units', 'expenses')),
+    ("GET", r"/tenants/(?P<id>\d+)/rollforward", lambda match, params: get_rollforward(int(match['id'])),
+     ('units', 'tenants', 'payments', 'rent_history')),
+    ("GET", r"/(?P<resource>units|tenants|payments|expenses)",
+     lambda match, params: list_records(match['resource'], params), None),
+    ("GET", r"/(?P<resource>units|tenants|payments|expenses)/(?P<id>\d+)",
+     lambda match, params: get_record(match['resource'], int(match['id'])), None),
+    ("POST", r"/(?P<resource>units|tenants|payments|expenses)",
+     lambda match, params, body: create_record(match['resource'], body), None),
+    ("PATCH", r"/(?P<resource>units|tenants|payments|expenses)/(?P<id>\d+)",
+     lambda match, params, body: update_record(match['resource'], int(match['id']), body), None),
+    ("DELETE", r"/(?P<resource>units|tenants|payments|expenses)/(?P<id>\d+)",
+     lambda match, params, body: delete_record(match['resource'], int(match['id'])), None),
+]
+ROUTES = [(method, re.compile(pattern), handler, tables) for method, pattern, handler, tables in ROUTES]
+
+def find_route(method, path):
+    '''
+    returns handler, path match and tables the response depends on for a request (raises HTTPError if none)
+    '''
+    path_found = False
+    for route_method, pattern, handler, tables in ROUTES:
+        match = pattern.fullmatch(path.rstrip('/') or '/')
+        if match:
+            path_found = True
+            if route_method == method:
+                return handler, match, tables if tables is not None else (match['resource'],)
+
+    raise HTTPError(405 if path_found else 404, f"{method} {path} is not supported")
+
+class RequestHandler(BaseHTTPRequestHandler):
+    '''
+    A class to handle JSON requests to the rental management server
+
+    Methods
+    ---------
+    - send_json: sends a JSON response
+    - send_metrics: sends the metrics of the process (Prometheus text, or JSON with ?format=json)
+    - handle_request: routes a request and sends its response (or error)
+    '''
+    protocol_version = "HTTP/1.1"
+    server_version = "RentalManagement/1.0"
+
+    # headers and body are written separately, without this keep-alive clients wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload=None, etag=None):
+        '''
+        sends a JSON response (no body for 304 responses)
+        '''
+        body = b"" if status == 304 else json.dumps(payload, default=_json_default).encode()
+
+        metrics.HTTP_REQUESTS.inc(self.command, str(status))
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_metrics(self, params):
+        '''
+        sends the metrics of the process (Prometheus text, or JSON with ?format=json)
+        '''
+        if params.get("format", [""])[0] == "json":
+            self.send_json(200, metrics.REGISTRY.to_json())
+            return
+
+        body = metrics.REGISTRY.to_prometheus().encode()
+
+        metrics.HTTP_REQUESTS.inc(self.command, "200")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        '''
+        returns request body parsed as a JSON object
+        '''
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, "request body must be valid JSON")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return body
+
+    def handle_request(self):
+        '''
+        routes a request and sends its response (or error)
+        '''
+        with metrics.HTTP_SECONDS.time(self.command):
+            self._handle_request()
+
+    def _handle_request(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+
+        try:
+            # metrics are not read from the DB, so they bypass the connection pool and ETags
+            if self.command == "GET" and url.path.rstrip('/') == "/metrics":
+                self.send_metrics(params)
+                return
+
+            handler, match, tables = find_route(self.command, url.path)
+
+            with self.server.pool.cursor():
+                if self.command != "GET":
+                    self.send_json(200 if self.command != "POST" else 201, handler(match, params, self.read_body()))
+                    return
+
+                # versions are read before the data, so a change in between only causes an extra full response
+                versions = sql.get_table_versions(tables)
+                etag = '"' + hashlib.sha1(f"{self.path}|{sorted(versions.items())}".encode()).hexdigest() + '"'
+
+                if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+                    metrics.CACHE_LOOKUPS.inc("etag", "hit")
+                    self.send_json(304, etag=etag)
+                    return
+                metrics.CACHE_LOOKUPS.inc("etag", "miss")
+
+                self.send_json(200, handler(match, params), etag=etag)
+
+        except HTTPError as error:
+            self.send_json(error.status, {'error': error.message})
+        except (ValueError, TypeError) as error:
+            self.send_json(400, {'error': str(error)})
+        except sqlite3.IntegrityError as error:
+            self.send_json(409, {'error': str(error)})
+        except Exception as error:
+            self.send_json(500, {'error': f"{type(error).__name__}: {error}"})
+
+    do_GET = handle_request
+    do_POST = handle_request
+    do_PATCH = handle_request
+    do_PUT = handle_request
+    do_DELETE = handle_request
+
+class RentalServer(ThreadingHTTPServer):
+    '''
+    A class to serve the model layer over HTTP with one thread per connection and a shared connection pool
+
+    Attributes
+    ---------
+    pool: ReadConnectionPool instance
+        - read-only connections shared by request threads (writes use the main connection under a lock)
+    verbose: boolean
+        - indicates whether each request is logged
+    '''
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8000, pool_size=8, verbose=False):
+        '''
+        Constructs the necessary attributes for the RentalServer object.
+        '''
+        super().__init__((host, port), RequestHandler)
+        self.pool = sql.ReadConnectionPool(pool_size)
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+def serve(host="127.0.0.1", port=8000, pool_size=8, verbose=True):
+    '''
+    runs the server until interrupted
+
+    Parameters
+    ---------
+    host (optional): str
+        - address to listen on (defaults to local connections only)
+    port (optional): int
+        - port to listen on
+    pool_size (optional): int
+        - number of read connections shared by request threads
+    verbose (optional): boolean
+        - indicates whether each request is logged
+    '''
+    server = RentalServer(host, port, pool_size, verbose)
+    print(f"Serving on http://{host}:{server.server_address[1]} (Ctrl+C to stop)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def start_background_server(pool_size=8):
+    '''
+    starts a server on a free local port in a background thread
+
+    Returns
+    ---------
+    server: RentalServer instance
+        - running server (call shutdown and server_close to stop it)
+    '''
+    server = RentalServer("127.0.0.1", 0, pool_size)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,249 @@
+import json
+import os
+import time
+import pandas as pd
+from datetime import datetime
+
+# project modules
+from lib import Unit, Tenant, Payment, Expense
+from lib.helper import sql_helper as sql
+from lib.helper import rollforward as rf
+
+SNAPSHOT_DIR = "./outputs/snapshots"
+MANIFEST = "manifest.json"
+
+# file format used by pyarrow for each supported snapshot format
+FORMATS = {
+    'parquet': 'parquet',
+    'arrow': 'ipc',
+}
+
+# partition columns (and their types) for each partitioned dataset
+PARTITIONS = {
+    'transactions': (('Year', 'int16'), ('Unit', 'int32')),
+}
+
+# column types which cannot be inferred from the values returned by SQLite
+DTYPES = {
+    'Type': 'category',
+    'Category': 'category',
+    'Method': 'category',
+    'Unit': 'int32',
+    'Unit ID': 'int32',
+    'Tenant ID': 'int32',
+    'Year': 'int16',
+}
+
+def _require_pyarrow():
+    '''
+    imports pyarrow modules used for snapshots (raises ValueError if pyarrow is not installed)
+    '''
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ValueError("snapshots require the pyarrow package (pipenv install pyarrow)")
+    return pa, ds
+
+def typed_frame(df):
+    '''
+    converts columns of a DataFrame read from SQLite to analysis-friendly types
+
+    Parameters
+    ---------
+    df: Pandas DataFrame
+        - data with text dates and untyped ids
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - data with datetime dates, categorical labels and sized integers
+    '''
+    df = df.copy()
+
+    for column in df.columns:
+        if column in DTYPES and df[column].notna().all():
+            df[column] = df[column].astype(DTYPES[column])
+        elif 'Date' in column:
+            df[column] = pd.to_datetime(df[column], format='%Y-%m-%d', errors='coerce')
+
+    return df
+
+def _partitioning(ds, pa, name):
+    '''
+    returns hive partitioning for a dataset (None if the dataset is not partitioned)
+    '''
+    if name not in PARTITIONS:
+        return None
+    schema = pa.schema([(column, getattr(pa, dtype)()) for column, dtype in PARTITIONS[name]])
+    return ds.partitioning(schema, flavor='hive')
+
+def snapshot_frames():
+    '''
+    retreives the data saved in a snapshot
+
+    Returns
+    ---------
+    frames: dict
+        - DataFrame for each dataset keyed by dataset name
+    '''
+    tenants, payments, schedule = rf.load_rollforward_inputs()
+    rollforward_rows = []
+    for id, name, move_in_date, move_out_date, unit_id, monthly_rent, late_fee in tenants:
+        rollforward_rows.extend(rf.build_rollforward_long(id, name, move_in_date, move_out_date,
+                                                          monthly_rent, late_fee, payments[id], schedule, unit_id))
+
+    return {
+        'transactions': sql.get_all_transactions(with_year=True).reset_index(),
+        'units': Unit.get_dataframe(),
+        'tenants': Tenant.get_dataframe(),
+        'payments': Payment.get_dataframe(),
+        'expenses': Expense.get_dataframe(),
+        'rollforwards': pd.DataFrame(rollforward_rows, columns=rf.LONG_COLUMNS),
+        'income_summary': sql.get_transaction_summary().reset_index(),
+    }
+
+def write_snapshot(output_dir=SNAPSHOT_DIR, format='parquet'):
+    '''
+    saves transactions, model tables, rollforwards and income summaries as a columnar snapshot
+
+    Parameters
+    ---------
+    output_dir (optional): str
+        - folder to create the snapshot folder in
+    format (optional): str
+        - file format of the snapshot ('parquet' or 'arrow')
+
+    Returns
+    ---------
+    summary: dict
+        - snapshot path, rows saved per dataset and elapsed seconds
+    '''
+    if format not in FORMATS:
+        raise ValueError(f"format must match one of the following: {list(FORMATS)}")
+
+    pa, ds = _require_pyarrow()
+    start = time.perf_counter()
+
+    date_today = datetime.now().strftime('%Y-%m-%d')
+    path = os.path.join(output_dir, f"SNAPSHOT_AS_OF_{date_today}")
+    os.makedirs(path, exist_ok=True)
+
+    rows = {}
+    for name, df in snapshot_frames().items():
+        table = pa.Table.from_pandas(typed_frame(df), preserve_index=False)
+        ds.write_dataset(
+            table,
+            os.path.join(path, name),
+            format=FORMATS[format],
+            partitioning=_partitioning(ds, pa, name),
+            existing_data_behavior='delete_matching'
+        )
+        rows[name] = table.num_rows
+
+    manifest = {'format': format, 'created': datetime.now().isoformat(timespec='seconds'), 'rows': rows}
+    with open(os.path.join(path, MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    return {'path': path, 'rows': rows, 'seconds': time.perf_counter() - start}
+
+def latest_snapshot(output_dir=SNAPSHOT_DIR):
+    '''
+    returns path of the most recent snapshot in a folder (None if there are no snapshots)
+    '''
+    if not os.path.isdir(output_dir):
+        return None
+
+    snapshots = sorted(folder for folder in os.listdir(output_dir)
+                       if os.path.exists(os.path.join(output_dir, folder, MANIFEST)))
+
+    return os.path.join(output_dir, snapshots[-1]) if snapshots else None
+
+def read_snapshot(path, name, filter=None, columns=None):
+    '''
+    reads a dataset from a snapshot
+
+    Parameters
+    ---------
+    path: str
+        - snapshot folder created by write_snapshot
+    name: str
+        - dataset to read (e.g. 'transactions', 'tenants', 'rollforwards')
+    filter (optional): pyarrow Expression
+        - rows to keep (filters on partition columns skip the other partitions entirely)
+    columns (optional): list
+        - columns to read (defaults to all columns)
+
+    Returns
+    ---------
+    df: Pandas DataFrame
+        - data saved in the snapshot with the types it was saved with
+    '''
+    pa, ds = _require_pyarrow()
+
+    with open(os.path.join(path, MANIFEST)) as file:
+        manifest = json.load(file)
+
+    if name not in manifest['rows']:
+        raise ValueError(f"name must match one of the following: {list(manifest['rows'])}")
+
+    dataset = ds.dataset(os.path.join(path, name), format=FORMATS[manifest['format']],
+                         partitioning=_partitioning(ds, pa, name))
+
+    return dataset.to_table(filter=filter, columns=columns).to_pandas()
+
+def read_occupancy(path):
+    '''
+    builds the occupancy index from the units and tenants saved in a snapshot
+
+    Parameters
+    ---------
+    path: str
+        - snapshot folder created by write_snapshot
+
+    Returns
+    ---------
+    OccupancyIndex instance
+        - index of every tenancy in the snapshot grouped by unit
+    '''
+    from lib.helper.occupancy import OccupancyIndex
+
+    return OccupancyIndex.from_frames(read_snapshot(path, 'units'), read_snapshot(path, 'tenants'))
+
+def read_transactions(path, unit_id=None, max_year=None):
+    '''
+    reads transactions from a snapshot in the same layout as sql_helper.get_all_transactions
+
+    Parameters
+    ---------
+    path: str
+        - snapshot folder created by write_snapshot
+    unit_id (optional): int
+        - id of Unit to filter on (defaults to all units)
+    max_year (optional): int
+        - only include transactions made in or before this year
+
+    Returns
+    ---------
+    output: Pandas DataFrame
+        - transactions indexed by ID and sorted by unit and date (including the Year column)
+        - use read_snapshot to get the typed columns instead
+    '''
+    pa, ds = _require_pyarrow()
+
+    filter = None
+    if unit_id:
+        filter = ds.field('Unit') == unit_id
+    if max_year is not None:
+        year_filter = ds.field('Year') <= max_year
+        filter = year_filter if filter is None else filter & year_filter
+
+    df = read_snapshot(path, 'transactions', filter=filter)
+    columns = ["ID", "Type", "Amount", "Date", "Category", "Unit", "Year"]
+
+    # labels and dates go back to plain text so grouping behaves the same as on data read from the DB
+    df['Type'] = df['Type'].astype(str)
+    df['Category'] = df['Category'].astype(str)
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+
+    return df[columns].sort_values(['Unit', 'Date'], kind='stable').set_index('ID')
@@ -1,10 +1,347 @@
 import pandas as pd
 import sqlite3
+import threading
+import queue
+import os
+from contextlib import contextmanager
+
+# project modules
+from lib.helper import metrics
 
 # Database connection and cursor
-CONN = sqlite3.connect('rental_management.db')
+# (shared with server threads, writes from other threads must hold WRITE_LOCK)
+DB_PATH = 'rental_management.db'
+CONN = sqlite3.connect(DB_PATH, check_same_thread=False)
 CONN.execute("PRAGMA foreign_keys = ON;")
 CURSOR = CONN.cursor()
+WRITE_LOCK = threading.RLock()
+
+# offset between SQLite julian day numbers and Python date ordinals (date.toordinal)
+JULIAN_DAY_OFFSET = 1721424.5
+
+# per-thread read connections (used by worker pools)
+_local = threading.local()
+READ_POOL_SIZE = 4
+
+def open_read_connection(check_same_thread=True):
+    '''
+    opens a new read-only connection to the DB
+
+    Parameters
+    ---------
+    check_same_thread (optional): boolean
+        - set to False for connections handed between threads (e.g. by a connection pool)
+
+    Returns
+    ---------
+    conn: sqlite3 Connection
+        - connection which can only be used for reads
+    '''
+    uri = f"file:{os.path.abspath(DB_PATH)}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+
+def bind_read_connection():
+    '''
+    opens a read-only connection and binds it to the current thread
+
+    Returns
+    ---------
+    cursor: sqlite3 Cursor
+        - cursor for the connection bound to the current thread
+    '''
+    conn = open_read_connection()
+    _local.conn = conn
+    _local.cursor = conn.cursor()
+    return _local.cursor
+
+@contextmanager
+def bound_cursor(cursor):
+    '''
+    binds a cursor to the current thread for the duration of a with block
+
+    Parameters
+    ---------
+    cursor: sqlite3 Cursor
+        - cursor to be returned by get_cursor inside the with block
+    '''
+    previous = getattr(_local, 'cursor', None)
+    _local.cursor = cursor
+    try:
+        yield cursor
+    finally:
+        _local.cursor = previous
+
+class ReadConnectionPool:
+    '''
+    A class to share a fixed number of read-only connections between many threads
+
+    Attributes
+    ---------
+    size: int
+        - number of connections in the pool
+    idle: Queue
+        - connections not currently checked out
+
+    Methods
+    ---------
+    - cursor: checks out a connection and binds its cursor to the current thread
+    - close: closes all connections in the pool
+    '''
+    def __init__(self, size=READ_POOL_SIZE):
+        '''
+        Constructs the necessary attributes for the ReadConnectionPool object.
+        '''
+        self.size = size
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(open_read_connection(check_same_thread=False))
+
+    def __repr__(self):
+        return f"<ReadConnectionPool: {self.idle.qsize()}/{self.size} idle>"
+
+    @contextmanager
+    def cursor(self, timeout=None):
+        '''
+        checks out a connection and binds its cursor to the current thread for the duration of a with block
+
+        Parameters
+        ---------
+        timeout (optional): float
+            - seconds to wait for a free connection (waits indefinitely if None)
+        '''
+        conn = self.idle.get(timeout=timeout)
+        try:
+            with bound_cursor(conn.cursor()) as cursor:
+                yield cursor
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        '''
+        closes all connections in the pool (waits for checked out connections to be returned)
+        '''
+        for _ in range(self.size):
+            self.idle.get().close()
+
+def get_cursor():
+    '''
+    return cursor bound to the current thread, defaulting to the global CURSOR
+
+    Returns
+    ---------
+    cursor: sqlite3 Cursor
+        - cursor to be used for queries run from the current thread
+    '''
+    return getattr(_local, 'cursor', None) or CURSOR
+
+def date_part_columns(date_col, prefix):
+    '''
+    return generated column definitions which break a date column into integer parts
+
+    Parameters
+    ---------
+    date_col: str
+        - name of DATE column stored as text in YYYY-MM-DD format
+    prefix: str
+        - prefix for the names of the generated columns
+
+    Returns
+    ---------
+    output: dict
+        - SQL expressions keyed by generated column name (day ordinal, year, month)
+    '''
+    return {
+        f"{prefix}_day": f"CAST(julianday({date_col}) - {JULIAN_DAY_OFFSET} AS INTEGER)",
+        f"{prefix}_year": f"CAST(strftime('%Y', {date_col}) AS INTEGER)",
+        f"{prefix}_month": f"CAST(strftime('%m', {date_col}) AS INTEGER)"
+    }
+
+def add_generated_columns(table, columns):
+    '''
+    adds virtual generated columns to a table if they do not exist yet
+
+    Parameters
+    ---------
+    table: str
+        - name of table in DB to add columns to
+    columns: dict
+        - SQL expressions keyed by generated column name
+    '''
+    # Validate the table name to prevent SQL injection
+    if not table.isidentifier():
+        raise ValueError("Invalid table name")
+
+    existing = {row[1] for row in CURSOR.execute("PRAGMA table_xinfo(" + table + ");").fetchall()}
+
+    for name, expr in columns.items():
+        if name not in existing:
+            CURSOR.execute(f"ALTER TABLE {table} ADD COLUMN {name} INTEGER GENERATED ALWAYS AS ({expr}) VIRTUAL")
+    CONN.commit()
+
+def add_columns(table, columns):
+    '''
+    adds columns to an existing table if they do not exist yet
+
+    Parameters
+    ---------
+    table: str
+        - name of table in DB to add columns to
+    columns: dict
+        - column definitions (type and constraints) keyed by column name
+    '''
+    # Validate the table name to prevent SQL injection
+    if not table.isidentifier():
+        raise ValueError("Invalid table name")
+
+    existing = {row[1] for row in CURSOR.execute("PRAGMA table_xinfo(" + table + ");").fetchall()}
+
+    for name, definition in columns.items():
+        if name not in existing:
+            CURSOR.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+    CONN.commit()
+
+def create_indexes(table, indexes):
+    '''
+    creates indexes on a table if they do not exist yet
+
+    Parameters
+    ---------
+    table: str
+        - name of table in DB to index
+    indexes: list
+        - tuples of column names, one per index
+    '''
+    # Validate the table name to prevent SQL injection
+    if not table.isidentifier():
+        raise ValueError("Invalid table name")
+
+    for columns in indexes:
+        name = f"idx_{table}_{'_'.join(columns)}"
+        CURSOR.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    CONN.commit()
+
+def track_table_version(table):
+    '''
+    adds triggers which increment the version of a table in table_versions whenever its rows change
+
+    Every table which backs cached reads is tracked from its create_table, so the cache (e.g. server ETags)
+    can be validated by comparing versions instead of re-reading rows.
+
+    Parameters
+    ---------
+    table: str
+        - name of table to track
+    '''
+    CURSOR.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    CURSOR.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        CURSOR.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+            END
+        """)
+    CONN.commit()
+
+@metrics.query
+def get_table_versions(tables=None):
+    '''
+    returns the current version of tracked tables (changes every time a row is inserted, updated or deleted)
+
+    Parameters
+    ---------
+    tables (optional): list
+        - names of tables to return (defaults to all tracked tables)
+
+    Returns
+    ---------
+    versions: dict
+        - version keyed by table name
+    '''
+    rows = get_cursor().execute("SELECT name, version FROM table_versions").fetchall()
+    return {name: version for name, version in rows if tables is None or name in tables}
+
+def today_ordinal():
+    '''
+    return day ordinal for today (comparable with generated *_day columns)
+    '''
+    from datetime import date
+    return date.today().toordinal()
+
+def column_list(cls, alias=None):
+    '''
+    return comma-separated list of the DB columns persisted for a class
+
+    Parameters
+    ---------
+    cls: class
+        - class whose DB_COLUMNS should be listed (e.g. Payment, Tenant)
+    alias (optional): str
+        - table alias to prefix each column with
+
+    Returns
+    ---------
+    output: str
+        - columns to be used in a SELECT statement
+    '''
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f"{prefix}{col}" for col in cls.DB_COLUMNS)
+
+def count_hydrated(cls, rows, id_index=0):
+    '''
+    adds rows about to be turned into instances to the hydration metrics
+
+    Rows are counted per batch rather than in instance_from_db, which runs once per row of large tables.
+
+    Parameters
+    ---------
+    cls: class
+        - class the rows are turned into (e.g. Payment, Tenant)
+    rows: list
+        - table rows
+    id_index (optional): int
+        - position of the primary key of the class in each row (for rows of joined tables)
+    '''
+    metrics.hydrated(cls.__name__, len(rows), sum(row[id_index] in cls.all for row in rows))
+
+def instances_from_rows(cls, rows):
+    '''
+    returns one instance per table row, counting the rows in the hydration metrics
+
+    Instances are registered in the identity map of the class (the all dict), so this must run on the thread
+    that owns the instances (e.g. not in the read pool).
+    '''
+    count_hydrated(cls, rows)
+    return [cls.instance_from_db(row) for row in rows]
+
+@metrics.query
+def find_row_by_id(cls, table, id):
+    '''
+    return table row based on id attribute
+
+    Parameters
+    ---------
+    cls: class
+        - class whose DB columns are selected (e.g. Payment, Tenant)
+    table: str
+        - name of table in DB which corresponds to specified class
+    id: int
+        - id of class instance
+
+    Returns
+    ---------
+    row: tuple
+        - values of the DB columns of the row whose id matches parameter (None if not found)
+    '''
+    # Validate the table name to prevent SQL injection
+    if not table.isidentifier():
+        raise ValueError("Invalid table name")
+    
+    query = "SELECT " + column_list(cls) + " FROM " + table + " WHERE id = ?;"
+
+    return get_cursor().execute(query, (id,)).fetchone()
 
 def find_by_id(cls, table, id):
     '''
@@ -24,14 +361,11 @@ def find_by_id(cls, table, id):
     class instance
         - instance of specified class whose id attribute matches parameter
     '''
-    # Validate the table name to prevent SQL injection
-    if not table.isidentifier():
-        raise ValueError("Invalid table name")
-    
-    query = "SELECT * FROM " + table + " WHERE id = ?;"
+    row = find_row_by_id(cls, table, id)
+    if not row:
+        return None
 
-    row = CURSOR.execute(query, (id,)).fetchone()
-    return cls.instance_from_db(row) if row else None
+    return instances_from_rows(cls, [row])[0]
 
 def drop_table(table):
     '''
@@ -49,6 +383,10 @@ def drop_table(table):
     query = "DROP TABLE IF EXISTS " + table + ";"
     
     CURSOR.execute(query)
+
+    # dropping a table removes its triggers, so the version is bumped here instead
+    if CURSOR.execute("SELECT name FROM sqlite_master WHERE name = 'table_versions'").fetchone():
+        CURSOR.execute("UPDATE table_versions SET version = version + 1 WHERE name = ?", (table,))
     CONN.commit()
 
 def delete(inst, table):
@@ -77,6 +415,31 @@ def delete(inst, table):
     # Set the id to None
     inst.id = None
 
+@metrics.query
+def get_all_rows(cls, table):
+    '''
+    retreives every row of a specified table from DB
+
+    Parameters
+    ---------
+    cls: class
+        - class whose DB columns are selected (e.g. Payment, Tenant)
+    table: str
+        - name of table in DB which corresponds to specified class
+
+    Returns
+    ---------
+    rows: list
+        - values of the DB columns of each row
+    '''
+    # Validate the table name to prevent SQL injection
+    if not table.isidentifier():
+        raise ValueError("Invalid table name")
+
+    query = "SELECT " + column_list(cls) + " FROM " + table + ";"
+
+    return get_cursor().execute(query).fetchall()
+
 def get_all(cls, table, output_as_instances=False):
     '''
     retreives information from a specified table from DB
@@ -96,35 +459,41 @@ def get_all(cls, table, output_as_instances=False):
         - list of class instances output_as_instances set to True
         - Pandas DataFrame containing DB table information if output_as_instances set to False
     '''
-    # Validate the table name to prevent SQL injection
-    if not table.isidentifier():
-        raise ValueError("Invalid table name")
-
-    query = "SELECT * FROM " + table + ";"
+    rows = get_all_rows(cls, table)
 
-    rows = CURSOR.execute(query).fetchall()
-
-    output = [cls.instance_from_db(row) for row in rows] \
+    output = instances_from_rows(cls, rows) \
         if output_as_instances else pd.DataFrame(rows, columns=cls.DF_COLUMNS)
 
     return output
 
-def get_all_transactions(unit_id=None):
+def transactions_query(unit_id=None, max_year=None, with_year=False, start_date=None, end_date=None):
     '''
-    retreives transactions (payments, expenses) linked to a specified unit
+    builds query which retreives transactions (payments, expenses) linked to a specified unit
 
     Parameters
     ---------
     unit_id (optional): int
         - id of Unit to filter on
         - if set to None, shows all units
+    max_year (optional): int
+        - only include transactions made in or before this year
+    with_year (optional): boolean
+        - indicates whether to include the year of each transaction as a column
+    start_date (optional): str
+        - only include transactions made on or after this date (YYYY-MM-DD)
+    end_date (optional): str
+        - only include transactions made on or before this date (YYYY-MM-DD)
 
     Returns
     ---------
-    output: Pandas DataFrame
-        - DataFrame containing all transactions (payments, expenses) for specified unit
+    query: str
+        - SQL query sorted by unit and date
+    params: tuple
+        - parameters for the query
+    columns: list
+        - names of the columns returned by the query
     '''
-    columns = ["ID", "Type", "Amount", "Date", "Category", "Unit"]
+    columns = ["ID", "Type", "Amount", "Date", "Category", "Unit"] + (["Year"] if with_year else [])
 
     sql_expenses = """
     SELECT 
@@ -133,10 +502,10 @@ def get_all_transactions(unit_id=None):
         e.amount AS Amount, 
         e.exp_date AS Date, 
         e.category AS Category, 
-        e.unit_id AS Unit
-    FROM expenses AS e"""
-
-    sql_expenses += " WHERE e.unit_id = ?" if unit_id else ""
+        e.unit_id AS Unit""" + (""",
+        e.exp_year AS Year""" if with_year else "") + """
+    FROM expenses AS e
+    WHERE 1 = 1"""
 
     sql_payments = """
     SELECT 
@@ -145,20 +514,89 @@ def get_all_transactions(unit_id=None):
         p.amount AS Amount, 
         p.pmt_date AS Date, 
         p.category AS Category, 
-        t.unit_id AS Unit
+        t.unit_id AS Unit""" + (""",
+        p.pmt_year AS Year""" if with_year else "") + """
     FROM payments AS p
     JOIN tenants AS t
-    ON p.tenant_id = t.id"""
-
-    sql_payments += " WHERE t.unit_id = ?" if unit_id else ""
+    ON p.tenant_id = t.id
+    WHERE 1 = 1"""
+
+    filt_expenses = []
+    filt_payments = []
+
+    if unit_id:
+        sql_expenses += " AND e.unit_id = ?"
+        sql_payments += " AND t.unit_id = ?"
+        filt_expenses.append(unit_id)
+        filt_payments.append(unit_id)
+
+    if max_year is not None:
+        sql_expenses += " AND e.exp_year <= ?"
+        sql_payments += " AND p.pmt_year <= ?"
+        filt_expenses.append(max_year)
+        filt_payments.append(max_year)
+
+    # dates are stored as YYYY-MM-DD text, so string comparison matches date order
+    for date_value, operator in ((start_date, ">="), (end_date, "<=")):
+        if date_value is not None:
+            sql_expenses += f" AND e.exp_date {operator} ?"
+            sql_payments += f" AND p.pmt_date {operator} ?"
+            filt_expenses.append(date_value)
+            filt_payments.append(date_value)
 
     query = f"{sql_expenses} UNION {sql_payments} ORDER BY Unit, Date"
 
-    filt = (unit_id, unit_id) if unit_id else ()
-    rows = CURSOR.execute(query, filt).fetchall()
+    return query, (*filt_expenses, *filt_payments), columns
+
+@metrics.query
+def get_all_transactions(unit_id=None, max_year=None, with_year=False, start_date=None, end_date=None):
+    '''
+    retreives transactions (payments, expenses) linked to a specified unit
+
+    Parameters
+    ---------
+    unit_id (optional): int
+        - id of Unit to filter on
+        - if set to None, shows all units
+    max_year (optional): int
+        - only include transactions made in or before this year
+    with_year (optional): boolean
+        - indicates whether to include the year of each transaction as a column
+    start_date (optional): str
+        - only include transactions made on or after this date (YYYY-MM-DD)
+    end_date (optional): str
+        - only include transactions made on or before this date (YYYY-MM-DD)
+
+    Returns
+    ---------
+    output: Pandas DataFrame
+        - DataFrame containing all transactions (payments, expenses) for specified unit
+    '''
+    query, params, columns = transactions_query(unit_id, max_year, with_year, start_date, end_date)
+
+    rows = get_cursor().execute(query, params).fetchall()
 
     return pd.DataFrame(rows, columns=columns).set_index('ID')
 
+@metrics.query
+def get_transaction_years():
+    '''
+    retreives years in which any transaction (payment, expense) was made
+
+    Returns
+    ---------
+    output: list
+        - sorted list of years
+    '''
+    query = """
+    SELECT exp_year AS Year FROM expenses
+    UNION
+    SELECT pmt_year AS Year FROM payments
+    ORDER BY Year"""
+
+    return [row[0] for row in get_cursor().execute(query).fetchall() if row[0] is not None]
+
+@metrics.query
 def get_transaction_summary(unit_id=None):
     '''
     retreives summary of transactions for all units
@@ -168,10 +606,23 @@ def get_transaction_summary(unit_id=None):
     output: Pandas DataFrame
         - DataFrame containing summary of transaction data
     '''
-    df = get_all_transactions(unit_id)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df['Year'] = df['Date'].dt.year
-    
+    filt = " WHERE e.unit_id = ?" if unit_id else ""
+
+    query = """
+    SELECT e.exp_year AS Year, 'expense' AS Type, SUM(e.amount) AS Amount
+    FROM expenses AS e""" + filt + """
+    GROUP BY e.exp_year
+    UNION ALL
+    SELECT p.pmt_year AS Year, 'payment' AS Type, SUM(p.amount) AS Amount
+    FROM payments AS p
+    JOIN tenants AS t
+    ON p.tenant_id = t.id""" + filt.replace("e.", "t.") + """
+    GROUP BY p.pmt_year"""
+
+    params = (unit_id, unit_id) if unit_id else ()
+    rows = get_cursor().execute(query, params).fetchall()
+    df = pd.DataFrame(rows, columns=['Year', 'Type', 'Amount'])
+
     df_pivot = df.pivot_table(index='Year', columns='Type', values='Amount', aggfunc='sum')
 
     try:
@@ -179,4 +630,257 @@ def get_transaction_summary(unit_id=None):
     except:
         pass
 
-    return df_pivot
\ No newline at end of file
+    return df_pivot
+
+# ///////////////////////////////////////////////////////////////
+# DIRTY TRACKING AND UNIT OF WORK
+
+def row_values(inst):
+    '''
+    returns the current attribute values of an instance in table row order
+    '''
+    return tuple(getattr(inst, col) for col in type(inst).DB_COLUMNS)
+
+def mark_clean(inst, row=None):
+    '''
+    records the table row of an instance, so later changes to its attributes are tracked as dirty fields
+
+    Parameters
+    ---------
+    inst: class instance
+        - instance which matches its table row
+    row (optional): tuple
+        - table row the instance was loaded from (defaults to the current attribute values)
+    '''
+    inst._row = row if row is not None else row_values(inst)
+
+def dirty_fields(inst):
+    '''
+    returns the columns whose attribute value changed since the instance was loaded or last written
+
+    Parameters
+    ---------
+    inst: class instance
+        - instance of a model class (e.g. Unit)
+
+    Returns
+    ---------
+    fields: list
+        - names of changed columns (all columns if the instance was never loaded from the DB)
+    '''
+    columns = type(inst).DB_COLUMNS
+    if inst._row is None:
+        return list(columns[1:])
+
+    return [col for col, value in zip(columns[1:], inst._row[1:]) if getattr(inst, col) != value]
+
+def update(inst):
+    '''
+    writes the changed columns of the table row corresponding to specified instance (no-op if nothing changed)
+
+    Parameters
+    ---------
+    inst: class instance
+        - instance whose changes are saved
+    '''
+    with Session() as session:
+        session.add(inst)
+
+class Session:
+    '''
+    A class to collect changes to many instances and write them in one transaction (unit of work)
+
+    Only changed columns are written, and instances whose changes touch the same columns share one
+    batched UPDATE statement. Used as a context manager, changes are flushed when the with block exits
+    without an error.
+
+    Attributes
+    ---------
+    instances: dict
+        - instances to flush keyed by class and id
+
+    Methods
+    ---------
+    - add: adds instances whose changes are written on flush
+    - dirty: returns the changed columns of each added instance
+    - flush: writes the changes of all added instances in one transaction
+    '''
+    def __init__(self):
+        '''
+        Constructs the necessary attributes for the Session object.
+        '''
+        self.instances = {}
+
+    def __repr__(self):
+        return f"<Session: {len(self.instances)} instances>"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.instances.clear()
+
+    def add(self, *instances):
+        '''
+        adds instances whose changes are written on flush
+
+        Parameters
+        ---------
+        instances: class instance
+            - saved instances of model classes (e.g. Unit)
+        '''
+        for inst in instances:
+            if inst.id is None:
+                raise ValueError(f"{type(inst).__name__} must be saved before it can be updated")
+            self.instances[(type(inst), inst.id)] = inst
+
+    def dirty(self):
+        '''
+        returns the changed columns of each added instance
+
+        Returns
+        ---------
+        changes: list
+            - (instance, list of changed columns) for every added instance with changes
+        '''
+        changes = [(inst, dirty_fields(inst)) for inst in self.instances.values()]
+        return [(inst, fields) for inst, fields in changes if fields]
+
+    def flush(self):
+        '''
+        writes the changes of all added instances in one transaction
+
+        Returns
+        ---------
+        updated: int
+            - number of rows updated
+        '''
+        # one executemany per table and set of changed columns
+        groups = {}
+        for inst, fields in self.dirty():
+            groups.setdefault((type(inst), tuple(fields)), []).append(inst)
+
+        updated = 0
+        if groups:
+            with WRITE_LOCK:
+                try:
+                    for (cls, fields), instances in groups.items():
+                        query = f"UPDATE {cls.TABLE} SET {', '.join(f'{col} = ?' for col in fields)} WHERE id = ?"
+                        CURSOR.executemany(query, [(*(getattr(inst, col) for col in fields), inst.id)
+                                                   for inst in instances])
+                        updated += len(instances)
+                    CONN.commit()
+                except Exception:
+                    CONN.rollback()
+                    raise
+
+            for instances in groups.values():
+                for inst in instances:
+                    mark_clean(inst)
+
+        self.instances.clear()
+        return updated
+
+# ///////////////////////////////////////////////////////////////
+# ASYNC READS
+
+_read_executor = None
+_read_executor_lock = threading.Lock()
+
+def get_read_executor(max_workers=READ_POOL_SIZE):
+    '''
+    returns the thread pool used for async reads, creating it on first use
+
+    Parameters
+    ---------
+    max_workers (optional): int
+        - number of threads (and read connections) in the pool when it is created
+
+    Returns
+    ---------
+    executor: ThreadPoolExecutor
+        - pool whose threads each hold a dedicated read-only connection
+    '''
+    global _read_executor
+
+    with _read_executor_lock:
+        if _read_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _read_executor = ThreadPoolExecutor(max_workers=max_workers, initializer=bind_read_connection,
+                                                thread_name_prefix="sql-read")
+    return _read_executor
+
+def shutdown_read_executor():
+    '''
+    waits for pending async reads and closes the thread pool (a new pool is created on next use)
+    '''
+    global _read_executor
+
+    with _read_executor_lock:
+        if _read_executor is not None:
+            _read_executor.shutdown(wait=True)
+            _read_executor = None
+
+async def run_read(func, *args, **kwargs):
+    '''
+    runs a synchronous read function in the read pool without blocking the event loop
+
+    func should only return rows or values computed from them: instances are built with instance_from_db
+    on the calling thread, since it updates the identity maps shared with the main thread without a lock.
+
+    Parameters
+    ---------
+    func: callable object
+        - function which reads from the DB through get_cursor
+    args, kwargs:
+        - arguments passed to func
+
+    Returns
+    ---------
+    output: object
+        - value returned by func
+    '''
+    import asyncio
+    from functools import partial
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_read_executor(), partial(func, *args, **kwargs))
+
+async def afind_by_id(cls, table, id):
+    '''
+    async version of find_by_id (the row is read in the pool, the instance is built on the calling thread)
+    '''
+    row = await run_read(find_row_by_id, cls, table, id)
+    if not row:
+        return None
+
+    return instances_from_rows(cls, [row])[0]
+
+async def aget_all(cls, table, output_as_instances=False):
+    '''
+    async version of get_all (rows are read in the pool, instances are built on the calling thread)
+    '''
+    rows = await run_read(get_all_rows, cls, table)
+
+    return instances_from_rows(cls, rows) if output_as_instances else pd.DataFrame(rows, columns=cls.DF_COLUMNS)
+
+async def aget_all_transactions(unit_id=None, max_year=None, with_year=False, start_date=None, end_date=None):
+    '''
+    async version of get_all_transactions
+    '''
+    return await run_read(get_all_transactions, unit_id, max_year, with_year, start_date, end_date)
+
+async def aget_transaction_years():
+    '''
+    async version of get_transaction_years
+    '''
+    return await run_read(get_transaction_years)
+
+async def aget_transaction_summary(unit_id=None):
+    '''
+    async version of get_transaction_summary
+    '''
+    return await run_read(get_transaction_summary, unit_id)
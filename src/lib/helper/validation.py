@@ -1,4 +1,30 @@
 import re
+import threading
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+
+# project modules
+from lib.helper import sql_helper as sql
+
+# compiled once at import and shared by scalar and DataFrame validation
+EMAIL_PATTERN = r"[A-z][A-z0-9._-]+@\w+\.[a-z]+"
+PHONE_PATTERN = r"\([0-9]{3}\) [0-9]{3}-[0-9]{4}|[0-9]{3}-[0-9]{3}-[0-9]{4}|[0-9]{10}"
+DATE_PATTERN = r"^\d{4}-\d{2}-\d{2}$"
+
+EMAIL_REGEX = re.compile(EMAIL_PATTERN)
+PHONE_REGEX = re.compile(PHONE_PATTERN)
+DATE_REGEX = re.compile(DATE_PATTERN)
+
+APPROVED_METHODS = ("check", "venmo", "zelle", "cash")
+EXP_CATEGORIES = ("mortgage", "property mgmt", "repairs", "maintenance", "rennovations", "cleaning")
+PMT_CATEGORIES = ("rent", "security deposit", "late fee")
+CADENCES = ("monthly", "quarterly", "annually")
+
+APPROVED_METHODS_SET = frozenset(APPROVED_METHODS)
+EXP_CATEGORIES_SET = frozenset(EXP_CATEGORIES)
+PMT_CATEGORIES_SET = frozenset(PMT_CATEGORIES)
+CADENCES_SET = frozenset(CADENCES)
 
 def name_validation(name):
     '''
@@ -34,10 +60,7 @@ def email_validation(email_address):
     '''
     validate email input and return only if validation passes
     '''
-    email_pattern = r"[A-z][A-z0-9._-]+@\w+\.[a-z]+"
-    email_regex = re.compile(email_pattern)
-
-    if email_regex.fullmatch(email_address):
+    if EMAIL_REGEX.fullmatch(email_address):
         return email_address
     else:
         raise ValueError(f"Did not enter valid email address")
@@ -47,10 +70,7 @@ def phone_validation(phone_number):
     '''
     validate phone number input and return only if validation passes
     '''
-    phone_pattern = r"\([0-9]{3}\) [0-9]{3}-[0-9]{4}|[0-9]{3}-[0-9]{3}-[0-9]{4}|[0-9]{10}"
-    phone_regex = re.compile(phone_pattern)
-
-    if phone_regex.fullmatch(phone_number):
+    if PHONE_REGEX.fullmatch(phone_number):
         return phone_number
     else:
         raise ValueError(f"Did not enter valid phone number")
@@ -60,10 +80,7 @@ def date_validation(date):
     '''
     validate date input and return only if validation passes
     '''
-    date_pattern = r"^\d{4}-\d{2}-\d{2}$"
-    date_regex = re.compile(date_pattern)
-
-    if date_regex.fullmatch(date):
+    if DATE_REGEX.fullmatch(date):
         return date
     else:
         raise ValueError(f"Did not enter date in YYYY-DD-MM format")
@@ -83,7 +100,7 @@ def dollar_amt_validation(amount):
     '''
     validate dollar value input and return only if validation passes
     '''
-    if (isinstance(amount, float) or isinstance(amount, int)) and amount >= 0:
+    if isinstance(amount, (float, int)) and not isinstance(amount, bool) and amount >= 0:
         return float(amount)
     else:
         raise ValueError(f"Value must be positive number")
@@ -93,44 +110,197 @@ def method_validation(method):
     '''
     validate payment method input and return only if validation passes
     '''
-    approved_methods = ["check", "venmo", "zelle", "cash"]
-
-    if method in approved_methods:
+    if method in APPROVED_METHODS_SET:
         return method
     else:
-        raise ValueError("Payment method must match one of the following:", approved_methods)
-method_validation.constraints = ["check", "venmo", "zelle", "cash"]
+        raise ValueError("Payment method must match one of the following:", list(APPROVED_METHODS))
+method_validation.constraints = list(APPROVED_METHODS)
 
 def exp_category_validation(category):
     '''
     validate payment type input and return only if validation passes
     '''
-    approved_categories = ["mortgage", "property mgmt", "repairs", "maintenance", "rennovations", "cleaning"]
-
-    if category in approved_categories:
+    if category in EXP_CATEGORIES_SET:
         return category
     else:
-        raise ValueError("Payment type must match one of the following:", approved_categories)
-exp_category_validation.constraints = ["mortgage", "property mgmt", "repairs", "maintenance", "rennovations", "cleaning"]
+        raise ValueError("Payment type must match one of the following:", list(EXP_CATEGORIES))
+exp_category_validation.constraints = list(EXP_CATEGORIES)
     
 def pmt_category_validation(category):
     '''
     validate payment type input and return only if validation passes
     '''
-    approved_categories = ["rent", "security deposit", "late fee"]
-
-    if category in approved_categories:
+    if category in PMT_CATEGORIES_SET:
         return category
     else:
-        raise ValueError("Payment type must match one of the following:", approved_categories)
-pmt_category_validation.constraints = ["rent", "security deposit", "late fee"]
+        raise ValueError("Payment type must match one of the following:", list(PMT_CATEGORIES))
+pmt_category_validation.constraints = list(PMT_CATEGORIES)
+
+def cadence_validation(cadence):
+    '''
+    validate recurring expense cadence input and return only if validation passes
+    '''
+    if cadence in CADENCES_SET:
+        return cadence
+    else:
+        raise ValueError("Cadence must match one of the following:", list(CADENCES))
+cadence_validation.constraints = list(CADENCES)
     
+# set on a thread while it builds instances from table rows, whose parents foreign keys guarantee exist
+_FROM_DB = threading.local()
+
+@contextmanager
+def rows_from_db():
+    '''
+    skips the parent lookup of parent_id_validation on the current thread (used by instance_from_db)
+    '''
+    previous = getattr(_FROM_DB, 'active', False)
+    _FROM_DB.active = True
+    try:
+        yield
+    finally:
+        _FROM_DB.active = previous
+
 def parent_id_validation(parent_id, parent_cls):
     '''
     validate parent id input and return only if validation passes
     '''
-    if type(parent_id) is int and parent_cls.find_by_id(parent_id):
+    # checked against the table (not the class dictionary, which can hold deleted parents) without loading the row
+    if type(parent_id) is int and (getattr(_FROM_DB, 'active', False) or sql.get_cursor().execute(
+            f"SELECT 1 FROM {parent_cls.TABLE} WHERE id = ?", (parent_id,)).fetchone()):
         return parent_id
     else:
         raise ValueError(f"parent_id must match an existing parent id in the database")
-parent_id_validation.constraints = "match an existing parent id in the database"
\ No newline at end of file
+parent_id_validation.constraints = "match an existing parent id in the database"
+
+# ///////////////////////////////////////////////////////////////
+# VECTORIZED VALIDATION OF DATAFRAMES
+
+# rule applied to a whole column for each scalar validation function: (kind, argument)
+FRAME_RULES = {
+    name_validation: ("min_length", 1),
+    address_validation: ("min_length", 1),
+    descr_validation: ("min_length", 2),
+    email_validation: ("regex", EMAIL_PATTERN),
+    phone_validation: ("regex", PHONE_PATTERN),
+    date_validation: ("regex", DATE_PATTERN),
+    optional_date_validation: ("optional_regex", DATE_PATTERN),
+    dollar_amt_validation: ("amount", None),
+    method_validation: ("isin", APPROVED_METHODS),
+    exp_category_validation: ("isin", EXP_CATEGORIES),
+    pmt_category_validation: ("isin", PMT_CATEGORIES),
+    cadence_validation: ("isin", CADENCES),
+}
+
+# value types accepted by the scalar functions (numpy str_ and float64 subclass str and float)
+STRING_TYPES = (str, np.str_)
+NUMBER_TYPES = (int, float, np.float64)
+
+def _strings(col):
+    '''
+    returns col as a string Series with every value which is not a string set to missing
+    (so string rules fail them like the scalar functions, whatever the dtype of the column)
+    '''
+    if isinstance(col.dtype, pd.StringDtype):
+        return col
+    if col.dtype != object:
+        return pd.Series(pd.NA, index=col.index, dtype="string")
+    return col.where(col.map(type).isin(STRING_TYPES)).astype("string")
+
+def _invalid_amounts(col):
+    '''
+    returns boolean Series which is True for each value in col which is not a number greater than or equal to zero
+    (ints and floats only, like dollar_amt_validation, so bools and numeric strings fail)
+    '''
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return pd.Series(True, index=col.index)
+    if pd.api.types.is_numeric_dtype(col.dtype):
+        amounts = col
+    elif col.dtype == object:
+        amounts = col.where(col.map(type).isin(NUMBER_TYPES))
+    else:
+        return pd.Series(True, index=col.index)
+    return ~(pd.to_numeric(amounts, errors="coerce") >= 0).fillna(False).astype(bool)
+
+def _invalid_mask(col, kind, arg):
+    '''
+    returns boolean Series which is True for each value in col that fails the rule
+    '''
+    if kind == "min_length":
+        return ~(_strings(col).str.len() >= arg).fillna(False).astype(bool)
+    if kind == "regex":
+        return ~_strings(col).str.fullmatch(arg).fillna(False).astype(bool)
+    if kind == "optional_regex":
+        # None or empty string bypass the rule, like optional_date_validation
+        strings = _strings(col)
+        blank = (strings == "").fillna(False).astype(bool)
+        if col.dtype == object:
+            blank |= col.map(type).eq(type(None))
+        return ~(blank | strings.str.fullmatch(arg).fillna(False).astype(bool))
+    if kind == "amount":
+        return _invalid_amounts(col)
+    if kind == "isin":
+        return ~col.isin(arg)
+
+    raise ValueError(f"Unknown validation rule: {kind}")
+
+def _missing_parent_mask(col, parent_cls):
+    '''
+    returns boolean Series which is True for each id in col not found in the parent table (one query)
+    '''
+    query = "SELECT id FROM " + parent_cls.TABLE + ";"
+    parent_ids = [row[0] for row in sql.get_cursor().execute(query).fetchall()]
+
+    # ints only, like parent_id_validation (float ids such as 1.0 fail)
+    if pd.api.types.is_integer_dtype(col.dtype):
+        is_int = col.notna().astype(bool)
+    elif col.dtype == object:
+        is_int = col.map(type).eq(int)
+    else:
+        is_int = pd.Series(False, index=col.index)
+    return ~(is_int & col.isin(parent_ids))
+
+def _frame_checks(cls):
+    '''
+    returns (column, constraints, check) for every rule of a class, check returns the invalid mask of a column
+    '''
+    checks = [(key, val_func.constraints, lambda col, rule=FRAME_RULES[val_func]: _invalid_mask(col, *rule))
+              for key, val_func in cls.VALIDATION_DICT.items()]
+    checks += [(key, parent_id_validation.constraints, lambda col, parent_cls=parent_cls: _missing_parent_mask(col, parent_cls))
+               for key, parent_cls in getattr(cls, "PARENT_DICT", {}).items()]
+    return checks
+
+def validate_frame(cls, df):
+    '''
+    validates every row of a DataFrame against the validation rules of a class in one pass per column
+
+    Parameters
+    ---------
+    cls: class
+        - class whose VALIDATION_DICT and PARENT_DICT are applied (e.g. Payment, Expense)
+    df: Pandas DataFrame
+        - data to validate, with one column per class attribute
+
+    Returns
+    ---------
+    report: Pandas DataFrame
+        - one row per input row (same index) with columns:
+        - valid: True if the row passed every rule
+        - errors: description of every rule the row failed (empty string if valid)
+    '''
+    errors = pd.Series("", index=df.index, dtype=object)
+
+    for key, constraints, check in _frame_checks(cls):
+        if key not in df.columns:
+            invalid = pd.Series(True, index=df.index)
+            message = f"{key}: missing column; "
+        else:
+            invalid = check(df[key])
+            constraints = f"one of {constraints}" if isinstance(constraints, list) else constraints
+            message = f"invalid {key} ({constraints}); "
+
+        errors = errors.where(~invalid, errors + message)
+
+    errors = errors.str.rstrip("; ")
+
+    return pd.DataFrame({"valid": errors == "", "errors": errors}, index=df.index)
@@ -20,6 +20,7 @@ class MenuTree:
 
     Methods
     ---------
+    - enable_profiling: times every procedure run from the menu
     - display_welcome: prints welcome message when user opens the application
     - invalid_option: prints error message when user tries to enter an invalid
     - print_output_message: prints message with file location when user prints data to a csv file
@@ -42,6 +43,27 @@ class MenuTree:
         self.root = node
         node.menu_tree = self
 
+    def enable_profiling(self, profiler):
+        '''
+        times every procedure run from the menu, split into SQL, terminal output and waiting on the user
+
+        Parameters
+        ---------
+        profiler: Profiler instance
+            - profiler to record timings in (see lib.helper.profiler)
+        '''
+        import builtins
+
+        profiler.enable()
+
+        # menu modules imported print and pick by name, so the names are wrapped where they are looked up
+        for module in (sys.modules[__name__], sys.modules['lib.tree.populate_menu']):
+            profiler.instrument(module, 'print', 'render')
+            profiler.instrument(module, 'pick', 'input')
+        profiler.instrument(builtins, 'input', 'input')
+
+        Node.profiler = profiler
+
     # ///////////////////////////////////////////////////////////////
     # VALIDATION OF INPUTS
 
@@ -162,6 +184,13 @@ class Node:
         - function to run when instance is selected from menu
     data_ref: class instance
 
+    Class Attributes
+    ---------
+    last_node: Node instance
+        - last node whose menu was shown
+    profiler: Profiler instance
+        - records the time of every procedure run (None unless profiling is enabled)
+
     Methods
     ---------
     - add_procedure: validates and adds dictionary with procedure information to instance
@@ -172,6 +201,7 @@ class Node:
     - run_procedure: runs procedure stored in instance
     '''
     last_node = None
+    profiler = None
 
     def __init__(self, option_label, title_label=None):
         '''
@@ -353,6 +383,12 @@ class Node:
             - Node to display in the application after procedure runs
         '''
         default_next = self if len(self.children) > 0 else self.parent
-        next_node = self.procedure()
+
+        if Node.profiler:
+            label = f"{self.parent.option_label} / {self.option_label}" if self.parent else self.option_label
+            with Node.profiler.procedure(label):
+                next_node = self.procedure()
+        else:
+            next_node = self.procedure()
 
         return next_node if next_node else default_next
\ No newline at end of file
@@ -10,10 +10,12 @@ from datetime import datetime
 from lib.helper import ascii
 from lib.helper import validation as val
 from lib.helper import sql_helper as sql
+from lib.helper import search
 from lib import Unit
 from lib import Tenant
 from lib import Payment
 from lib import Expense
+from lib import RecurringExpense
 
 class PopulateMenu:
     '''
@@ -41,6 +43,7 @@ class PopulateMenu:
     Methods
     ---------
     - add_basic_ops: creates reusable menu items (main menu, previous menu, exit)
+    - search_instances: prompts user for search text and returns the matching instances
     - store_selected_instance: adds reference to selected instance within specified node
     - show_user_selections: displays user selections for adding or updating an instance
     - new_itm_validation: creates and validates new object to be used to create a new instance
@@ -50,20 +53,31 @@ class PopulateMenu:
     - update_selected_instance: updates an existing class instance and saves changes to DB
     - finalize_delete: deletes instance and prints confirmation message
     - delete_selected_instance: deletes an existing class instance and saves changes to DB
+    - print_preview: prints the first rows of data so large outputs do not flood the terminal
     - print_to_csv: prints data to csv file
+    - select_date_range: prompts user for optional start and end dates used to filter data
     - filter_on_dates: filters dataframe by user-specified start and end dates
-    - print_transaction_history: displays unit transactions and optionally prints results to csv
+    - print_transaction_history: displays preview of unit transactions and optionally streams results to csv
     - print_transaction_summary: displays summary of transactions made and allows user to print to csv    
     - run_func_if_confirm: confirms if a specific procedure should be run then runs that procedure
     - store_selected_tenant: adds reference to selected Tenant instance within specified node
     - print_payment_history: displays tenant payment history and optionally prints to csv
+    - ledger_statement: displays tenant ledger with running balances and optionally prints to csv
+    - export_all_rollforwards: exports payment rollforwards for all tenants to csv
     - save_payment_info: allows user to create a new Payment instance and optionally saves to DB
     - add_tenant_ops: creates and links nodes related to tenant operations
     - save_unit_info: allows user to create new Unit instance and optionally saves to DB
     - save_tenant_info: allows user to create new Tenant instance and optionally saves to DB
     - save_expense_info: allows user to create new Expense instance and optionally saves to DB
+    - save_recurring_expense_info: allows user to create new RecurringExpense instance and creates the expenses already due
     - add_unit_ops: creates and links nodes related to unit operations
+    - occupancy_timeline: displays occupied and vacant periods of the selected unit and optionally prints to csv
+    - vacancy_summary: displays vacancy rate and lost rent by unit for a selected year and lists units vacant today
+    - rent_roll: displays tenant, rent, balance and last payment of every unit as of a selected date
+    - adjust_rents: adjusts rent or late fee of many units at once after previewing the changes
     - output_revenue_report: generates revenue report and prints to pdf
+    - import_transactions: imports payments or expenses from a csv file
+    - assess_late_fees: records late fees owed by active tenants for a month close and optionally prints them to csv
     - add_summary_ops: creates and links nodes related to summary operations
     '''
     def __init__(self):
@@ -127,6 +141,36 @@ class PopulateMenu:
         for child in ref_node.children:
             child.title_label = f"Options for: {inst}"
 
+    def search_instances(self, cls, parent_ref=None):
+        '''
+        prompts user for search text and returns the matching instances (full-text search, best matches first)
+
+        Parameters
+        ---------
+        cls: class
+            - class to search instances of (table must be in search.SEARCH_COLUMNS)
+        parent_ref (optional): Node instance
+            - node which stores the reference to the selected unit (only its matches are returned)
+
+        Returns
+        ---------
+        options: list
+            - matching instances (all class instances if no search text is entered)
+        '''
+        unit = parent_ref.data_ref if parent_ref and isinstance(parent_ref.data_ref, Unit) else None
+        fields = ", ".join(col.replace("_", " ") for col in search.SEARCH_COLUMNS[cls.TABLE])
+
+        while True:
+            text = input(f"Search {cls.__name__}s by {fields} (press Enter to list all): ")
+            if not text.strip():
+                return cls.get_all_instances()
+
+            rows = search.search(text, [cls.TABLE], unit.id if unit else None)
+            if rows:
+                return [cls.find_by_id(id) for kind, id, label, rank in rows]
+
+            print(f"No {cls.__name__}s match '{text}', try again")
+
     def store_selected_instance(self, cls, ref_node, parent_ref=None, options=None):
         '''
         adds reference to selected instance within specified node
@@ -140,10 +184,12 @@ class PopulateMenu:
         parent_ref (optional): Node instance
             - node which stores the reference to the parent of the user-selected instance
         options (optional):
-            - list of user options to choose from (defaults to all class instances)
+            - list of user options to choose from (defaults to search results for searchable classes,
+              otherwise all class instances)
         '''
         if not options:
-            options = cls.get_all_instances()
+            options = self.search_instances(cls, parent_ref) if cls.TABLE in search.SEARCH_COLUMNS \
+                else cls.get_all_instances()
         
         if parent_ref:
             if parent_ref.data_ref:
@@ -231,7 +277,8 @@ class PopulateMenu:
         img_dict = {
             Unit: ascii.house(),
             Payment: ascii.money(),
-            Expense: ascii.money()
+            Expense: ascii.money(),
+            RecurringExpense: ascii.money()
         }
         
         self.menu.print_page_header(f"Add {cls.__name__}", f"Add information for new {cls.__name__} record below")
@@ -298,24 +345,26 @@ class PopulateMenu:
         '''
         cls = inst.__class__
         val_dict = cls.VALIDATION_DICT
-        attributes = [f"{key}: {getattr(inst, key, None)}" for key in val_dict]
-        itm_to_update, index = pick(attributes+['<SUBMIT CHANGES>'], 
-                                    f"Select Attribute of {cls.__name__} to Update")
 
-        if itm_to_update == '<SUBMIT CHANGES>':
-            return
-        
-        key = itm_to_update.split(":")[0].strip()
-        val_func = val_dict[key]
+        while True:
+            # changed attributes are marked, only these are written when the changes are saved
+            dirty = sql.dirty_fields(inst) if inst.id is not None else []
+            attributes = [f"{key}: {getattr(inst, key, None)}{' *' if key in dirty else ''}" for key in val_dict]
+            itm_to_update, index = pick(attributes+['<SUBMIT CHANGES>'], 
+                                        f"Select Attribute of {cls.__name__} to Update")
 
-        value = self.show_user_selections(val_func, key)
-        
-        if value == 'exit':
-            return
-        
-        setattr(inst, key, value)
+            if itm_to_update == '<SUBMIT CHANGES>':
+                return
+            
+            key = itm_to_update.split(":")[0].strip()
+            val_func = val_dict[key]
 
-        self.update_itm_validation(inst)
+            value = self.show_user_selections(val_func, key)
+            
+            if value == 'exit':
+                return
+            
+            setattr(inst, key, value)
 
     def finalize_update(self, ref_node):
         '''
@@ -396,6 +445,26 @@ class PopulateMenu:
 
         return Node.last_node.parent
 
+    def print_preview(self, df, total=None):
+        '''
+        prints the first rows of data so large outputs do not flood the terminal
+
+        Parameters
+        ---------
+        df: Pandas DataFrame
+            - data to preview
+        total (optional): int
+            - total number of rows in the output (defaults to number of rows in df)
+        '''
+        from lib.helper.export import PREVIEW_ROWS
+
+        total = len(df) if total is None else total
+
+        print(df.head(PREVIEW_ROWS))
+        if total > PREVIEW_ROWS:
+            print(f"[italic]... showing {PREVIEW_ROWS:,} of {total:,} rows[/italic]")
+        print("")
+
     def print_to_csv(self, df, report_type, report_for):
         '''
         prints data to csv file
@@ -415,8 +484,7 @@ class PopulateMenu:
         print("")
         print(f"[yellow]For {report_for} as of {date_today}[/yellow]")
         print("")
-        print(df)
-        print("")
+        self.print_preview(df)
 
         filename = f"{report_type}_AS_OF_{date_today}_FOR_{report_for}".replace(' ', '_').upper()
         path = f"./outputs/{filename}.csv"
@@ -428,22 +496,16 @@ class PopulateMenu:
         self.run_func_if_confirm('Print data to CSV in outputs folder?', 
                                  funcs_to_run)
         
-    def filter_on_dates(self, df):
+    def select_date_range(self):
         '''
-        filters dataframe by user-specified start and end dates
-
-        Parameters
-        ---------
-        df: Pandas DataFrame
-            - data to filter
+        prompts user for optional start and end dates used to filter data
 
         Returns
         ---------
-        df_filtered: Pandas DataFrame
-            - data filtered based on user choices
+        user_choices: dict
+            - start date and end date selected by user (None if bypassed)
+            - None if user cancels
         '''
-        df_filtered = df.copy()
-
         self.menu.print_page_header('Enter Date Range', 'Enter date range to filter data')
         self.menu.print_cancellation_directions()
         self.menu.print_directions('Click enter to bypass date filters')
@@ -462,11 +524,6 @@ class PopulateMenu:
             
             user_choices[key] = value
 
-        if user_choices['start date'] is not None:
-            df_filtered = df_filtered[df_filtered['Date'] >= user_choices['start date']]
-        if user_choices['end date'] is not None:
-            df_filtered = df_filtered[df_filtered['Date'] <= user_choices['end date']]
-
         if user_choices['start date'] and user_choices['end date']:
             print("")
             print(f"Date filter applied: [bold green]{user_choices['start date']} to {user_choices['end date']}[/bold green]")
@@ -477,17 +534,47 @@ class PopulateMenu:
             print("")
             print(f"Date filter applied: [bold green]on or after {user_choices['start date']}[/bold green]")
 
+        return user_choices
+
+    def filter_on_dates(self, df):
+        '''
+        filters dataframe by user-specified start and end dates
+
+        Parameters
+        ---------
+        df: Pandas DataFrame
+            - data to filter
+
+        Returns
+        ---------
+        df_filtered: Pandas DataFrame
+            - data filtered based on user choices
+        '''
+        user_choices = self.select_date_range()
+
+        if user_choices is None:
+            return
+
+        df_filtered = df.copy()
+
+        if user_choices['start date'] is not None:
+            df_filtered = df_filtered[df_filtered['Date'] >= user_choices['start date']]
+        if user_choices['end date'] is not None:
+            df_filtered = df_filtered[df_filtered['Date'] <= user_choices['end date']]
+
         return df_filtered
     
     def print_transaction_history(self, ref_node=None):
         '''
-        displays unit transactions and optionally prints results to csv
+        displays preview of unit transactions and optionally streams results to csv
 
         Parameters
         ---------
         ref_node (optional): Node instance
             - node which stores the reference to the user-selected instance
         '''
+        from lib.helper import export
+
         if ref_node:
             unit = ref_node.data_ref
             unit_id = unit.id
@@ -496,10 +583,34 @@ class PopulateMenu:
             unit_id = None
             label = "all units"
 
-        df = sql.get_all_transactions(unit_id)
-        df_filtered = self.filter_on_dates(df)
+        user_choices = self.select_date_range()
+
+        if user_choices is None:
+            return
 
-        self.print_to_csv(df_filtered, "Transactions", label)
+        # date filters run in SQL so only the preview is loaded into memory
+        query, params, columns = sql.transactions_query(
+            unit_id, start_date=user_choices['start date'], end_date=user_choices['end date'])
+        rows, total = export.preview_query(query, params)
+        df = pd.DataFrame(rows, columns=columns).set_index('ID')
+
+        date_today = datetime.now().strftime('%Y-%m-%d')
+
+        print(art.text2art("Transactions", font='tarty4'))
+        print("")
+        print(f"[yellow]For {label} as of {date_today}[/yellow]")
+        print("")
+        self.print_preview(df, total)
+
+        filename = f"Transactions_AS_OF_{date_today}_FOR_{label}".replace(' ', '_').upper()
+        path = f"./outputs/{filename}.csv"
+
+        funcs_to_run = [
+            lambda: export.stream_query_to_csv(query, params, columns, path, progress=export.print_progress),
+            lambda: self.menu.print_output_message(path)
+        ]
+        self.run_func_if_confirm('Print data to CSV in outputs folder?', 
+                                 funcs_to_run)
 
     def print_transaction_summary(self, ref_node=None):
         '''
@@ -554,18 +665,11 @@ class PopulateMenu:
         ref_node: Node instance
             - node which stores the reference to the user-selected instance
         '''
-        filter, index = pick([True, False], "Filter on Active Tenants Only?")
-        tenant_list = []
-        tenants = Tenant.get_all_instances()
-
-        if filter:
-            for tenant in tenants:
-                if tenant.move_out_date is None:
-                    tenant_list.append(tenant)
-                elif datetime.strptime(tenant.move_out_date, '%Y-%m-%d') > datetime.now():
-                    tenant_list.append(tenant)
+        filter, index = pick([True, False, "Search"], "Filter on Active Tenants Only? (or search by name, email or phone)")
+        if filter == "Search":
+            tenant_list = self.search_instances(Tenant, self.select_unit)
         else:
-            tenant_list = tenants
+            tenant_list = Tenant.get_active_instances() if filter else Tenant.get_all_instances()
 
         self.store_selected_instance(Tenant, ref_node, self.select_unit, options=tenant_list)
         
@@ -583,6 +687,41 @@ class PopulateMenu:
 
         self.print_to_csv(df, "PAYMENTS", tenant.name.upper())
 
+    def ledger_statement(self, ref_node):
+        '''
+        displays tenant ledger with running balances and optionally prints to csv
+
+        Parameters
+        ---------
+        ref_node: Node instance
+            - node which stores the reference to the user-selected instance
+        '''
+        tenant = ref_node.data_ref
+        df = tenant.ledger()
+
+        print(f"Balance owed: [bold red]${tenant.balance():,.2f}[/bold red]")
+        print("")
+
+        self.print_to_csv(df, "LEDGER", tenant.name.upper())
+
+    def export_all_rollforwards(self):
+        '''
+        exports payment rollforwards for all tenants to csv
+        '''
+        from lib.helper import batch
+
+        long_format, index = pick([False, True], "Combine all tenants into a single long-format file?")
+
+        self.menu.print_page_header('Export Rollforwards', 'Payment rollforwards for all tenants')
+
+        def run_export():
+            summary = batch.export_rollforwards(long_format=long_format)
+            print(f"Exported [bold green]{summary['rows']:,}[/bold green] rows for {summary['tenants']:,} tenants "
+                  f"in {summary['seconds']:,.2f}s ({summary['tenants_per_second']:,.1f} tenants/s)")
+            self.menu.print_output_message(summary['paths'][0] if long_format else "./outputs")
+
+        self.run_func_if_confirm('Export rollforwards to outputs folder?', run_export)
+
     def save_payment_info(self, ref_node):
         '''
         allows user to create a new Payment instance and optionally saves to DB
@@ -634,6 +773,11 @@ class PopulateMenu:
         self.add_tenant = Node(option_label="Add Tenant")
         self.add_tenant.add_procedure(lambda: self.save_tenant_info(self.select_unit))
 
+        # export rollforwards for all tenants
+
+        export_rollforwards = Node(option_label="Export All Payment Rollforwards")
+        export_rollforwards.add_procedure(self.export_all_rollforwards)
+
         # payments
 
         payments = Node(option_label="Payments")
@@ -643,6 +787,11 @@ class PopulateMenu:
         rollforward = Node(option_label="View Payments Rollforward")
         rollforward.add_procedure(lambda: self.payment_rollforward(self.select_tenant))
 
+        # view ledger with running balances
+
+        ledger_statement = Node(option_label="View Ledger Statement")
+        ledger_statement.add_procedure(lambda: self.ledger_statement(self.select_tenant))
+
         # select payment
 
         select_payment = Node(option_label="View Payments")
@@ -680,10 +829,10 @@ class PopulateMenu:
         # attach nodes to parent elements
 
         select_payment.add_children([edit_payment, delete_payment, self.to_main, self.exit_app])
-        payments.add_children([rollforward, select_payment, add_payment, self.to_main, self.exit_app])
+        payments.add_children([rollforward, ledger_statement, select_payment, add_payment, self.to_main, self.exit_app])
         manage_tenant.add_children([edit_tenant, delete_tenant, self.to_main, self.exit_app])
         self.select_tenant.add_children([payments, manage_tenant, self.to_main, self.exit_app])
-        tenants.add_children([self.select_tenant, self.add_tenant, self.to_main, self.exit_app])
+        tenants.add_children([self.select_tenant, self.add_tenant, export_rollforwards, self.to_main, self.exit_app])
         self.main.add_child(tenants)
 
     # ///////////////////////////////////////////////////////////////
@@ -763,6 +912,42 @@ class PopulateMenu:
         )
         self.finalize_add(expense)
 
+    def save_recurring_expense_info(self, ref_node):
+        '''
+        allows user to create new RecurringExpense instance and creates the expenses already due
+
+        Parameters
+        ---------
+        ref_node: Node instance
+            - node which stores the reference to the user-selected instance
+        '''
+        from lib.helper.scheduler import materialize_recurring_expenses
+
+        unit = ref_node.data_ref
+
+        new_recurring_expense = self.new_itm_validation(RecurringExpense, unit)
+
+        if not new_recurring_expense:
+            return
+
+        recurring_expense = RecurringExpense(
+            descr=new_recurring_expense["descr"],
+            category=new_recurring_expense["category"],
+            amount=float(new_recurring_expense["amount"]),
+            cadence=new_recurring_expense["cadence"],
+            start_date=new_recurring_expense["start_date"],
+            end_date=new_recurring_expense["end_date"],
+            unit_id=int(new_recurring_expense["unit_id"]),
+        )
+        recurring_expense.save()
+        summary = materialize_recurring_expenses(unit_id=unit.id)
+
+        print("")
+        print("The following record was successfully added:")
+        print(f"[green]{recurring_expense}[/green]")
+        print(f"Expenses created through today: [bold green]{summary['inserted']:,}[/bold green]")
+        self.menu.print_continue_message()
+
     def add_unit_ops(self):
         '''
         creates and links nodes related to unit operations
@@ -796,6 +981,26 @@ class PopulateMenu:
         view_transactions = Node(option_label="Transaction History")
         view_transactions.add_procedure(lambda: self.print_transaction_history(self.select_unit))
 
+        # view occupancy timeline
+
+        occupancy = Node(option_label="Occupancy Timeline")
+        occupancy.add_procedure(lambda: self.occupancy_timeline(self.select_unit))
+
+        # view vacancy summary for all units
+
+        vacancy = Node(option_label="Vacancy Summary")
+        vacancy.add_procedure(lambda: self.vacancy_summary())
+
+        # view rent roll for all units
+
+        rent_roll = Node(option_label="Rent Roll")
+        rent_roll.add_procedure(lambda: self.rent_roll())
+
+        # adjust rent or late fee of many units at once
+
+        adjust_rents = Node(option_label="Adjust Rents")
+        adjust_rents.add_procedure(lambda: self.adjust_rents())
+
         # manage unit
         
         manage_unit = Node(option_label="Manage Unit")
@@ -830,43 +1035,289 @@ class PopulateMenu:
         delete_expense = Node(option_label="Delete Expense")
         delete_expense.add_procedure(lambda: self.delete_selected_instance(select_expense))
 
+        # view recurring expense templates
+
+        select_recurring = Node(option_label="View Recurring Expenses")
+        select_recurring.add_procedure(lambda: self.store_selected_instance(RecurringExpense, select_recurring, self.select_unit))
+
+        # add recurring expense template
+
+        add_recurring = Node(option_label="Add Recurring Expense")
+        add_recurring.add_procedure(lambda: self.save_recurring_expense_info(self.select_unit))
+
+        # edit recurring expense template
+
+        edit_recurring = Node(option_label="Update Recurring Expense")
+        edit_recurring.add_procedure(lambda: self.update_selected_instance(select_recurring))
+
+        # delete recurring expense template (expenses already created are kept)
+
+        delete_recurring = Node(option_label="Delete Recurring Expense")
+        delete_recurring.add_procedure(lambda: self.delete_selected_instance(select_recurring))
+
         # attach nodes to parent elements
 
         select_expense.add_children([edit_expense, delete_expense, self.go_back, self.to_main, self.exit_app])
-        unit_transactions.add_children([transaction_summary, view_transactions, select_expense, add_expense, self.go_back, self.to_main, self.exit_app])
+        select_recurring.add_children([edit_recurring, delete_recurring, self.go_back, self.to_main, self.exit_app])
+        unit_transactions.add_children([transaction_summary, view_transactions, select_expense, add_expense,
+                                        select_recurring, add_recurring, self.go_back, self.to_main, self.exit_app])
         unit_tenants.add_children([self.select_tenant, self.add_tenant, self.go_back, self.to_main, self.exit_app])
         manage_unit.add_children([edit_unit, delete_unit, self.go_back, self.to_main, self.exit_app])
-        self.select_unit.add_children([unit_transactions, unit_tenants, manage_unit, self.go_back, self.to_main, self.exit_app])
-        rentals.add_children([self.select_unit, add_unit, self.to_main, self.exit_app])
+        self.select_unit.add_children([unit_transactions, unit_tenants, occupancy, manage_unit, self.go_back, self.to_main, self.exit_app])
+        rentals.add_children([self.select_unit, add_unit, vacancy, rent_roll, adjust_rents, self.to_main, self.exit_app])
         self.main.add_child(rentals)
 
+    def occupancy_timeline(self, ref_node):
+        '''
+        displays occupied and vacant periods of the selected unit and optionally prints to csv
+
+        Parameters
+        ---------
+        ref_node: Node instance
+            - node which stores the reference to the user-selected instance
+        '''
+        from lib.helper.occupancy import OccupancyIndex
+
+        unit = ref_node.data_ref
+        df = OccupancyIndex.build().timeline(unit.id)
+
+        # e.g. a unit acquired after today has no occupied or vacant days yet
+        if not len(df):
+            self.menu.print_page_header('Occupancy Timeline', f"Unit {unit.id}: {unit.address}")
+            print("[yellow]No occupancy history for this unit yet[/yellow]")
+            self.menu.print_continue_message()
+            return
+
+        # one character per share of total days, occupied in green and vacant in red
+        width = 60
+        total_days = df['Days'].sum()
+        bar = ""
+        for status, days in zip(df['Status'], df['Days']):
+            chars = max(1, round(width * days / total_days)) if total_days else 0
+            bar += f"[green]{'█' * chars}[/green]" if status == 'occupied' else f"[red]{'░' * chars}[/red]"
+
+        self.menu.print_page_header('Occupancy Timeline', f"Unit {unit.id}: {unit.address}")
+        print(f"{df['Start'].iloc[0]} {bar} {df['End'].iloc[-1]}")
+        print(f"Occupied {df.loc[df['Status'] == 'occupied', 'Days'].sum():,} of {total_days:,} days "
+              f"({df.loc[df['Status'] == 'vacant', 'Days'].sum():,} vacant)")
+        print("")
+
+        self.print_to_csv(df, "OCCUPANCY", f"Unit {unit.id}")
+
+    def vacancy_summary(self):
+        '''
+        displays vacancy rate and lost rent by unit for a selected year and lists units vacant today
+        '''
+        from lib.helper.occupancy import OccupancyIndex
+
+        index = OccupancyIndex.build()
+        current_year = datetime.now().year
+        first_year = datetime.fromordinal(int(index.acquired.min())).year if len(index.unit_ids) else current_year
+        years = list(range(current_year, first_year - 1, -1))
+
+        year, _ = pick(years, "Select Year from options below")
+        df = index.vacancy_for_year(year)
+        vacant = index.vacant_units()
+
+        self.menu.print_page_header('Vacancy Summary', f'For the {year} calendar year')
+        print(f"Units vacant today: [bold]{', '.join(str(id) for id in vacant) if len(vacant) else 'none'}[/bold]")
+        print(f"Lost rent in {year}: [bold red]${df['Lost Rent'].sum():,.0f}[/bold red]")
+        print("")
+
+        self.print_to_csv(df.round({'Vacancy Rate': 4, 'Lost Rent': 2}), "VACANCY", str(year))
+
+    def rent_roll(self):
+        '''
+        displays tenant, rent, balance and last payment of every unit as of a selected date
+        '''
+        from lib.helper.rent_roll import rent_roll
+
+        self.menu.print_page_header('Rent Roll', 'Enter date to build the rent roll for')
+        self.menu.print_cancellation_directions()
+        self.menu.print_directions('Click enter to use today')
+        print("")
+
+        as_of_date = self.show_user_selections(val.optional_date_validation, 'as of date')
+
+        if as_of_date == 'exit':
+            return
+
+        df = rent_roll(as_of_date).drop(columns='As Of').set_index('Unit')
+        as_of_date = as_of_date or datetime.now().strftime('%Y-%m-%d')
+
+        print("")
+        print(f"Occupied units: [bold]{(df['Status'] == 'occupied').sum()} of {len(df)}[/bold]")
+        print(f"Balance owed on {as_of_date}: [bold red]${df['Balance'].sum():,.0f}[/bold red]")
+        print("")
+
+        self.print_to_csv(df, "RENT ROLL", as_of_date)
+
+    def adjust_rents(self):
+        '''
+        adjusts rent or late fee of many units at once after previewing the changes
+        '''
+        from lib.helper import rent_history
+
+        field, index = pick(list(rent_history.ADJUSTABLE_FIELDS), "Select value to adjust for all units")
+        kind, index = pick(['percentage', 'fixed amount'], f"Adjust {field} by a percentage or a fixed amount")
+
+        self.menu.print_page_header('Adjust Rents', f'Adjust {field} of many units at once')
+        self.menu.print_cancellation_directions()
+        print("")
+
+        while True:
+            user_input = input(f"Enter {kind} to adjust by (e.g. 3 or -5): ")
+            if user_input.lower() in ('e', 'exit'):
+                return
+            try:
+                change = float(user_input)
+                break
+            except ValueError:
+                self.menu.invalid_option()
+
+        self.menu.print_directions('Click enter to adjust all units')
+        acquired_after = self.show_user_selections(val.optional_date_validation, 'acquired after date')
+        if acquired_after == 'exit':
+            return
+
+        self.menu.print_directions('Click enter for the new value to apply from today')
+        effective_date = self.show_user_selections(val.optional_date_validation, 'effective date')
+        if effective_date == 'exit':
+            return
+
+        options = {'field': field, 'acquired_after': acquired_after,
+                   'percent' if kind == 'percentage' else 'amount': change}
+
+        df = rent_history.preview_adjustment(**options)
+        print("")
+        self.print_preview(df.set_index('Unit'))
+        print(f"Change for {len(df):,} units: [bold]${df['Change'].sum():,.2f}[/bold] per month")
+        print("")
+
+        def apply():
+            try:
+                summary = rent_history.apply_adjustment(**options, effective_date=effective_date)
+                print(f"Adjusted [bold green]{summary['units']:,}[/bold green] units "
+                      f"effective {summary['effective_date']}")
+            except ValueError as e:
+                print(f"[red]ERROR: {e}[/red]")
+
+        self.run_func_if_confirm('Apply adjustment?', [apply, self.menu.print_continue_message])
+
     # ///////////////////////////////////////////////////////////////
     # SET UP SUMMARY OPERATIONS
 
     def output_revenue_report(self):
         '''
-        generates revenue report and prints to pdf
+        generates revenue report and prints to pdf (or html)
         '''
         from lib.helper.report import generate_income_report
 
-        df = sql.get_all_transactions()
-        df['Date'] = pd.to_datetime(df['Date'])
-        df['Year'] = df['Date'].dt.year
-
-        years = df['Year'].unique()
+        years = sql.get_transaction_years()
 
         year, index = pick(years, "Select Year from options below")
-        path = fr"./outputs/Revenue Report for {str(year)}.pdf"
+        output_format, index = pick(['pdf', 'html'], "Select report format (html opens faster for many units)")
+        path = fr"./outputs/Revenue Report for {str(year)}.{output_format}"
 
         funcs_to_run = [
             lambda: print("[blue]generating report...\n[/blue]"),
-            lambda: generate_income_report(year, path),
+            lambda: generate_income_report(year, path, output_format=output_format),
             lambda: self.menu.print_output_message(path)
         ]
         self.menu.print_page_header('Revenue Report', f'For the {year} calendar year')
-        self.run_func_if_confirm(f'Create pdf revenue report for {year}?', 
+        self.run_func_if_confirm(f'Create {output_format} revenue report for {year}?', 
                                  funcs_to_run)
 
+    def import_transactions(self):
+        '''
+        imports payments or expenses from a csv file
+        '''
+        from lib.helper import importer
+
+        kind, index = pick(list(importer.IMPORT_KINDS), "Select type of transactions to import")
+
+        self.menu.print_page_header('Import Transactions', f'Import {kind}s from a csv file')
+        self.menu.print_directions(f"Expected headers: {', '.join(importer.DEFAULT_COLUMN_MAPS[kind])}")
+        self.menu.print_cancellation_directions()
+        print("")
+
+        path = input("Enter path of csv file: ").strip()
+
+        if path.lower() in ('e', 'exit'):
+            return
+
+        try:
+            summary = importer.import_csv(path, kind)
+        except (OSError, ValueError) as e:
+            print(f"[red]ERROR: {e}[/red]")
+            self.menu.print_continue_message()
+            return
+
+        print(f"Imported [bold green]{summary['inserted']:,}[/bold green] of {summary['rows']:,} rows "
+              f"in {summary['seconds']:,.2f}s ({summary['rows_per_second']:,.0f} rows/s)")
+
+        if summary['review_path']:
+            print(f"[yellow]{summary['review']:,} rows need a tenant match:[/yellow] [bold]{summary['review_path']}[/bold]")
+
+        if summary['reject_path']:
+            print(f"[red]{summary['rejected']:,} rows rejected[/red]")
+            self.menu.print_output_message(summary['reject_path'])
+        else:
+            self.menu.print_continue_message()
+
+    def assess_late_fees(self):
+        '''
+        records late fees owed by active tenants for a month close and optionally prints them to csv
+        '''
+        from lib.helper import late_fees
+
+        self.menu.print_page_header('Assess Late Fees', 'Record late fees owed by tenants active in the month closed')
+        self.menu.print_cancellation_directions()
+        self.menu.print_directions('Click enter to close as of today')
+        print("")
+
+        close_date = self.show_user_selections(val.optional_date_validation, 'close date')
+
+        if close_date == 'exit':
+            return
+
+        summary = late_fees.assess_late_fees(close_date)
+
+        print("")
+        print(f"Evaluated {summary['periods']:,} rent periods for {summary['tenants']:,} tenants")
+        print(f"Assessed [bold green]{summary['inserted']:,}[/bold green] new late fees "
+              f"({summary['late']:,} late periods in total)")
+        print("")
+
+        df = late_fees.get_assessments()
+        self.print_to_csv(df, "LATE FEES", close_date or datetime.now().strftime('%Y-%m-%d'))
+
+    def post_due_entries(self):
+        '''
+        creates expenses due from recurring templates and posts rent charges due to the ledger, then reports both
+        '''
+        from lib.helper import ledger
+        from lib.helper.scheduler import materialize_recurring_expenses
+
+        self.menu.print_page_header('Post Due Rent and Expenses', 'Create recurring expenses and rent charges due for all units')
+        self.menu.print_cancellation_directions()
+        self.menu.print_directions('Click enter to post through today')
+        print("")
+
+        through_date = self.show_user_selections(val.optional_date_validation, 'through date')
+
+        if through_date == 'exit':
+            return
+
+        expenses = materialize_recurring_expenses(through_date=through_date)
+        charges = ledger.post_rent_charges(through_date=through_date)
+
+        print("")
+        print(f"Created [bold green]{expenses['inserted']:,}[/bold green] of {expenses['due']:,} due recurring expenses")
+        print(f"Added [bold green]{charges['added']:,}[/bold green] and removed {charges['removed']:,} rent charges, "
+              f"re-balanced {charges['tenants']:,} tenants")
+        self.menu.print_continue_message()
+
     def add_summary_ops(self):
         '''
         creates and links nodes related to summary operations
@@ -893,9 +1344,25 @@ class PopulateMenu:
         revenue_report = Node(option_label="Generate Revenue Report")
         revenue_report.add_procedure(self.output_revenue_report)
 
+        # import transactions from csv
+
+        import_transactions = Node(option_label="Import Transactions from CSV")
+        import_transactions.add_procedure(self.import_transactions)
+
+        # month close: assess late fees
+
+        late_fees = Node(option_label="Assess Late Fees")
+        late_fees.add_procedure(self.assess_late_fees)
+
+        # create recurring expenses and rent charges due since the last run
+
+        post_due = Node(option_label="Post Due Rent and Expenses")
+        post_due.add_procedure(self.post_due_entries)
+
         # attach nodes to parent elements
 
-        income.add_children([income_summary, income_detailed, revenue_report, self.to_main, self.exit_app])
+        income.add_children([income_summary, income_detailed, revenue_report, import_transactions, late_fees, post_due,
+                             self.to_main, self.exit_app])
         self.main.add_child(income)
 
 def populate_menu():
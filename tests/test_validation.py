@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+# lib opens rental_management.db in the working directory on import, so the tests use a scratch database
+SCRATCH_DIR = tempfile.TemporaryDirectory()
+os.chdir(SCRATCH_DIR.name)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# project modules
+from lib import Unit, Tenant, Payment, Expense, RecurringExpense
+from lib.helper import validation as val
+
+CLASSES = (Unit, Tenant, Payment, Expense, RecurringExpense)
+
+def setUpModule():
+    '''
+    creates the tables and one unit and tenant to use as parents
+    '''
+    global UNIT_ID, TENANT_ID
+
+    for cls in CLASSES:
+        cls.create_table()
+
+    unit = Unit.create("2020-01-01", "1 Test St", 500, 1000, 50)
+    tenant = Tenant.create("Ann Lee", "ann@example.com", "555-555-5555", unit.id, "2024-01-01", None)
+    UNIT_ID, TENANT_ID = unit.id, tenant.id
+
+def scalar_accepts(func, value):
+    '''
+    returns True if a scalar validation function accepts the value
+    '''
+    try:
+        func(value)
+        return True
+    except (ValueError, TypeError):
+        return False
+
+def mismatches(cls, df):
+    '''
+    returns (column, value, frame result) for every value which validate_frame and the scalar
+    validation functions of a class disagree on
+    '''
+    scalar_funcs = dict(cls.VALIDATION_DICT)
+    scalar_funcs.update({key: lambda value, parent_cls=parent_cls: val.parent_id_validation(value, parent_cls)
+                         for key, parent_cls in getattr(cls, "PARENT_DICT", {}).items()})
+
+    found = []
+    for key, constraints, check in val._frame_checks(cls):
+        frame_valid = ~check(df[key])
+        for value, valid in zip(df[key].tolist(), frame_valid.tolist()):
+            if scalar_accepts(scalar_funcs[key], value) != valid:
+                found.append((key, value, valid))
+
+    return found
+
+def frame(cls, values, dtype=None):
+    '''
+    returns DataFrame with the same values in every validated column of a class
+    '''
+    keys = list(cls.VALIDATION_DICT) + list(getattr(cls, "PARENT_DICT", {}))
+    return pd.DataFrame({key: pd.Series(values, dtype=dtype) for key in keys})
+
+class TestFrameRules(unittest.TestCase):
+    '''
+    checks the vectorized rules of validate_frame accept exactly the values the scalar functions accept
+    '''
+    def object_values(self):
+        return [
+            "rent", "check", "repairs", "monthly", "Ann Lee", "ann@example.com", "555-555-5555", "(555) 555-5555",
+            "2024-01-31", "2024-1-31", "", "a", "12", None, float("nan"), pd.NA, 0, 1, -1, 1.5, -0.5, True, False,
+            np.float64(2.0), np.int64(3), np.str_("cash"), UNIT_ID, TENANT_ID, float(TENANT_ID), 10 ** 6
+        ]
+
+    def test_object_columns(self):
+        for cls in CLASSES:
+            with self.subTest(cls=cls.__name__):
+                self.assertEqual(mismatches(cls, frame(cls, self.object_values(), dtype=object)), [])
+
+    def test_typed_columns(self):
+        typed_values = [
+            ([0, 1, -1, UNIT_ID, TENANT_ID], "int64"),
+            ([0.0, 1.5, -1.0, float("nan"), float(TENANT_ID)], "float64"),
+            ([0, -1, None, UNIT_ID, TENANT_ID], "Int64"),
+            ([True, False], "bool"),
+            (["rent", "", None, "2024-01-31", "ann@example.com"], "string"),
+        ]
+        for cls in CLASSES:
+            for values, dtype in typed_values:
+                with self.subTest(cls=cls.__name__, dtype=dtype):
+                    self.assertEqual(mismatches(cls, frame(cls, values, dtype=dtype)), [])
+
+if __name__ == "__main__":
+    unittest.main()